@@ -0,0 +1,334 @@
+#!/usr/bin/python
+#-*- coding: utf-8 -*-
+
+"""
+This module contains a binary cache of the tokens of parsed files. The first
+time a file is read, its words and tags are compiled into a sidecar file
+(`<file>.tkc`) containing:
+    - an interned vocabulary of words
+    - a table of PoS tags
+    - an int32 array with the id of the word of each token
+    - an uint8 array with the id of the tag of each token
+    - an int64 array with the offsets of the sentences
+    - the normalized tag and the classes of content words of each tag
+Further readings memory-map the sidecar instead of parsing the text, thus
+the parsed file is opened only to build the sidecar. The sidecar is rebuilt 
+when the size, the modification time and the hash of the parsed file change.
+
+@author: granada
+"""
+import os
+import sys
+sys.path.insert(0, '..') # This line is inserted to find the package utils.arguments
+
+import logging
+logger = logging.getLogger('corpus.cache')
+logging.basicConfig(format='%(asctime)s : %(levelname)s : %(message)s', level=logging.INFO)
+
+import json
+import struct
+import numpy as np
+
+from structure.parser import ParserInterface
+from utils.fileutils import fileHash, fileStat, sidecarPath
+from stanford import Stanford, Term
+from lemmatizer import sharedLemmatizer
+
+MAGIC = 'HREXTKC2'
+HEADER = 1024 # bytes reserved to the header
+EXTENSION = '.tkc'
+
+
+def _align(offset, size=8):
+    """
+    Return the first offset greater or equal to `offset` multiple of `size`.
+    """
+    return (offset + size - 1) / size * size
+
+
+class TokenCache(ParserInterface):
+    """
+    Class that reads words and tags of a parsed file from its binary cache.
+    It may be used in place of the parser class to extract words and tags.
+    """
+    def __init__(self, input, Parser=Stanford, mode='word', sentences=None, cache_dir=None):
+        """
+        Initiate the elements of the class, building the sidecar in case it
+        does not exist or is outdated.
+
+        Parameters:
+        -----------
+        input : string
+            Path to the parsed file
+        Parser : ParserInterface class, optional
+            Class used to parse the file when building the sidecar. Its
+            normalization of tags and content words are stored in the sidecar.
+        mode : {'word', 'lemma'}, optional
+            Specifies the mode of dealing with elements. Lemmas read from the
+            file are stored in their own sidecar (`<file>.lemma.tkc`). When
+            `Parser` computes the lemmas (see `ParserInterface.computes_lemmas`),
+            words are stored and lemmatized when read, after being lowercased
+            in case of `lower=True`, in the same order as the parser.
+        sentences : array_like, optional
+            List of ranges of sentences `(first, last)` to be read, where `last` 
+            is not included. All sentences are read by default.
+        cache_dir : string, optional
+            Folder where the sidecar is written. The sidecar is written next
+            to the parsed file by default.
+
+        Notes:
+        ------
+        self.tokens : numpy.memmap
+            Id of the word of each token
+        self.tags : numpy.memmap
+            Id of the PoS tag of each token
+        self.sents : numpy.memmap
+            Offset of the first token of each sentence. The last element
+            contains the number of tokens.
+        """
+        ParserInterface.__init__(self, extract='WordsAndTags', mode=mode)
+        self.input = input
+        self.Parser = Parser
+        self.stored = mode
+        self.lemmatizer = None
+        if mode == 'lemma' and Parser.computes_lemmas:
+            self.stored = 'word'
+            self.lemmatizer = sharedLemmatizer()
+        ext = ('.lemma' if self.stored == 'lemma' else '') + EXTENSION
+        self.fcache = sidecarPath(input, ext, cache_dir)
+        self.isent = None
+        self.ranges = sentences
+        self._masks = {}
+        self._lower = None
+        if not self._isValid():
+            self.build()
+        self._load()
+
+
+    def _readHeader(self):
+        """
+        Read the header of the sidecar. Return None for invalid sidecars.
+        """
+        try:
+            with open(self.fcache, 'rb') as fin:
+                data = fin.read(HEADER)
+        except IOError:
+            return None
+        if len(data) < HEADER or not data.startswith(MAGIC):
+            return None
+        length, = struct.unpack('<I', data[len(MAGIC):len(MAGIC)+4])
+        return json.loads(data[len(MAGIC)+4:len(MAGIC)+4+length])
+
+
+    def _writeHeader(self, fout, header):
+        """
+        Write the header of the sidecar padded to `HEADER` bytes.
+        """
+        data = json.dumps(header)
+        fout.write(MAGIC + struct.pack('<I', len(data)) + data)
+        fout.write('\0' * (HEADER - len(MAGIC) - 4 - len(data)))
+
+
+    def _isValid(self):
+        """
+        Verify whether the sidecar corresponds to the parsed file. In case
+        only the modification time changed (e.g., a copy of the file), the
+        hash of the content is verified and the header is updated.
+        """
+        header = self._readHeader()
+        if not header:
+            return False
+        size, mtime = fileStat(self.input)
+        if header['size'] == size and header['mtime'] == mtime:
+            return True
+        if header['size'] != size or header['sha1'] != fileHash(self.input):
+            return False
+        header['mtime'] = mtime
+        with open(self.fcache, 'r+b') as fout:
+            self._writeHeader(fout, header)
+        return True
+
+
+    def build(self):
+        """
+        Parse the file and store its words and tags into the sidecar.
+        """
+        logger.info('building token cache: %s' % self.fcache)
+        size, mtime = fileStat(self.input)
+        parser = self.Parser(self.input, extract='WordsAndTags', mode=self.stored, fast=True)
+        vocab = {}
+        tagset = {}
+        tokens = []
+        tags = []
+        sents = [0]
+        for _ in parser:
+            for word, pos in parser.listOfTerms(content_words=False, normalize=False):
+                tokens.append(vocab.setdefault(word, len(vocab)))
+                tags.append(tagset.setdefault(pos, len(tagset)))
+            sents.append(len(tokens))
+        if len(tagset) > 256:
+            logger.error('cannot store more than 256 tags in cache: %s' % self.input)
+            sys.exit(1)
+
+        words = [None] * len(vocab)
+        for word, id in vocab.iteritems():
+            words[id] = word
+        ltags = [None] * len(tagset)
+        for tag, id in tagset.iteritems():
+            ltags[id] = tag
+        normtags = [parser._normalization(tag) for tag in ltags]
+        # letters of the content words of each tag (see `_contentMask`)
+        content = [''.join(c for c in 'npjv' if parser._contentPos(tag, content=c)) for tag in ltags]
+        arrays = [('tokens', np.asarray(tokens, dtype='<i4')),
+                  ('tags', np.asarray(tags, dtype='u1')),
+                  ('sents', np.asarray(sents, dtype='<i8')),
+                  ('vocab', np.frombuffer(u'\n'.join(words).encode('utf-8'), dtype='u1')),
+                  ('tagset', np.frombuffer(u'\n'.join(ltags).encode('utf-8'), dtype='u1')),
+                  ('normtags', np.frombuffer(u'\n'.join(normtags).encode('utf-8'), dtype='u1')),
+                  ('content', np.frombuffer('\n'.join(content), dtype='u1'))]
+        header = {'size': size, 'mtime': mtime, 'sha1': fileHash(self.input),
+                  'nwords': len(words), 'ntags': len(ltags)}
+        offset = HEADER
+        for name, ar in arrays:
+            header[name] = [offset, len(ar), ar.dtype.str]
+            offset = _align(offset + ar.nbytes)
+
+        tmp = '%s.%d' % (self.fcache, os.getpid())
+        with open(tmp, 'wb') as fout:
+            self._writeHeader(fout, header)
+            for name, ar in arrays:
+                fout.seek(header[name][0])
+                fout.write(ar.tobytes())
+        os.rename(tmp, self.fcache)
+
+
+    def _array(self, header, name):
+        """
+        Memory-map the array `name` of the sidecar.
+        """
+        offset, length, dtype = header[name]
+        if not length:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(self.fcache, dtype=dtype, mode='r', offset=offset, shape=(length,))
+
+
+    def _load(self):
+        """
+        Memory-map the arrays of the sidecar and load the vocabulary.
+        """
+        header = self._readHeader()
+        self.tokens = self._array(header, 'tokens')
+        self.tags = self._array(header, 'tags')
+        self.sents = self._array(header, 'sents')
+        self.vocab = self._strings(header, 'vocab', header['nwords'])
+        self.tagset = self._strings(header, 'tagset', header['ntags'])
+        self.normtags = self._strings(header, 'normtags', header['ntags'])
+        self.content = self._strings(header, 'content', header['ntags'])
+
+
+    def _strings(self, header, name, length):
+        """
+        Load the array `name` of the sidecar as a list of `length` strings.
+        """
+        if not length:
+            return []
+        return self._array(header, name).tobytes().decode('utf-8').split(u'\n')
+
+
+    def _sentences(self):
+        """
+        Return the ranges of sentences that are read.
+        """
+        if self.ranges is None:
+            return [(0, len(self.sents) - 1)]
+        return self.ranges
+
+
+    def __len__(self):
+        """
+        Return the number of sentences that are read.
+        """
+        return sum(last - first for first, last in self._sentences())
+
+
+    def __iter__(self):
+        """
+        Iterate over the sentences of the file yielding the ids of the words
+        of each sentence. The current sentence is used by `listOfTerms`.
+        """
+        for first, last in self._sentences():
+            for k in xrange(first, last):
+                self.isent = k
+                yield self.tokens[self.sents[k]:self.sents[k+1]]
+
+
+    def _contentMask(self, ctw):
+        """
+        Return an array indicating whether each tag is from a content word.
+        A tag is from a content word of `ctw` when it is from a content word 
+        of any letter of `ctw` (see `ParserInterface._contentPos`).
+        """
+        if not self._masks.has_key(ctw):
+            mask = [any(c in letters for c in ctw) for letters in self.content]
+            self._masks[ctw] = np.asarray(mask, dtype=bool)
+        return self._masks[ctw]
+
+
+    def _terms(self, start, end, content_words=True, ctw='njv', normalize=True, lower=False):
+        """
+        Transform the tokens between `start` and `end` into terms.
+        """
+        tags = self.tags[start:end]
+        tokens = self.tokens[start:end]
+        if content_words:
+            if not len(self.tagset):
+                return []
+            idx = np.flatnonzero(self._contentMask(ctw)[tags])
+            tokens = tokens[idx]
+            tags = tags[idx]
+        if lower:
+            if self._lower is None:
+                self._lower = [word.lower() for word in self.vocab]
+            words = self._lower
+        else:
+            words = self.vocab
+        ptags = self.normtags if normalize else self.tagset
+        if self.lemmatizer is not None:
+            lemmatize = self.lemmatizer.lemmatize
+            return [Term(lemmatize(words[w], self.normtags[t]), ptags[t]) 
+                    for w, t in zip(tokens.tolist(), tags.tolist())]
+        return [Term(words[w], ptags[t]) for w, t in zip(tokens.tolist(), tags.tolist())]
+
+
+    def listOfTerms(self, content_words=True, ctw='njv', normalize=True, lower=False):
+        """
+        Transform the tokens of the current sentence into a list of namedtuples.
+        See `Stanford.listOfTerms`.
+        """
+        if self.isent is None:
+            return []
+        return self._terms(self.sents[self.isent], self.sents[self.isent+1],
+                           content_words, ctw, normalize, lower)
+
+
+    def document(self, content_words=True, ctw='njv', normalize=True, lower=False):
+        """
+        Extracts the whole document as a list of terms. See `Stanford.document`.
+        """
+        doc = []
+        for first, last in self._sentences():
+            doc.extend(self._terms(self.sents[first], self.sents[last], 
+                                   content_words, ctw, normalize, lower))
+        return doc
+
+
+    def sentence(self, content_words=True, ctw='njv', normalize=True, lower=False):
+        """
+        Extracts the content of each sentence as a list of terms.
+        See `Stanford.sentence`.
+        """
+        sentence = []
+        for _ in self.__iter__():
+            sentence.append(self.listOfTerms(content_words, ctw, normalize, lower))
+        return sentence
+#End of class TokenCache
@@ -0,0 +1,288 @@
+#!/usr/bin/python
+#-*- coding: utf-8 -*-
+
+"""
+This module contains a parsing to CoNLL-U files. Each line of a sentence
+contains the tab separated fields of a token:
+    ID FORM LEMMA UPOS XPOS FEATS HEAD DEPREL DEPS MISC
+and sentences are separated by blank lines. Lines of comments (`#`), of
+multiword tokens (`1-2`) and of empty nodes (`1.1`) are skipped.
+
+@author: granada
+"""
+import sys
+sys.path.insert(0, '..') # This line is inserted to find the package utils.arguments
+
+import logging
+logger = logging.getLogger('corpus.conllu')
+logging.basicConfig(format='%(asctime)s : %(levelname)s : %(message)s', level=logging.INFO)
+
+from structure.parser import ParserInterface
+from utils.fileutils import openFile, isCompressed, readRanges
+from stanford import Term
+from index import SentenceIndex
+
+
+class CoNLLU(ParserInterface):
+    """
+    Class that deals with texts parsed in the CoNLL-U format.
+    """
+    def __init__(self, input, extract='WordsAndTags', mode='word', fast=False,
+                 start=None, end=None, sentences=None, cache_dir=None):
+        """
+        Initiate the elements of the class.
+
+        Parameters:
+        -----------
+        input : string
+            Path to the CoNLL-U file. Files compressed with gzip (`.gz`),
+            bzip2 (`.bz2`) or xz (`.xz`) are decompressed while they are read.
+        extract : string {'WordsAndTags','Deps'}, optional
+            specifies the type of content to be extracted
+                WordsAndTags: returns the content from self.phrase
+                Deps: returns the content from self.deps
+        mode : {'word', 'lemma'}, optional
+            Specifies the mode of dealing with elements.
+            word: words (FORM) are extracted
+            lemma: lemmas (LEMMA) are extracted
+        fast : boolean {True, False}, optional
+            When extracting `WordsAndTags`, split only the fields up to the
+            UPOS of each token. In this mode, `self.heads` and `self.deprels`
+            remain empty.
+        start : int, optional
+            Byte offset where the reading starts. It must be the offset of
+            a sentence (see `index.SentenceIndex`).
+        end : int, optional
+            Byte offset where the reading stops, i.e., sentences starting
+            at `end` or after are not read.
+        sentences : array_like, optional
+            List of ranges of sentences `(first, last)` to be read, where `last`
+            is not included. Offsets of the ranges are found in the sentence
+            index of the file, which is built in case it does not exist.
+        cache_dir : string, optional
+            Folder of the sentence index, next to the file by default
+
+        Notes:
+        ------
+        self.words, self.lemmas, self.upos : array_like
+            Fields of the tokens of the current sentence
+        self.heads : array_like
+            Position of the head of each token in the current sentence, where
+            0 is the root of the sentence
+        self.deprels : array_like
+            Dependency relation between each token and its head
+        """
+        ParserInterface.__init__(self, extract=extract, mode=mode, fast=fast)
+        if extract not in ['WordsAndTags', 'Deps']:
+            logger.error('cannot extract %s from CoNLL-U files' % extract)
+            sys.exit(1)
+        self.input = input
+        self.fast = fast and extract == 'WordsAndTags'
+        self.ranges = None
+        if sentences is not None:
+            index = SentenceIndex(input, CoNLLU, cache_dir=cache_dir)
+            self.ranges = [index.byteRange(first, last) for first, last in sentences]
+        elif start is not None or end is not None:
+            self.ranges = [(start or 0, end)]
+        self.fin = openFile(input)
+        self.words = []
+        self.lemmas = []
+        self.upos = []
+        self.heads = []
+        self.deprels = []
+
+
+    def _lines(self):
+        """
+        Yield the lines of the file, restricted to `self.ranges` when reading
+        a part of the file. Lines are not decoded. Ranges of compressed files
+        are read in a single pass (see `fileutils.readRanges`).
+        """
+        if self.ranges is None:
+            for line in self.fin:
+                yield line
+            return
+        for line in readRanges(self.fin, self.ranges, sequential=isCompressed(self.input)):
+            yield line
+
+
+    def _clear(self):
+        """
+        Clear the fields of the current sentence.
+        """
+        self.words = []
+        self.lemmas = []
+        self.upos = []
+        self.heads = []
+        self.deprels = []
+
+
+    def _current(self):
+        """
+        Return the content of the current sentence according to `self.extract`.
+        """
+        if self.extract == 'Deps':
+            self.deps = zip(self.heads, self.deprels)
+            return self.deps
+        self.phrase = self.words
+        return self.phrase
+
+
+    def __iter__(self):
+        """
+        Iterate over the file yielding a sentence at time. For `WordsAndTags`,
+        the words of the sentence are yielded, while for `Deps` the pairs
+        `(head, deprel)` of each token are yielded. The terms of the sentence
+        are obtained by `listOfTerms`.
+        """
+        block = False # True while reading the lines of a sentence
+        split = 4 if self.fast else 8
+        for line in self._lines():
+            if line.isspace():
+                if block:
+                    yield self._current()
+                    self._clear()
+                    block = False
+                continue
+            block = True
+            if line[0] == '#':
+                continue
+            fields = line.rstrip('\r\n').split('\t', split)
+            id = fields[0]
+            if '-' in id or '.' in id:
+                continue
+            self.words.append(fields[1].decode('utf-8'))
+            self.lemmas.append(fields[2].decode('utf-8'))
+            self.upos.append(fields[3])
+            if not self.fast:
+                self.heads.append(int(fields[6]) if fields[6].isdigit() else 0)
+                self.deprels.append(fields[7])
+        if block:
+            yield self._current()
+            self._clear()
+
+
+    def sentenceOffsets(self):
+        """
+        Find the byte offset of the end of each sentence, i.e., the offset
+        after the blank line that closes the sentence or the end of the file.
+        Only the blank lines are tested, thus the content of the file is not
+        decoded.
+
+        Yields:
+        -------
+        offset : int
+            The offset after each sentence
+        """
+        fin = openFile(self.input)
+        block = False
+        offset = 0
+        for line in fin:
+            offset += len(line)
+            if line.isspace():
+                if block:
+                    yield offset
+                    block = False
+            else:
+                block = True
+        if block:
+            yield offset
+        fin.close()
+
+
+    def _normalization(self, pos):
+        """
+        Transform universal PoS tags into their simplified version.
+
+        Examples:
+        ---------
+        >>> CoNLLU()._normalization('NOUN')
+            n
+        >>> CoNLLU()._normalization('VERB')
+            v
+        """
+        if pos in ['NOUN', 'PROPN']: return 'n'
+        elif pos == 'PRON': return 'p'
+        elif pos == 'ADJ': return 'j'
+        elif pos == 'VERB': return 'v'
+        return pos
+
+
+    def _contentPos(self, pos, content='nvj'):
+        """
+        Verify wether a universal PoS tag belongs to a content word or not.
+        See `Stanford._contentPos`.
+        """
+        ctw_N = ['NOUN', 'PROPN', 'n']
+        ctw_J = ['ADJ', 'j']
+        ctw_V = ['VERB', 'v']
+        if   'n' in content and pos in ctw_N: return True
+        elif 'j' in content and pos in ctw_J: return True
+        elif 'v' in content and pos in ctw_V: return True
+        return False
+
+
+    def listOfTerms(self, content_words=True, ctw='njv', normalize=True, lower=False):
+        """
+        Transform the tokens of the current sentence into a list of namedtuples
+        `Term(word, pos)`, where `word` is the lemma in case of `mode='lemma'`
+        and `pos` is the universal PoS tag. See `Stanford.listOfTerms`.
+        """
+        words = self.lemmas if self.mode == 'lemma' else self.words
+        sent = []
+        for word, pos in zip(words, self.upos):
+            if content_words and not self._contentPos(pos, content=ctw):
+                continue
+            if lower:
+                word = word.lower()
+            if normalize:
+                pos = self._normalization(pos)
+            sent.append(Term(word, pos))
+        return sent
+
+
+    def dependencies(self):
+        """
+        Extract the dependencies of the sentence from the HEAD and DEPREL
+        fields. The reader must not be in `fast` mode. See 
+        `ParserInterface.dependencies`.
+        """
+        return [(head, rel, dep) for dep, (head, rel) in enumerate(zip(self.heads, self.deprels), 1)]
+
+
+    def plainPhrase(self):
+        """
+        Extract the content of the current sentence as a string of words.
+        """
+        return ' '.join(self.words)
+
+
+    def contentWords(self, ctw='njv'):
+        """
+        Extract content words of the current sentence. See `Stanford.contentWords`.
+        """
+        if not ctw:
+            raise ValueError, 'a content word must be passed as argument'
+        return self.listOfTerms(content_words=True, ctw=ctw, normalize=True)
+
+
+    def document(self, content_words=True, ctw='njv', normalize=True, lower=False):
+        """
+        Extracts the whole document as a list of terms. See `Stanford.document`.
+        """
+        doc = []
+        for _ in self.__iter__():
+            doc.extend(self.listOfTerms(content_words, ctw, normalize, lower))
+        return doc
+
+
+    def sentence(self, content_words=True, ctw='njv', normalize=True, lower=False):
+        """
+        Extracts the content of each sentence as a list of terms.
+        See `Stanford.sentence`.
+        """
+        sentence = []
+        for _ in self.__iter__():
+            sentence.append(self.listOfTerms(content_words, ctw, normalize, lower))
+        return sentence
+#End of class CoNLLU
@@ -14,19 +14,637 @@ logger = logging.getLogger('corpus')
 logging.basicConfig(format='%(asctime)s : %(levelname)s : %(message)s', level=logging.INFO)
 
 import os
+import ast
+import copy
+import time
+import zlib
+import shutil
 from os.path import join, splitext
-from collections import defaultdict
+from collections import defaultdict, deque
+from multiprocessing import Pool, cpu_count
+from multiprocessing.pool import ThreadPool
 import numpy as np
 
 from structure import dictionaries
+from structure.storage import SQLite
+from structure.sketch import CountMinSketch
+from structure.external import ExternalRels
+from utils.fileutils import fileHash, fileStat, isCompressed, COMPRESSED
+from cache import TokenCache
+from lemmatizer import sharedLemmatizer
+from stanford import Term
+from index import SentenceIndex
 import filters
 
+
+def _windowPair(ti, tj, dwords, dctxs, drels, context=None):
+    """
+    Count the relations between two terms of a window, where `ti` appears
+    before `tj` in the text.
+
+    Parameters:
+    -----------
+    ti : Term
+        The term on the left side of the window
+    tj : Term
+        The term on the right side of the window
+    dwords : dictionaries.DictWords
+        Dictionary of words that receives the target words
+    dctxs : dictionaries.DictWords
+        Dictionary of contexts that receives the context words
+    drels : dictionaries.DictRels
+        Dictionary of relations that receives the pairs `(idw, idc)`
+    context : function, optional
+        Function that encodes contexts (see `dictionaries.DictContexts.context`).
+        Contexts are strings in the form `word#pos-dir` by default.
+    """
+    record = False
+    if ti.pos == 'n' and tj.pos == 'v':
+        tword = ti.word
+        cword = tj.word+'#'+tj.pos+'-r' if context is None else context(tj.word, tj.pos, 0)
+        record = True
+    elif ti.pos == 'v' and tj.pos == 'n':
+        tword = tj.word
+        cword = ti.word+'#'+ti.pos+'-l' if context is None else context(ti.word, ti.pos, 1)
+        record = True
+    if ti.pos == 'n' and tj.pos == 'n':
+        tword = tj.word
+        cword = ti.word+'#'+ti.pos+'-l' if context is None else context(ti.word, ti.pos, 1)
+        dwords[tword] = 1
+        dctxs[cword] = 1
+        idt, _ = dwords[tword]
+        idc, _ = dctxs[cword]
+        drels[(idt, idc)] = 1
+        tword = ti.word
+        cword = tj.word+'#'+tj.pos+'-r' if context is None else context(tj.word, tj.pos, 0)
+        record = True
+    if ti.pos == 'n' and tj.pos == 'j':
+        tword = ti.word
+        cword = tj.word+'#'+tj.pos+'-r' if context is None else context(tj.word, tj.pos, 0)
+        record = True
+    elif ti.pos == 'j' and tj.pos == 'n':
+        tword = tj.word
+        cword = ti.word+'#'+ti.pos+'-l' if context is None else context(ti.word, ti.pos, 1)
+        record = True
+    if record:
+        dwords[tword] = 1
+        dctxs[cword] = 1
+        idt, _ = dwords[tword]
+        idc, _ = dctxs[cword]
+        drels[(idt, idc)] = 1
+
+
+def _contextEncoder(dctxs):
+    """
+    Return the function that encodes the contexts of `dctxs` or None for 
+    contexts stored as strings.
+    """
+    if isinstance(dctxs, dictionaries.DictContexts):
+        return dctxs.context
+    return None
+
+
+def _windowRelations(doc, n, dwords, dctxs, drels, stop=None):
+    """
+    Count the relations between target words and contexts found in a window
+    that slides over `doc`. Only the first `stop` terms of `doc` are used as 
+    the left side of the window, so the remaining terms of `doc` are only seen
+    as contexts.
+
+    Parameters:
+    -----------
+    doc : array_like
+        List of `Term` namedtuples
+    n : int
+        Number of terms in each side of the window
+    stop : int, optional
+        Position of `doc` where the window stops sliding
+    """
+    if stop is None:
+        stop = len(doc)
+    context = _contextEncoder(dctxs)
+    for i in xrange(0, stop):
+        for j in xrange(i+1, i+n+1):
+            if j <= len(doc)-1:
+                _windowPair(doc[i], doc[j], dwords, dctxs, drels, context)
+
+
+# Codes of the PoS used by the NumPy window kernel
+_POSCODES = dictionaries.POSCODES
+_POSNAMES = dictionaries.POSNAMES
+
+# Rules of `_windowPair` as a lookup table indexed by `pos(i)*4 + pos(j)`. 
+# The first row contains the first relation recorded by a pair and the 
+# second row contains the second relation (only for nouns followed by nouns).
+# Value 1 records `ti` as target word and `tj` as context (`-r`), value 2 
+# records `tj` as target word and `ti` as context (`-l`).
+_RULES = np.zeros((2, 16), dtype=np.int8)
+_RULES[0, 1*4+2] = 1 # n-v
+_RULES[0, 2*4+1] = 2 # v-n
+_RULES[0, 1*4+1] = 2 # n-n
+_RULES[1, 1*4+1] = 1 # n-n
+_RULES[0, 1*4+3] = 1 # n-j
+_RULES[0, 3*4+1] = 2 # j-n
+
+
+def _windowRelationsNumpy(doc, n, dwords, dctxs, drels, stop=None):
+    """
+    Vectorized version of `_windowRelations`. The document is encoded as 
+    arrays of word ids and PoS codes and the rules of `_windowPair` are 
+    applied to shifted views of these arrays. Words and contexts are added
+    to the dictionaries in the order they would be seen by `_windowRelations`,
+    thus both functions generate the same ids.
+
+    Parameters:
+    -----------
+    doc : array_like
+        List of `Term` namedtuples
+    n : int
+        Number of terms in each side of the window
+    stop : int, optional
+        Position of `doc` where the window stops sliding
+    """
+    size = len(doc)
+    if stop is None:
+        stop = size
+    vocab = {}
+    wids = np.fromiter((vocab.setdefault(t.word, len(vocab)) for t in doc), dtype=np.int64, count=size)
+    pos = np.fromiter((_POSCODES.get(t.pos, 0) for t in doc), dtype=np.int64, count=size)
+
+    targets, contexts, events = [], [], []
+    for d in xrange(1, n+1):
+        m = min(stop, size-d)
+        if m <= 0:
+            break
+        code = pos[:m]*4 + pos[d:d+m]
+        for sub in (0, 1):
+            rule = _RULES[sub][code]
+            for side in (1, 2):
+                i = np.flatnonzero(rule == side)
+                if side == 1:
+                    t, c, direction = i, i+d, 0
+                else:
+                    t, c, direction = i+d, i, 1
+                targets.append(wids[t])
+                contexts.append((wids[c]*4 + pos[c])*2 + direction)
+                # position of the relation in the serial loop
+                events.append((i*n + d-1)*2 + sub)
+    if not targets:
+        return
+
+    order = np.argsort(np.concatenate(events), kind='mergesort')
+    targets = np.concatenate(targets)[order]
+    contexts = np.concatenate(contexts)[order]
+    uwords, firstw, invw = np.unique(targets, return_index=True, return_inverse=True)
+    uctxs, firstc, invc = np.unique(contexts, return_index=True, return_inverse=True)
+    freqw = np.bincount(invw, minlength=len(uwords))
+    freqc = np.bincount(invc, minlength=len(uctxs))
+    pairs, freqp = np.unique(invw.astype(np.int64)*len(uctxs) + invc, return_counts=True)
+
+    words = [None] * len(vocab)
+    for word, wid in vocab.iteritems():
+        words[wid] = word
+    idws = np.zeros(len(uwords), dtype=np.int64)
+    for k in np.argsort(firstw, kind='mergesort'):
+        tword = words[uwords[k]]
+        dwords[tword] = int(freqw[k])
+        idws[k], _ = dwords[tword]
+    idcs = np.zeros(len(uctxs), dtype=np.int64)
+    context = _contextEncoder(dctxs)
+    for k in np.argsort(firstc, kind='mergesort'):
+        key = int(uctxs[k])
+        if context is None:
+            cword = words[key/8]+'#'+_POSNAMES[(key/2)%4]+('-l' if key%2 else '-r')
+        else:
+            cword = context(words[key/8], _POSNAMES[(key/2)%4], key%2)
+        dctxs[cword] = int(freqc[k])
+        idcs[k], _ = dctxs[cword]
+    for pair, f in zip(pairs.tolist(), freqp.tolist()):
+        drels[(int(idws[pair/len(uctxs)]), int(idcs[pair%len(uctxs)]))] = f
+
+
+# Kernels that count the relations of a window over a list of terms
+_KERNELS = {'python': _windowRelations, 'numpy': _windowRelationsNumpy}
+
+
+def _isWindowed(size):
+    """
+    Return True when `size` is the number of terms of a window, i.e., the 
+    window does not contain the whole corpus.
+    """
+    return isinstance(size, int) or size.isdigit()
+
+
+def _windowSide(size):
+    """
+    Return the number of terms in each side of a window of `size` terms.
+    """
+    return (int(size)-1)/2
+
+
+class WindowStream(object):
+    """
+    Sliding window that counts relations while terms are streamed into it. 
+    Only the last `n+1` terms are kept in memory, thus the memory does not 
+    depend on the size of the corpus.
+    """
+    def __init__(self, n, dwords, dctxs, drels, engine='python', batch=100000):
+        """
+        Initiate the window.
+
+        Parameters:
+        -----------
+        n : int
+            Number of terms in each side of the window
+        dwords : dictionaries.DictWords
+            Dictionary of words that receives the target words
+        dctxs : dictionaries.DictWords
+            Dictionary of contexts that receives the context words
+        drels : dictionaries.DictRels
+            Dictionary of relations that receives the pairs `(idw, idc)`
+        engine : string {'python', 'numpy'}, optional
+            Kernel used to count relations. The `numpy` kernel processes 
+            the terms in batches of `batch` terms.
+        batch : int, optional
+            Number of terms processed at once by the `numpy` kernel
+        """
+        self.n = n
+        self.window = deque()
+        self.dwords = dwords
+        self.dctxs = dctxs
+        self.drels = drels
+        self.engine = engine
+        self.batch = batch
+        self.context = _contextEncoder(dctxs)
+
+
+    def _slide(self):
+        """
+        Count the relations between the first term of the window and the
+        terms that follow it, removing the first term from the window.
+        """
+        ti = self.window.popleft()
+        for tj in self.window:
+            _windowPair(ti, tj, self.dwords, self.dctxs, self.drels, self.context)
+
+
+    def add(self, terms):
+        """
+        Add terms to the end of the window. The window slides each time it
+        contains more than `n` terms, i.e., once the `n` terms that follow
+        its first term are known.
+
+        Parameters:
+        -----------
+        terms : array_like
+            List of `Term` namedtuples
+        """
+        if self.engine != 'python':
+            self.window.extend(terms)
+            if len(self.window) >= self.batch + self.n:
+                self.flush(keep=self.n)
+            return
+        for term in terms:
+            self.window.append(term)
+            if len(self.window) > self.n:
+                self._slide()
+
+
+    def flush(self, keep=0):
+        """
+        Slide the window until it contains only `keep` terms. Calling `flush()` 
+        at the end of a document or sentence avoids windows crossing borders.
+
+        Parameters:
+        -----------
+        keep : int, optional
+            Number of terms that remain in the window
+        """
+        if self.engine != 'python':
+            if len(self.window) > keep:
+                doc = list(self.window)
+                _KERNELS[self.engine](doc, self.n, self.dwords, self.dctxs, 
+                                      self.drels, stop=len(doc)-keep)
+                self.window = deque(doc[len(doc)-keep:])
+            return
+        while len(self.window) > keep:
+            self._slide()
+#End of class WindowStream
+
+
+def _pruneTerms(terms, vocab):
+    """
+    Remove the PoS of the terms whose word is not in `vocab`. Pruned terms 
+    keep their positions in windows, but they are neither target words nor
+    contexts of any relation.
+    """
+    return [term if term.word in vocab else term._replace(pos='') for term in terms]
+
+
+def _sentenceTerms(parser, cwords=True, ctw='njv', normalize=True, lower=False, vocab=None):
+    """
+    Yield the list of terms of each sentence contained in `parser`. Terms
+    whose word is not in `vocab` are pruned (see `_pruneTerms`).
+    """
+    for _ in parser:
+        terms = parser.listOfTerms(cwords, ctw, normalize, lower)
+        if vocab is not None:
+            terms = _pruneTerms(terms, vocab)
+        yield terms
+
+
+def _documentRelations(content, iddoc, dwords, dctxs, drels):
+    """
+    Count the relations between the terms of a document and the document
+    itself, i.e., the document `iddoc` is the context of all its terms.
+
+    Parameters:
+    -----------
+    content : array_like
+        List of `Term` namedtuples of the document
+    iddoc : int
+        Identifier of the document used as context
+    """
+    for term, pos in content:
+        dwords[term] = 1
+        dctxs[iddoc] = 1
+        idt, _ = dwords[term]
+        idc, _ = dctxs[iddoc]
+        drels[(idt, idc)] = 1
+
+
+def _sentenceRelations(sentences, idsent, dwords, dctxs, drels):
+    """
+    Count the relations between the terms of each sentence of a document and 
+    the sentence itself. `dwords` receives the document frequency of terms.
+
+    Parameters:
+    -----------
+    sentences : array_like
+        Iterable containing the list of terms of each sentence of the document
+        (see `_sentenceTerms`)
+    idsent : int
+        Identifier of the first sentence of the document
+
+    Returns:
+    --------
+    idsent : int
+        Identifier of the sentence that follows the last sentence of the document
+    """
+    docwords = []
+    newwords = []
+    for content in sentences:
+        for term, pos in content:
+            if not dwords.has_key(term):
+                dwords[term] = 1
+                newwords.append(term)
+            docwords.append(term)
+            dctxs[idsent] = 1
+            idt, _ = dwords[term]
+            idc, _ = dctxs[idsent]
+            drels[(idt, idc)] = 1
+        idsent += 1
+    t_indoc = set(docwords) - set(newwords)
+    for word in t_indoc:
+        dwords[word] = 1
+    return idsent
+
+
+def _dependencyRelations(parser, cwords, ctw, normalize, lower, inverse, dwords, dctxs, drels):
+    """
+    Count the relations between the words of each dependency of a document
+    and their contexts, i.e., the relation and the other word of the dependency.
+    The head of `relation(head, dependent)` receives the context `relation:dependent`,
+    while the dependent receives the inverse context `relation-1:head`.
+
+    Parameters:
+    -----------
+    parser : ParserInterface instance
+        Reader of the document that is not in `fast` mode
+    cwords, ctw, normalize, lower : 
+        Arguments of `ParserInterface.listOfTerms`. When `cwords=True`, only 
+        dependencies between content words are counted.
+    inverse : boolean {True, False}
+        Count the inverse contexts of the dependents
+    """
+    for _ in parser:
+        terms = parser.listOfTerms(False, ctw, normalize, lower)
+        keep = [not cwords or parser._contentPos(term.pos, content=ctw) for term in terms]
+        pairs = []
+        for head, rel, dep in parser.dependencies():
+            if not 0 < head <= len(terms) or not 0 < dep <= len(terms):
+                continue
+            if keep[head-1] and keep[dep-1]:
+                pairs.append((terms[head-1].word, rel+':'+terms[dep-1].word))
+                if inverse:
+                    pairs.append((terms[dep-1].word, rel+'-1:'+terms[head-1].word))
+        for word, ctx in pairs:
+            dwords[word] = 1
+            dctxs[ctx] = 1
+            idt, _ = dwords[word]
+            idc, _ = dctxs[ctx]
+            drels[(idt, idc)] = 1
+
+
+def _reader(Parser, path, cache=False, sentences=None, mode='word', deps=False, cache_dir=None):
+    """
+    Open a document of the corpus to extract its words and tags.
+
+    Parameters:
+    -----------
+    Parser : ParserInterface class
+        The class of the parser that generated the document
+    path : string
+        Path to the document
+    cache : boolean {True, False}, optional
+        Read words and tags from the binary token cache (see `cache.TokenCache`)
+    sentences : array_like, optional
+        List of ranges of sentences `(first, last)` to be read
+    mode : {'word', 'lemma'}, optional
+        Extract words or lemmas (see `ParserInterface`)
+    deps : boolean {True, False}, optional
+        Read the dependencies of the sentences. The token cache is not used,
+        since it does not contain dependencies.
+    cache_dir : string, optional
+        Folder of the token caches and of the sentence indexes
+
+    Returns:
+    --------
+    parser : ParserInterface instance
+        Object iterating over the sentences of the document
+    """
+    if deps:
+        return Parser(path, extract='WordsAndTags', mode=mode, sentences=sentences, cache_dir=cache_dir)
+    if cache:
+        return TokenCache(path, Parser=Parser, mode=mode, sentences=sentences, cache_dir=cache_dir)
+    return Parser(path, extract='WordsAndTags', mode=mode, fast=True, sentences=sentences, 
+                  cache_dir=cache_dir)
+
+
+def _readDocument(task):
+    """
+    Read the terms of a whole document. This function is called by the 
+    workers that prefetch documents (see `Corpus._documents`).
+
+    Parameters:
+    -----------
+    task : tuple
+        Tuple `(Parser, path, readopts, args)`, where `readopts` are the 
+        keyword arguments of `_reader` and `args` are the arguments of 
+        `ParserInterface.document`
+
+    Returns:
+    --------
+    doc : array_like
+        A list containing all terms of the document
+    """
+    Parser, path, readopts, args = task
+    return _reader(Parser, path, **readopts).document(*args)
+
+
+# Approximate number of bytes of an entry of the dictionaries (see `Corpus.memory_limit`)
+_WORD_BYTES = 300
+_REL_BYTES = 180
+
+
+# Settings shared by the processes of the pool (see `Corpus._shards`)
+_shared = {}
+
+def _initShard(settings):
+    """
+    Initialize a process of the pool with the settings of the extraction.
+    """
+    _shared.clear()
+    _shared.update(settings)
+
+
+def _shardReader(t, deps=False):
+    """
+    Open the reader of the t-th shard, i.e., a document or a range of 
+    sentences of a document.
+    """
+    k, sentences = _shared['shards'][t]
+    path = join(_shared['dirin'], _shared['docs'][k])
+    return _reader(_shared['parser'], path, sentences=sentences, deps=deps, **_shared['readopts'])
+
+
+def _partialCounts(dwords, dctxs, drels):
+    """
+    Transform the dictionaries of a shard into lists that are cheap to 
+    be sent back to the main process. Words and contexts are sorted by 
+    their ids, i.e., in the order they were first seen. Encoded contexts
+    are decoded, since their keys depend on the vocabulary of the shard.
+    """
+    ctxs = sorted(dctxs.dic2Tuples(key='id'))
+    if isinstance(dctxs, dictionaries.DictContexts):
+        ctxs = [(idc, dctxs.decode(ctx), f) for idc, ctx, f in ctxs]
+    return (sorted(dwords.dic2Tuples(key='id')), ctxs, drels.dic2Tuples(key='idw'))
+
+
+def _shardWindow(t):
+    """
+    Extract the window relations of the t-th shard of the corpus. When 
+    windows cross documents, terms of the following shards are read until
+    filling the window of the last terms of the shard, as a serial 
+    extraction does. When `n` is a list of window sizes, a list containing
+    the partial counts of each size is returned.
+    """
+    n, args, boundary = _shared['n'], _shared['args'], _shared['boundary']
+    sizes = n if isinstance(n, list) else [n]
+    dicts = []
+    streams = []
+    for m in sizes:
+        dwords = dictionaries.DictWords()
+        dctxs = dictionaries.DictContexts() if _shared['encode'] else dictionaries.DictWords()
+        drels = dictionaries.DictRels()
+        dicts.append((dwords, dctxs, drels))
+        streams.append(WindowStream(m, dwords, dctxs, drels, engine=_shared['engine']))
+    for terms in _sentenceTerms(_shardReader(t), *args, vocab=_shared['vocab']):
+        for stream in streams:
+            stream.add(terms)
+            if boundary == 'sentence':
+                stream.flush()
+    if boundary == 'sentence' or (boundary == 'document' and _shared['last'][t]):
+        for stream in streams:
+            stream.flush()
+    else:
+        ahead = []
+        for next in xrange(t+1, len(_shared['shards'])):
+            if len(ahead) >= max(sizes):
+                break
+            for terms in _sentenceTerms(_shardReader(next), *args, vocab=_shared['vocab']):
+                ahead.extend(terms)
+                if len(ahead) >= max(sizes):
+                    break
+            if boundary == 'document' and _shared['last'][next]:
+                break
+        for m, stream in zip(sizes, streams):
+            stream.add(ahead[:m])
+            stream.flush(keep=len(ahead[:m]))
+    partials = [_partialCounts(*dic) for dic in dicts]
+    if isinstance(n, list):
+        return partials
+    return partials[0]
+
+
+def _shardUnigrams(t):
+    """
+    Count the frequency of the words of the t-th shard of the corpus.
+    """
+    counts = defaultdict(int)
+    for terms in _sentenceTerms(_shardReader(t), *_shared['args']):
+        for term in terms:
+            counts[term.word] += 1
+    return dict(counts)
+
+
+def _shardDocument(t):
+    """
+    Extract the relations between the document of the t-th shard and its terms.
+    """
+    k, _ = _shared['shards'][t]
+    dwords = dictionaries.DictWords()
+    dctxs = dictionaries.DictWords()
+    drels = dictionaries.DictRels()
+    _documentRelations(_shardReader(t).document(*_shared['args']), k, dwords, dctxs, drels)
+    return _partialCounts(dwords, dctxs, drels)
+
+
+def _shardSentences(t):
+    """
+    Extract the relations between the sentences of the t-th shard and 
+    their terms. Sentences are numbered from zero inside the shard.
+    """
+    cwords, ctw, normalize, lower = _shared['args']
+    dwords = dictionaries.DictWords()
+    dctxs = dictionaries.DictWords()
+    drels = dictionaries.DictRels()
+    sentences = _sentenceTerms(_shardReader(t), cwords, ctw, normalize, lower)
+    nsents = _sentenceRelations(sentences, 0, dwords, dctxs, drels)
+    return _partialCounts(dwords, dctxs, drels) + (nsents,)
+
+
+def _shardDependencies(t):
+    """
+    Extract the relations between the words of the t-th shard and their
+    dependency contexts.
+    """
+    dwords = dictionaries.DictWords()
+    dctxs = dictionaries.DictWords()
+    drels = dictionaries.DictRels()
+    _dependencyRelations(_shardReader(t, deps=True), *(_shared['args'] + (dwords, dctxs, drels)))
+    return _partialCounts(dwords, dctxs, drels)
+
+
 class Corpus(object):
     """
     Transforms the content of files in a more computational representation
     (Matrix Market representation).
     """
-    def __init__(self, dirin, lang='en', parser='Stanford', filetype='.parsed'):
+    def __init__(self, dirin, lang='en', parser='Stanford', filetype='.parsed', cache=False, 
+                 cache_dir=None, shard_size=None, prefetch=0, prefetcher='thread', encode_contexts=False,
+                 hash_contexts=None, hash_sample=0, memory_limit=None, spill_dir=None,
+                 sample=None, sample_unit='document', sample_seed=0):
         """
         Initialize the class to generate a Matrix Market representation 
         of the corpus.
@@ -39,11 +657,84 @@ class Corpus(object):
             The language of the input files. This is important to parsers that
             can generate files in more than one language. E.g, Treetagger may 
             generate relations for English, French, Portuguese etc.
-        parser : string
-            The name of the parser used to generate the input files.
+        parser : string {'Stanford', 'CoNLLU'}
+            The name of the parser used to generate the input files. `CoNLLU`
+            reads files in the CoNLL-U format of any language (e.g., with 
+            `filetype='.conllu'`), whose universal PoS tags are normalized
+            and whose lemmas are extracted by `lex_mode='lemma'`.
         filetype : string
             The extension of the input files. The extension avoids trying to parse non
-            parsed files that are in the same folder or backup files (`.parsed~`)
+            parsed files that are in the same folder or backup files (`.parsed~`).
+            Files compressed with gzip, bzip2 or xz (e.g., `.parsed.gz`) are also 
+            accepted and decompressed while they are read.
+        cache : boolean {True, False}, optional
+            Compile the words and tags of each file into a binary sidecar 
+            (`<file>.tkc`) in the first reading. Further extractions memory-map
+            the sidecar instead of parsing the text (see `cache.TokenCache`).
+        cache_dir : string, optional
+            Folder where the token caches and the sentence indexes of the files are
+            written, which is created in case it does not exist. By default, they are 
+            written next to the files, thus folders of read-only corpora need this folder.
+        shard_size : int, optional
+            Maximum number of bytes of a document processed by a single process
+            in parallel extractions. Larger documents are split into ranges of 
+            sentences using the sentence index (see `index.SentenceIndex`).
+            Compressed documents are not split, since reading a range of
+            sentences requires decompressing the document from its beginning.
+        prefetch : int, optional
+            Number of documents read in background while the current document 
+            is counted. Prefetching overlaps reading files from slow filesystems 
+            with counting, keeping at most `prefetch` documents in memory. 
+            `prefetch=0` reads each document only when it is counted. Only the
+            extractions that read whole documents in a single process prefetch 
+            them (`extractWindow` without streaming and `extractDocument`), thus
+            `prefetch` cannot be used with `shard_size` or checkpoints and other
+            extractions log a warning.
+        prefetcher : string {'thread', 'process'}, optional
+            Type of the pool that reads the prefetched documents. Threads overlap
+            the I/O with the counting, while processes also tokenize documents
+            in parallel at the cost of sending the terms back to the main process.
+        encode_contexts : boolean {True, False}, optional
+            Store the contexts of windows as integers packing the word, the PoS
+            and the direction instead of strings in the form `word#pos-dir` (see
+            `dictionaries.DictContexts`). Contexts are decoded into strings when
+            saved or by `decodeContexts`. Hashed contexts are not encoded.
+        hash_contexts : int, optional
+            Number of bits `k` of hashed contexts. When set, contexts extracted by
+            `extractWindow`, `extractDocument` and `extractSentences` are hashed into 
+            `2**k` buckets by a hash function (see `dictionaries.DictHashed`), bounding
+            the number of contexts to `2**k`. `self.dctxs` contains the buckets and 
+            `self.drels` contains the sum of the relations of the contexts of each bucket.
+        hash_sample : int, optional
+            Number of contexts of each bucket kept in `self.contexts_sample` in the 
+            form `bucket: [ctx1, ctx2, ...]`, allowing to interpret the buckets.
+        memory_limit : int, optional
+            Approximate number of bytes used by `self.dwords`, `self.dctxs` and 
+            `self.drels`. When the limit is reached during an extraction, the 
+            relations are spilled into sorted runs on disk (see `external.ExternalRels`)
+            and the extraction continues. Windows check the limit after each sentence,
+            while other extractions check it after each document or shard. Since 
+            words and contexts are kept in memory, at least a quarter of the limit 
+            is reserved to the relations. Spilled relations are merged when the
+            corpus is saved or when relations are weighted or filtered.
+        spill_dir : string, optional
+            Folder where relations are spilled, the default temporary folder 
+            by default
+        sample : float, optional
+            Fraction of the corpus that is extracted. Each document or sentence is
+            kept with probability `sample` (Bernoulli sampling), thus extractions,
+            weights, filters and methods run on a sample of the corpus. Sampled
+            sentences are read by random access using the sentence index (see 
+            `index.SentenceIndex`), thus the other sentences are not read. Sentences
+            of compressed files are decompressed in a single pass but only the 
+            sampled sentences are parsed.
+        sample_unit : string {'document', 'sentence'}, optional
+            Unit of the sample. Sampled documents are not split into shards, 
+            thus `sample` cannot be used with `shard_size`.
+        sample_seed : int, optional
+            Seed of the sample. The same seed yields the same sample of a corpus.
+            Sentences of a document are sampled using the seed and the name of
+            the document, thus they do not depend on the other documents.
 
         Notes:
         ------
@@ -60,22 +751,112 @@ class Corpus(object):
         """
         self.dirin = dirin
         self.docs = []
-        if lang == 'en':
-            if parser == 'Stanford':
-                from stanford import Stanford
-                self.Parser = Stanford
-                parsedfiles = os.listdir(self.dirin)
-                for filename in sorted(parsedfiles):
-                    name, ext = splitext(filename)
-                    if ext.endswith(filetype):
-                        logger.info('parsing file: %s' % filename)
-                        self.docs.append(filename)
+        self._setReader(cache, cache_dir)
+        self._setParallelism(shard_size, prefetch, prefetcher)
+        self._setContexts(encode_contexts, hash_contexts, hash_sample)
+        self._setMemory(memory_limit, spill_dir)
+        self.Parser = None
+        if parser == 'CoNLLU':
+            from conllu import CoNLLU
+            self.Parser = CoNLLU
+        elif lang == 'en' and parser == 'Stanford':
+            from stanford import Stanford
+            self.Parser = Stanford
+        if self.Parser is not None:
+            parsedfiles = os.listdir(self.dirin)
+            for filename in sorted(parsedfiles):
+                name, ext = splitext(filename)
+                if ext in COMPRESSED:
+                    name, ext = splitext(name)
+                if ext.endswith(filetype):
+                    logger.info('parsing file: %s' % filename)
+                    self.docs.append(filename)
+        self._setSample(sample, sample_unit, sample_seed)
 
         self.dwords = dictionaries.DictWords()
         self.dctxs = dictionaries.DictWords()
         self.drels = dictionaries.DictRels()
 
 
+    def _setReader(self, cache, cache_dir):
+        """
+        Set the options used to open the documents (see `_reader`).
+        """
+        if cache_dir is not None and not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        self.readopts = {'cache': cache, 'cache_dir': cache_dir}
+
+
+    def _setParallelism(self, shard_size, prefetch, prefetcher):
+        """
+        Set the options that split documents into shards and prefetch documents.
+        """
+        if prefetcher not in ['thread', 'process']:
+            logger.error('cannot prefetch documents using: %s' % prefetcher)
+            sys.exit(1)
+        if prefetch and shard_size:
+            logger.error('cannot prefetch documents split into shards')
+            sys.exit(1)
+        self.shard_size = shard_size
+        self.prefetch = prefetch
+        self.prefetcher = prefetcher
+
+
+    def _warnPrefetch(self):
+        """
+        Warn that documents are not prefetched by an extraction that reads 
+        sentences or shards instead of whole documents (see `_documents`).
+        """
+        if self.prefetch:
+            logger.warning('documents are not prefetched when reading sentences or shards')
+
+
+    def _setContexts(self, encode_contexts, hash_contexts, hash_sample):
+        """
+        Set the options that encode or hash the contexts.
+        """
+        if encode_contexts and hash_contexts:
+            logger.error('cannot encode hashed contexts')
+            sys.exit(1)
+        self.encode = encode_contexts
+        self.hash_bits = hash_contexts
+        self.hash_sample = hash_sample
+        self.contexts_sample = {}
+
+
+    def _setMemory(self, memory_limit, spill_dir):
+        """
+        Set the memory limit of the dictionaries and the folder of spilled relations.
+        """
+        self.memory_limit = memory_limit
+        self.spill_dir = spill_dir
+        self.spill = None
+
+
+    def _setSample(self, sample, sample_unit, sample_seed):
+        """
+        Set the options of the sample, keeping only the sampled documents in 
+        `self.docs` when documents are sampled. Sampled sentences are chosen 
+        when each document is read (see `_sampleSentences`).
+        """
+        self.sample = sample
+        self.sample_unit = sample_unit
+        self.sample_seed = sample_seed
+        self.sampled = {}
+        if sample is None:
+            return
+        if sample_unit not in ['document', 'sentence'] or not 0 < sample <= 1:
+            logger.error('cannot sample %s of %ss' % (sample, sample_unit))
+            sys.exit(1)
+        if self.shard_size:
+            logger.error('cannot split the documents of a sampled corpus into shards')
+            sys.exit(1)
+        if sample_unit == 'document':
+            keep = np.random.RandomState(sample_seed).random_sample(len(self.docs)) < sample
+            self.docs = [filename for filename, k in zip(self.docs, keep) if k]
+            logger.info('sampled %d documents' % len(self.docs))
+
+
     def setDwords(self, dic):
         """
         Replace the values of `self.dwords` for the new dictionary
@@ -121,6 +902,61 @@ class Corpus(object):
             logger.error('Cannot set drels. `dic` not an instance of DictRels')
 
 
+    def _reader(self, filename, mode='word', deps=False):
+        """
+        Open a document of the corpus to extract its words and tags.
+
+        Parameters:
+        -----------
+        filename : string
+            Name of the file in `self.dirin`
+        mode : string {'word', 'lemma'}, optional
+            Read words or lemmas
+        deps : boolean {True, False}, optional
+            Read also the dependencies of the sentences
+        """
+        return _reader(self.Parser, join(self.dirin, filename), mode=mode, deps=deps,
+                       sentences=self._sampleSentences(filename), **self.readopts)
+
+
+    def lemmaStats(self):
+        """
+        Return the statistics of the cache of lemmas used by `lex_mode='lemma'`
+        in the current process (see `lemmatizer.Lemmatizer.stats`). Lemmas of
+        documents read by other processes (`jobs > 1`) are not included.
+        """
+        return sharedLemmatizer().stats()
+
+
+    def _sampleSentences(self, filename):
+        """
+        Sample the sentences of a document when `self.sample_unit='sentence'`.
+
+        Parameters:
+        -----------
+        filename : string
+            Name of the file in `self.dirin`
+
+        Returns:
+        --------
+        sentences : array_like
+            List of ranges of the sampled sentences `(first, last)` or None 
+            when sentences are not sampled
+        """
+        if self.sample is None or self.sample_unit != 'sentence':
+            return None
+        if filename not in self.sampled:
+            index = SentenceIndex(join(self.dirin, filename), self.Parser, self.readopts['cache_dir'])
+            rand = np.random.RandomState([self.sample_seed, zlib.crc32(filename) & 0xffffffff])
+            ids = np.flatnonzero(rand.random_sample(len(index)) < self.sample)
+            # consecutive sentences are read as a single range
+            breaks = np.flatnonzero(np.diff(ids) > 1)
+            firsts = np.concatenate([ids[:1], ids[breaks+1]])
+            lasts = np.concatenate([ids[breaks], ids[-1:]]) + 1
+            self.sampled[filename] = zip(firsts.tolist(), lasts.tolist())
+        return self.sampled[filename]
+
+
     def _documents(self, lex_mode='word', cwords=True, ctw='njv', normalize=True, lower=False):
         """
         Extract the content from a list of documents yielding each document at time.
@@ -146,125 +982,1115 @@ class Corpus(object):
         -------
         doc : array_like
             A list containing all terms of the document
+
+        Notes:
+        ------
+        When `self.prefetch` is set, the next `self.prefetch` documents are read
+        by a pool of threads or processes while the current document is counted.
+        Documents are yielded in the order of `self.docs`.
         """
-        for filename in self.docs:
-            parser = self.Parser(join(self.dirin, filename), extract='WordsAndTags')
-            content = parser.document(content_words=cwords, ctw=ctw, normalize=normalize, lower=lower)
-            yield content
+        if not self.prefetch:
+            for filename in self.docs:
+                parser = self._reader(filename, lex_mode)
+                content = parser.document(content_words=cwords, ctw=ctw, normalize=normalize, lower=lower)
+                yield content
+            return
+
+        args = (cwords, ctw, normalize, lower)
+        workers = min(self.prefetch, cpu_count())
+        if self.prefetcher == 'thread':
+            pool = ThreadPool(processes=workers)
+        else:
+            pool = Pool(processes=workers)
+        pending = deque()
+        try:
+            for filename in self.docs:
+                readopts = dict(self.readopts, mode=lex_mode, sentences=self._sampleSentences(filename))
+                task = (self.Parser, join(self.dirin, filename), readopts, args)
+                pending.append(pool.apply_async(_readDocument, (task,)))
+                if len(pending) > self.prefetch:
+                    yield pending.popleft().get()
+            while pending:
+                yield pending.popleft().get()
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+
+
+    def _splitDocuments(self, docs):
+        """
+        Split the corpus into shards. A shard is a whole document or, when 
+        `self.shard_size` is set, a range of sentences containing about 
+        `self.shard_size` bytes of a larger document. Ranges of sentences
+        are found in the sentence index of the document (see `index.SentenceIndex`).
+        When sentences are sampled, each shard contains the sampled ranges of a 
+        document.
+
+        Parameters:
+        -----------
+        docs : array_like
+            List of the names of the documents
+
+        Returns:
+        --------
+        shards : array_like
+            List of tuples `(k, sentences)` where `k` is the position of the 
+            document in `docs` and `sentences` is None or a list containing 
+            the range of sentences `(first, last)` of the shard.
+        """
+        shards = []
+        for k, filename in enumerate(docs):
+            path = join(self.dirin, filename)
+            sample = self._sampleSentences(filename)
+            if sample is not None:
+                shards.append((k, sample))
+                continue
+            if self.shard_size and os.path.getsize(path) > self.shard_size and not isCompressed(path):
+                index = SentenceIndex(path, self.Parser, self.readopts['cache_dir'])
+                ranges = index.split(self.shard_size)
+                if ranges:
+                    shards.extend((k, [r]) for r in ranges)
+                    continue
+            shards.append((k, None))
+        return shards
+
+
+    def _shards(self, shard, jobs, docs=None, mode='word', **settings):
+        """
+        Distribute the shards of the corpus over a pool of processes, 
+        yielding the partial counts of each shard in the order of the 
+        documents in `self.docs`. With a single process, shards are 
+        extracted in the current process.
+
+        Parameters:
+        -----------
+        shard : function
+            Function that extracts the counts of the t-th shard
+        jobs : int
+            Number of processes of the pool, limited to the number of shards
+        docs : array_like, optional
+            Names of the documents to be extracted, `self.docs` by default
+        mode : string {'word', 'lemma'}, optional
+            Read words or lemmas of the documents
+
+        Yields:
+        -------
+        k : int
+            The position of the document of the shard in `docs`
+        partial : tuple
+            The partial counts generated by `shard` for each shard
+        """
+        if docs is None:
+            docs = self.docs
+        self._warnPrefetch()
+        shards = self._splitDocuments(docs)
+        jobs = min(jobs, max(len(shards), 1))
+        last = [t == len(shards)-1 or shards[t+1][0] != k for t, (k, _) in enumerate(shards)]
+        settings.setdefault('vocab', None)
+        settings.update({'parser': self.Parser, 'dirin': self.dirin, 'docs': docs, 
+                         'readopts': dict(self.readopts, mode=mode), 'shards': shards, 'last': last,
+                         'encode': self.encode})
+        if jobs == 1:
+            _initShard(settings)
+            for t in xrange(len(shards)):
+                yield shards[t][0], shard(t)
+            return
+        logger.info('extracting %d files (%d shards) using %d processes' % (len(docs), len(shards), jobs))
+        pool = Pool(processes=jobs, initializer=_initShard, initargs=(settings,))
+        try:
+            for t, partial in enumerate(pool.imap(shard, xrange(len(shards)))):
+                yield shards[t][0], partial
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+
+
+    def _mergePartial(self, words, ctxs, rels, offset=0, seen=None):
+        """
+        Merge the partial counts of a shard into `self.dwords`, `self.dctxs`
+        and `self.drels`. As partial counts are merged in the order of the 
+        documents, words and contexts receive the same ids as in a serial 
+        extraction.
+
+        Parameters:
+        -----------
+        words : array_like
+            List of tuples `(id, word, freq)` sorted by `id`
+        ctxs : array_like
+            List of tuples `(id, context, freq)` sorted by `id`
+        rels : array_like
+            List of tuples `(idw, idc, freq)` using the ids of the shard
+        offset : int, optional
+            Value added to integer contexts (e.g., the id of the first sentence)
+        seen : set, optional
+            Words already counted for the document of the shard. When given, 
+            the frequency of words is the document frequency, i.e., words 
+            are counted once per document.
+
+        Returns:
+        --------
+        mapw, mapc : dict
+            Dictionaries mapping the ids of the shard to the ids of `self.dwords`
+            and `self.dctxs`
+        """
+        mapw = {}
+        for idw, word, f in words:
+            if seen is None:
+                self.dwords[word] = f
+            elif word not in seen:
+                self.dwords[word] = 1
+                seen.add(word)
+            mapw[idw], _ = self.dwords[word]
+        mapc = {}
+        encoded = isinstance(self.dctxs, dictionaries.DictContexts)
+        for idc, ctx, f in ctxs:
+            if offset:
+                ctx += offset
+            elif encoded and isinstance(ctx, basestring):
+                ctx = self.dctxs.encode(ctx)
+            self.dctxs[ctx] = f
+            mapc[idc], _ = self.dctxs[ctx]
+        for idw, idc, f in rels:
+            self.drels[(mapw[idw], mapc[idc])] = f
+        return mapw, mapc
+
+
+    def _subtractCounts(self, words, ctxs, rels):
+        """
+        Subtract counts from `self.dwords`, `self.dctxs` and `self.drels`, 
+        removing the elements whose frequency reaches zero.
+
+        Parameters:
+        -----------
+        words : array_like
+            List of tuples `(idw, freq)`
+        ctxs : array_like
+            List of tuples `(idc, freq)`
+        rels : array_like
+            List of tuples `(idw, idc, freq)`
+        """
+        for dic, counts in [(self.dwords, words), (self.dctxs, ctxs)]:
+            dic_t = dic.id2key()
+            for id, f in counts:
+                key, _ = dic_t[id]
+                dic[key] = -f
+                if dic.getFreq(key) <= 0:
+                    del dic[key]
+            dic.dict_t = {}
+        for idw, idc, f in rels:
+            self.drels[(idw, idc)] = -f
+            if self.drels[(idw, idc)] <= 0:
+                del self.drels[(idw, idc)]
+
+
+    def _jobs(self, jobs):
+        """
+        Return the number of processes used to extract the corpus, being
+        all available CPUs when `jobs` is lower than one. Processes are not
+        more than the documents, unless documents are split into shards
+        (see `_shards`).
+        """
+        if jobs is None:
+            return 1
+        if jobs < 1:
+            jobs = cpu_count()
+        if self.shard_size:
+            return jobs
+        return min(jobs, max(len(self.docs), 1))
+
+
+    def _relationsBudget(self):
+        """
+        Return the approximate number of bytes available to `self.drels`, i.e., 
+        `self.memory_limit` minus the bytes used by the vocabularies of words and
+        contexts, which are not spilled. At least a quarter of the limit is kept 
+        for relations, thus large vocabularies do not spill a few relations at 
+        each check.
+        """
+        vocabs = (len(self.dwords) + len(self.dctxs)) * _WORD_BYTES
+        return max(self.memory_limit - vocabs, self.memory_limit / 4)
+
+
+    def _checkMemory(self):
+        """
+        Spill the relations into sorted runs on disk in case the relations
+        exceed their budget of `self.memory_limit` (see `_relationsBudget`). 
+        `self.drels` is emptied in place, thus functions holding a reference 
+        to it keep counting relations. Runs are compacted when they reach
+        `external.ExternalRels.max_runs`.
+        """
+        if not self.memory_limit or type(self.drels) is not dictionaries.DictRels:
+            return
+        if isinstance(self.dctxs, dictionaries.DictHashed) or not len(self.drels):
+            return
+        if len(self.drels) * _REL_BYTES < self._relationsBudget():
+            return
+        logger.info('memory limit reached: spilling %d relations' % len(self.drels))
+        if self.spill is None:
+            self.spill = ExternalRels(tmpdir=self.spill_dir)
+        for key, f in self.drels.iteritems():
+            self.spill[key] = f
+        self.spill.flush()
+        dict.clear(self.drels)
+
+
+    def _mergeSpill(self):
+        """
+        Merge the spilled relations into `self.drels`. Relations counted on disk
+        by `extractWindow(external=...)` are loaded into a DictRels, since weights
+        and filters need the relations in memory.
+        """
+        if isinstance(self.drels, ExternalRels):
+            logger.info('loading relations counted on disk')
+            drels = self.drels.toDict()
+            self.drels.close()
+            self.drels = drels
+        if self.spill is None:
+            return
+        logger.info('merging spilled relations')
+        for idw, idc, f in self.spill.dic2Tuples():
+            self.drels[(idw, idc)] = f
+        self.spill.close()
+        self.spill = None
+
+
+    def _windowContexts(self):
+        """
+        Replace an empty `self.dctxs` by a dictionary of encoded contexts 
+        in case of `encode_contexts=True`.
+        """
+        if self.encode and not len(self.dctxs) and type(self.dctxs) is dictionaries.DictWords:
+            self.dctxs = dictionaries.DictContexts()
+
+
+    def _emptyContexts(self):
+        """
+        Return an empty dictionary of contexts, hashing contexts in case of 
+        `hash_contexts` is set.
+        """
+        if self.hash_bits:
+            return dictionaries.DictHashed(bits=self.hash_bits, sample=self.hash_sample)
+        return dictionaries.DictWords()
+
+
+    def _extractHashed(self, extract, *args):
+        """
+        Call the function `extract` hashing the contexts into `self.dctxs` and
+        folding the relations of each bucket at the end of the extraction.
+        Contexts already in `self.dctxs` must be buckets of a previous extraction.
+
+        Parameters:
+        -----------
+        extract : function
+            Method of the corpus that extracts relations
+        args : array_like
+            Arguments of `extract`
+        """
+        dctxs = self._emptyContexts()
+        for b, value in self.dctxs.iteritems():
+            dict.__setitem__(dctxs, b, value)
+        dctxs.reverse = self.contexts_sample
+        self.dctxs = dctxs
+        try:
+            result = extract(*args)
+        finally:
+            self._foldContexts()
+        if isinstance(result, dict):
+            for corpus in result.values():
+                corpus._foldContexts()
+        return result
+
+
+    def _foldContexts(self):
+        """
+        Replace a dictionary of hashed contexts by a dictionary of buckets.
+        Relations were counted using the ids of the buckets, thus they are kept.
+        """
+        if not isinstance(self.dctxs, dictionaries.DictHashed):
+            return
+        self.contexts_sample = self.dctxs.reverse
+        self.dctxs = self.dctxs.folded()
+
+
+    def decodeContexts(self, replace=False):
+        """
+        Decode the contexts of `self.dctxs` into strings in the form `word#pos-dir`,
+        keeping their ids and frequencies.
+
+        Parameters:
+        -----------
+        replace : boolean {True, False}, optional
+            Replace `self.dctxs` by the dictionary of decoded contexts
+
+        Returns:
+        --------
+        dctxs : dictionaries.DictWords
+            Dictionary of decoded contexts. `self.dctxs` is returned in case
+            its contexts are not encoded.
+        """
+        if not isinstance(self.dctxs, dictionaries.DictContexts):
+            return self.dctxs
+        dctxs = self.dctxs.decoded()
+        if replace:
+            self.dctxs = dctxs
+        return dctxs
+
+
+    def vocabulary(self, min_tf=None, topN=None, cwords=True, ctw='njv', normalize=True, lower=False, jobs=1,
+                   lex_mode='word'):
+        """
+        Count the frequency of the words of the corpus, returning the words
+        that occur at least `min_tf` times and/or the `topN` most frequent words.
+
+        Parameters:
+        -----------
+        min_tf : int, optional
+            Minimum frequency of the words in the vocabulary
+        topN : int, optional
+            Number of the most frequent words kept in the vocabulary. Words
+            with the same frequency are sorted alphabetically.
+        jobs : int, optional
+            Number of processes used to count the words of the corpus.
+            `jobs=0` uses all available CPUs.
+        lex_mode : string {'word','lemma'}, optional
+            Count words or lemmas
+
+        Returns:
+        --------
+        vocab : set
+            Set containing the words of the vocabulary
+        """
+        counts = defaultdict(int)
+        args = (cwords, ctw, normalize, lower)
+        for _, partial in self._shards(_shardUnigrams, self._jobs(jobs), mode=lex_mode, args=args):
+            for word, f in partial.iteritems():
+                counts[word] += f
+        words = [(word, f) for word, f in counts.iteritems() if min_tf is None or f >= min_tf]
+        if topN is not None:
+            words = sorted(words, key=lambda (word, f): (-f, word))[:topN]
+        logger.info('vocabulary reduced from %d to %d words' % (len(counts), len(words)))
+        return set(word for word, _ in words)
 
 
-    def extractWindow(self, size=5, lex_mode='word', cwords=True, ctw='njv', normalize=True, lower=False):
+    def extractWindow(self, size=5, lex_mode='word', cwords=True, ctw='njv', normalize=True, lower=False, 
+                      jobs=1, stream=False, boundary=None, engine='python', min_tf=None, topN=None,
+                      sketch=None, external=None, checkpoint=None, checkpoint_files=100, 
+                      checkpoint_seconds=None, resume=False):
         """
         Extract terms from the corpus using a window size equals to `size`.
 
         Parameters:
         -----------
-        size : integer
+        size : integer or array_like
             The size of the window that the content is extracted. E.g., ``size=5``
             means a window with two words before and two words after the target word.
+            When `size` is a list of sizes, all windows are extracted in a single 
+            pass over the corpus (see Returns).
+        jobs : int, optional
+            Number of processes used to extract the files of the corpus. Each
+            process counts the relations of a file and the counts are merged
+            into the final dictionaries. `jobs=0` uses all available CPUs.
+        stream : boolean {True, False}, optional
+            Stream the terms of each sentence through a window that keeps only
+            `size` terms in memory instead of loading the whole corpus.
+        boundary : string {None, 'document', 'sentence'}, optional
+            Border that windows cannot cross. `None` allows windows to cross 
+            documents and sentences. Setting a boundary implies `stream=True`.
+        engine : string {'python', 'numpy'}, optional
+            Kernel used to count the relations. `numpy` encodes the terms as 
+            arrays of ids and PoS codes and counts all pairs of the window at 
+            once, producing the same dictionaries as `python`.
+        min_tf : int, optional
+            Minimum frequency of target words and contexts. When `min_tf` or `topN`
+            is set, a first pass over the corpus counts the frequency of words 
+            (see `vocabulary`) and only relations between words of the vocabulary 
+            are counted. Pruned words keep their positions in the windows.
+        topN : int, optional
+            Number of the most frequent words used as target words and contexts
+        sketch : dict, optional
+            Count relations approximately using a fixed amount of memory. `sketch`
+            contains the keyword arguments of `sketch.CountMinSketch` (e.g., 
+            `{'memory': 2**28, 'topk': 10**6}`). Relations are counted in a 
+            count-min sketch and `self.drels` receives only the `topk` most 
+            frequent relations with their estimated frequencies. Estimates exceed
+            the exact frequency by at most `e * N / width` with probability 
+            `1 - exp(-depth)`, where `N` is the number of relations. Words and 
+            contexts are counted exactly.
+        external : dict, optional
+            Count relations on disk when they do not fit in memory. `external` 
+            contains the keyword arguments of `external.ExternalRels` (e.g., 
+            `{'tmpdir': '/scratch', 'chunk': 10**7}`). Relations are written into 
+            sorted runs and `self.drels` is replaced by the `ExternalRels` that
+            merges the runs when saved (see `save`) or transformed into a sparse
+            matrix (see `ExternalRels.toMatrix`). Weights and filters load the 
+            merged relations into memory.
+        checkpoint : string, optional
+            Path to a SQLite database where the dictionaries, the processed files 
+            and the terms waiting in the window are saved during the extraction.
+            Setting a checkpoint implies `stream=True` and a single process.
+        checkpoint_files : int, optional
+            Number of files processed between checkpoints
+        checkpoint_seconds : int, optional
+            Number of seconds between checkpoints
+        resume : boolean {True, False}, optional
+            Load the dictionaries from `checkpoint` and continue the extraction 
+            after the last processed file. The settings of the extraction must
+            be the same of the checkpoint.
+
+        Returns:
+        --------
+        windows : dict
+            Only returned when `size` is a list. Dictionary containing a `Corpus` 
+            for each size in the form `{size: Corpus}`, each one containing the 
+            same dictionaries as calling `extractWindow` with that size. The 
+            dictionaries of the corpus itself are not modified.
 
         Notes:
         ------
         Contexts are extracted as `word#pos-r` if the context is on the left of the 
         target word and `word#pos-l` is the context is on the right of the target word. 
         Target word is represented as `tword` and context word is represented as  `cword`. 
+        The output of a parallel extraction is the same of a serial extraction, since the
+        window of the last terms of a file is filled with the first terms of the next files.
+        """
+        self._checkWindow(size, jobs, boundary, engine, sketch, external, checkpoint)
+        extract = (size, lex_mode, cwords, ctw, normalize, lower, jobs, stream, boundary, engine, min_tf, topN)
+        if self.hash_bits and not isinstance(self.dctxs, dictionaries.DictHashed):
+            return self._extractHashed(self.extractWindow, *extract)
+        if external is not None:
+            return self._extractExternal(external, extract)
+        if sketch is not None:
+            return self._extractSketch(sketch, extract)
+        jobs = self._jobs(jobs)
+        self._windowContexts()
+        vocab = None
+        if min_tf is not None or topN is not None:
+            vocab = self.vocabulary(min_tf, topN, cwords, ctw, normalize, lower, jobs, lex_mode)
+        args = (cwords, ctw, normalize, lower)
+        if isinstance(size, (list, tuple)):
+            return self._extractWindows(size, args, jobs, stream, boundary, engine, vocab, lex_mode)
+        if checkpoint is not None:
+            settings = {'size': int(size), 'lex_mode': lex_mode, 'cwords': cwords, 'ctw': ctw, 
+                        'normalize': normalize, 'lower': lower, 'boundary': boundary, 
+                        'engine': engine, 'min_tf': min_tf, 'topN': topN}
+            self._extractCheckpoint(_windowSide(size), args, boundary, engine, vocab, checkpoint, 
+                                    checkpoint_files, checkpoint_seconds, resume, settings)
+        elif not _isWindowed(size):
+            if jobs > 1 or stream or boundary:
+                logger.warning('window of size `%s` cannot be streamed or split into files' % size)
+            self._windowMemory([self], [None], args, engine, vocab, lex_mode)
+        else:
+            self._countWindows([self], [_windowSide(size)], args, jobs, stream, boundary, engine, vocab, 
+                               lex_mode)
+
+
+    def _checkWindow(self, size, jobs, boundary, engine, sketch, external, checkpoint):
+        """
+        Check the arguments of `extractWindow`, rejecting the arguments that 
+        cannot be used together.
+        """
+        sizes = isinstance(size, (list, tuple))
+        if boundary not in [None, 'document', 'sentence']:
+            logger.error('cannot extract window with boundary: %s' % boundary)
+            sys.exit(1)
+        if engine not in _KERNELS:
+            logger.error('cannot extract window with engine: %s' % engine)
+            sys.exit(1)
+        if sketch is not None and (sizes or self.hash_bits):
+            logger.error('cannot extract many window sizes or hashed contexts using a sketch')
+            sys.exit(1)
+        if external is not None and (sizes or sketch is not None or self.hash_bits):
+            logger.error('cannot count relations on disk with many sizes, sketch or hashed contexts')
+            sys.exit(1)
+        if checkpoint is not None:
+            if sizes or sketch is not None or external is not None or self.hash_bits:
+                logger.error('cannot checkpoint extractions with many sizes, sketch, external or hashed contexts')
+                sys.exit(1)
+            if not _isWindowed(size):
+                logger.error('cannot checkpoint window of size: %s' % size)
+                sys.exit(1)
+            if self._jobs(jobs) > 1:
+                logger.error('cannot checkpoint extractions using many processes')
+                sys.exit(1)
+            if self.prefetch:
+                logger.error('cannot prefetch documents of checkpointed extractions')
+                sys.exit(1)
+
+
+    def _extractExternal(self, external, extract):
+        """
+        Call `extractWindow` with the arguments `extract` counting the relations 
+        on disk (see `extractWindow`).
+        """
+        if isinstance(self.drels, ExternalRels):
+            drels = self.drels
+        else:
+            drels = ExternalRels(**external)
+            for key, f in self.drels.iteritems():
+                drels[key] = f
+        self.drels, previous = drels, self.drels
+        try:
+            self.extractWindow(*extract)
+            self.drels.flush()
+        except:
+            if drels is not previous:
+                drels.close()
+            self.drels = previous
+            raise
+
+
+    def _extractSketch(self, sketch, extract):
+        """
+        Call `extractWindow` with the arguments `extract` counting the relations
+        in a count-min sketch, keeping only the heavy hitters (see `extractWindow`).
+        """
+        drels = self.drels
+        self.drels = CountMinSketch(**sketch)
+        try:
+            self.extractWindow(*extract)
+            for key, f in self.drels.heavyHitters().iteritems():
+                drels[key] = f
+        finally:
+            self.drels = drels
+
+
+    def _countWindows(self, corpora, ns, args, jobs, stream, boundary, engine, vocab, mode='word'):
+        """
+        Count the window relations of the corpus into the dictionaries of each
+        corpus of `corpora`, whose window has `ns[k]` terms in each side. The 
+        relations are counted by a pool of processes, by windows streamed over 
+        the sentences or by a kernel applied to the whole corpus. Documents are
+        read in the lexical `mode` ('word' or 'lemma').
+        """
+        if jobs > 1:
+            self._windowShards(corpora, ns, args, boundary, engine, vocab, jobs, mode)
+        elif stream or boundary or self.memory_limit:
+            self._windowStream(corpora, ns, args, boundary, engine, vocab, mode)
+        else:
+            self._windowMemory(corpora, ns, args, engine, vocab, mode)
+
+
+    def _windowShards(self, corpora, ns, args, boundary, engine, vocab, jobs, mode='word'):
+        """
+        Count the window relations of the shards of the corpus in `jobs` processes 
+        (see `_countWindows`). The memory limit bounds the counts merged from
+        the processes, while each process keeps the counts of a whole shard.
+        """
+        if self.memory_limit and not self.shard_size:
+            logger.warning('memory limit does not bound the counts of a file in a process: set shard_size')
+        shards = self._shards(_shardWindow, jobs, mode=mode, n=ns, args=args, boundary=boundary, 
+                              engine=engine, vocab=vocab)
+        for _, partials in shards:
+            for corpus, (words, ctxs, rels) in zip(corpora, partials):
+                corpus._mergePartial(words, ctxs, rels)
+                corpus._checkMemory()
+
+
+    def _windowStream(self, corpora, ns, args, boundary, engine, vocab, mode='word'):
+        """
+        Count the window relations streaming the sentences of the corpus through 
+        windows that do not cross `boundary` (see `_countWindows`).
+        """
+        self._warnPrefetch()
+        streams = [WindowStream(n, c.dwords, c.dctxs, c.drels, engine=engine) for n, c in zip(ns, corpora)]
+        for filename in self.docs:
+            for terms in _sentenceTerms(self._reader(filename, mode), *args, vocab=vocab):
+                for window in streams:
+                    window.add(terms)
+                    if boundary == 'sentence':
+                        window.flush()
+                for corpus in corpora:
+                    corpus._checkMemory()
+            if boundary == 'document':
+                for window in streams:
+                    window.flush()
+        for window in streams:
+            window.flush()
+
+
+    def _windowMemory(self, corpora, ns, args, engine, vocab, mode='word'):
+        """
+        Count the window relations of all terms of the corpus at once (see 
+        `_countWindows`). A window of `None` terms contains the whole corpus.
         """
-        d = self._documents(lex_mode, cwords, ctw, normalize, lower)
         doc = []
-        for content in d:
+        for content in self._documents(mode, *args):
             doc.extend(content)
+        if vocab is not None:
+            doc = _pruneTerms(doc, vocab)
+        for corpus, n in zip(corpora, ns):
+            _KERNELS[engine](doc, len(doc) if n is None else n, corpus.dwords, corpus.dctxs, corpus.drels)
 
-        # create self.dwords, self.dctxs and self.drels
-        if isinstance(size, int) or size.isdigit():
-            n = (int(size)-1)/2
-        else:
-            n = len(doc)
-
-        for i in xrange(0, len(doc)):
-            for j in xrange(i+1, i+n+1):
-                if j <= len(doc)-1:
-                    record = False
-                    if doc[i].pos == 'n' and doc[j].pos == 'v':
-                        tword = doc[i].word
-                        cword = doc[j].word+'#'+doc[j].pos+'-r'
-                        record = True
-                    elif doc[i].pos == 'v' and doc[j].pos == 'n':
-                        tword = doc[j].word
-                        cword = doc[i].word+'#'+doc[i].pos+'-l'
-                        record = True
-                    if doc[i].pos == 'n' and doc[j].pos == 'n':
-                        tword = doc[j].word
-                        cword = doc[i].word+'#'+doc[i].pos+'-l'
-                        self.dwords[tword] = 1
-                        self.dctxs[cword] = 1
-                        idt, _ = self.dwords[tword]
-                        idc, _ = self.dctxs[cword]
-                        self.drels[(idt, idc)] = 1
-                        tword = doc[i].word
-                        cword = doc[j].word+'#'+doc[j].pos+'-r'
-                        record = True
-                    if doc[i].pos == 'n' and doc[j].pos == 'j':
-                        tword = doc[i].word
-                        cword = doc[j].word+'#'+doc[j].pos+'-r'
-                        record = True
-                    elif doc[i].pos == 'j' and doc[j].pos == 'n':
-                        tword = doc[j].word
-                        cword = doc[i].word+'#'+doc[i].pos+'-l'
-                        record = True
-                    if record:
-                        self.dwords[tword] = 1
-                        self.dctxs[cword] = 1
-                        idt, _ = self.dwords[tword]
-                        idc, _ = self.dctxs[cword]
-                        self.drels[(idt, idc)] = 1
-
-
-    def extractDocument(self, lex_mode='word', cwords=True, ctw='n', normalize=True, lower=False):
+
+    def _saveCheckpoint(self, fout, settings, done, window):
+        """
+        Save the dictionaries, the first `done` files of the corpus and the terms
+        waiting in `window` into the database `fout`. The database is written
+        into a temporary file that replaces `fout`, thus a crash while saving
+        keeps the previous checkpoint.
+        """
+        window.flush(keep=min(window.n, len(window.window)))
+        tmp = '%s.%d' % (fout, os.getpid())
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        self.save(tmp)
+        db = SQLite(tmp)
+        db.saveSettings(dict(settings, window=[tuple(term) for term in window.window]))
+        db.addFiles([(filename,) + fileStat(join(self.dirin, filename)) + (None,) 
+                     for filename in self.docs[:done]])
+        db.close()
+        os.rename(tmp, fout)
+        logger.info('checkpoint: %d of %d files' % (done, len(self.docs)))
+
+
+    def _loadCheckpoint(self, fin, settings):
+        """
+        Load the dictionaries saved in the checkpoint `fin`.
+
+        Returns:
+        --------
+        done : int
+            Number of files of the corpus processed in the checkpoint
+        window : array_like
+            List of terms waiting in the window
+        """
+        db = SQLite(fin)
+        manifest = db.loadManifest()
+        stored = db.loadSettings()
+        db.close()
+        window = ast.literal_eval(stored.pop('window', '[]'))
+        if stored != dict((k, repr(v)) for k, v in settings.iteritems()):
+            logger.error('cannot resume %s: settings differ from the checkpoint' % fin)
+            sys.exit(1)
+        done = len(manifest)
+        if set(manifest) != set(self.docs[:done]):
+            logger.error('cannot resume %s: files differ from the checkpoint' % fin)
+            sys.exit(1)
+        self.load(fin)
+        logger.info('resuming after %d of %d files' % (done, len(self.docs)))
+        return done, [Term(word, pos) for word, pos in window]
+
+
+    def _extractCheckpoint(self, n, args, boundary, engine, vocab, fout, files, seconds, resume, settings):
+        """
+        Extract the window relations of the corpus saving checkpoints into `fout` 
+        every `files` files or every `seconds` seconds. Documents are read in the
+        lexical mode of `settings`. See `extractWindow`.
+        """
+        done, pending = 0, []
+        if resume and os.path.isfile(fout):
+            done, pending = self._loadCheckpoint(fout, settings)
+        window = WindowStream(n, self.dwords, self.dctxs, self.drels, engine=engine)
+        window.add(pending)
+        last = time.time()
+        for filename in self.docs[done:]:
+            for terms in _sentenceTerms(self._reader(filename, settings['lex_mode']), *args, vocab=vocab):
+                window.add(terms)
+                if boundary == 'sentence':
+                    window.flush()
+                self._checkMemory()
+            if boundary == 'document':
+                window.flush()
+            done += 1
+            if (files and done % files == 0) or (seconds and time.time() - last >= seconds):
+                self._saveCheckpoint(fout, settings, done, window)
+                last = time.time()
+        window.flush()
+        self._saveCheckpoint(fout, settings, done, window)
+
+
+    def _extractWindows(self, sizes, args, jobs, stream, boundary, engine, vocab=None, mode='word'):
+        """
+        Extract windows of many sizes reading the corpus only once. The terms 
+        of the corpus are counted by a window of each size, each one filling 
+        its own set of dictionaries. See `extractWindow`.
+
+        Returns:
+        --------
+        windows : dict
+            Dictionary containing a `Corpus` for each size in the form `{size: Corpus}`
+        """
+        for size in sizes:
+            if not _isWindowed(size):
+                logger.error('window of size `%s` cannot be extracted with other sizes' % size)
+                sys.exit(1)
+        windows = dict((size, self._representation()) for size in sizes)
+        corpora = [windows[size] for size in sizes]
+        for corpus in corpora:
+            corpus._windowContexts()
+        ns = [_windowSide(size) for size in sizes]
+        self._countWindows(corpora, ns, args, jobs, stream, boundary, engine, vocab, mode)
+        return windows
+
+
+    def extractDocument(self, lex_mode='word', cwords=True, ctw='n', normalize=True, lower=False, jobs=1):
         """
         Extract terms from the corpus using the whole document as window of cooccurrences.
 
+        Parameters:
+        -----------
+        jobs : int, optional
+            Number of processes used to extract the files of the corpus. 
+            `jobs=0` uses all available CPUs.
         """
+        if self.hash_bits and not isinstance(self.dctxs, dictionaries.DictHashed):
+            return self._extractHashed(self.extractDocument, lex_mode, cwords, ctw, normalize, lower, jobs)
+        jobs = self._jobs(jobs)
+        if jobs > 1:
+            args = (cwords, ctw, normalize, lower)
+            for _, (words, ctxs, rels) in self._shards(_shardDocument, jobs, mode=lex_mode, args=args):
+                self._mergePartial(words, ctxs, rels)
+                self._checkMemory()
+            return
+
         d = self._documents(lex_mode, cwords, ctw, normalize, lower)
-        doc = []
         for iddoc, content in enumerate(d):
-            for term, pos in content:
-                self.dwords[term] = 1
-                self.dctxs[iddoc] = 1
-                idt, _ = self.dwords[term]
-                idc, _ = self.dctxs[iddoc]
-                self.drels[(idt, idc)] = 1
+            _documentRelations(content, iddoc, self.dwords, self.dctxs, self.drels)
+            self._checkMemory()
 
 
-    def extractSentences(self, lex_mode='word', cwords=True, ctw='n', normalize=True, lower=False):
+    def extractSentences(self, lex_mode='word', cwords=True, ctw='n', normalize=True, lower=False, jobs=1):
         """
         Extract terms from the corpus using the whole document as window of cooccurrences.
 
+        Parameters:
+        -----------
+        jobs : int, optional
+            Number of processes used to extract the files of the corpus. 
+            `jobs=0` uses all available CPUs.
+
         Notes:
         ------
         In this function the `tf` value is changed by the `df` value in self.dwords. Thus, the 
         dictionary of words is composed by the word: (id, df), where `df` means the document 
         frequency.
         """
+        if self.hash_bits and not isinstance(self.dctxs, dictionaries.DictHashed):
+            return self._extractHashed(self.extractSentences, lex_mode, cwords, ctw, normalize, lower, jobs)
+        jobs = self._jobs(jobs)
+        if jobs > 1:
+            idsent = 0
+            current = None
+            args = (cwords, ctw, normalize, lower)
+            shards = self._shards(_shardSentences, jobs, mode=lex_mode, args=args)
+            for k, (words, ctxs, rels, nsents) in shards:
+                if k != current:
+                    current, seen = k, set()
+                self._mergePartial(words, ctxs, rels, offset=idsent, seen=seen)
+                idsent += nsents
+                self._checkMemory()
+            return
+
+        self._warnPrefetch()
         idsent = 0
         for filename in self.docs:
-            parser = self.Parser(join(self.dirin, filename), extract='WordsAndTags')
-            docwords = []
-            newwords = []
+            parser = self._reader(filename, lex_mode)
+            sentences = _sentenceTerms(parser, cwords, ctw, normalize, lower)
+            idsent = _sentenceRelations(sentences, idsent, self.dwords, self.dctxs, self.drels)
+            self._checkMemory()
+
+
+    def extractDependencies(self, lex_mode='word', cwords=True, ctw='njv', normalize=True, lower=False, 
+                            inverse=True, jobs=1):
+        """
+        Extract terms from the corpus using their syntactic dependencies as contexts.
+        Each dependency `relation(head, dependent)` between words of a sentence 
+        generates the context `relation:dependent` of the head and, when `inverse`
+        is True, the context `relation-1:head` of the dependent. E.g., `amod(ball, red)`
+        generates `amod:red` for `ball` and `amod-1:ball` for `red`.
+
+        Parameters:
+        -----------
+        cwords : boolean {True, False}, optional
+            Count only dependencies between content words of `ctw`
+        inverse : boolean {True, False}, optional
+            Count the inverse contexts of the dependents
+        jobs : int, optional
+            Number of processes used to extract the files of the corpus. 
+            `jobs=0` uses all available CPUs.
+
+        Notes:
+        ------
+        Each word is related only to the words connected to it by a dependency,
+        thus the dictionary of contexts is much smaller than the dictionary of
+        windows. Dependencies are read from the parsed files, thus the token
+        cache is not used.
+        """
+        if self.hash_bits and not isinstance(self.dctxs, dictionaries.DictHashed):
+            return self._extractHashed(self.extractDependencies, lex_mode, cwords, ctw, normalize, 
+                                       lower, inverse, jobs)
+        args = (cwords, ctw, normalize, lower, inverse)
+        jobs = self._jobs(jobs)
+        if jobs > 1:
+            for _, (words, ctxs, rels) in self._shards(_shardDependencies, jobs, mode=lex_mode, args=args):
+                self._mergePartial(words, ctxs, rels)
+                self._checkMemory()
+            return
+
+        self._warnPrefetch()
+        for filename in self.docs:
+            _dependencyRelations(self._reader(filename, lex_mode, deps=True), *(args + (self.dwords, self.dctxs, self.drels)))
+            self._checkMemory()
+
+
+    def _representation(self):
+        """
+        Return a copy of the corpus containing empty dictionaries.
+        """
+        corpus = copy.copy(self)
+        corpus.dwords = dictionaries.DictWords()
+        corpus.dctxs = self._emptyContexts()
+        corpus.drels = dictionaries.DictRels()
+        corpus.contexts_sample = {}
+        corpus.spill = None
+        return corpus
+
+
+    def extractRepresentations(self, window=None, document=None, sentences=None):
+        """
+        Extract the window, document and sentence representations of the corpus
+        reading the files only once. Each representation is stored in its own 
+        set of dictionaries.
+
+        Parameters:
+        -----------
+        window : dict, optional
+            Keyword arguments of `extractWindow` (`size`, `lex_mode`, `cwords`, `ctw`,
+            `normalize`, `lower`, `boundary` and `engine`). The window representation
+            is not extracted when `window` is None.
+        document : dict, optional
+            Keyword arguments of `extractDocument` (`lex_mode`, `cwords`, `ctw`, 
+            `normalize` and `lower`). The document representation is not extracted 
+            when `document` is None.
+        sentences : dict, optional
+            Keyword arguments of `extractSentences` (`lex_mode`, `cwords`, `ctw`, 
+            `normalize` and `lower`). The sentence representation is not extracted
+            when `sentences` is None.
+
+        Returns:
+        --------
+        representations : dict
+            Dictionary containing a `Corpus` for each extracted representation 
+            in the form:
+                {'window': Corpus, 'document': Corpus, 'sentences': Corpus}
+            Each `Corpus` contains the same dictionaries as calling the 
+            corresponding function on its own.
+
+        Notes:
+        ------
+        Windows are streamed through the corpus (see `extractWindow` with `stream=True`),
+        thus `size` must be a number. The terms of each sentence are extracted once for 
+        each distinct set of `cwords`, `ctw`, `normalize` and `lower`.
+        E.g., 
+            reprs = corpus.extractRepresentations(window={'size': 5}, document={'ctw': 'n'})
+            reprs['window'].weightRels(measure='ppmi')
+        """
+        fields = ['lex_mode', 'cwords', 'ctw', 'normalize', 'lower']
+        defaults = {'lex_mode': 'word', 'cwords': True, 'ctw': 'n', 'normalize': True, 'lower': False}
+        settings = {}
+        for name, kwargs, extra in [('window', window, {'size': 5, 'ctw': 'njv', 'boundary': None, 'engine': 'python'}),
+                                    ('document', document, {}),
+                                    ('sentences', sentences, {})]:
+            if kwargs is None:
+                continue
+            opts = dict(defaults, **extra)
+            for key in kwargs:
+                if key not in opts:
+                    logger.error('cannot extract %s representation with argument: %s' % (name, key))
+                    sys.exit(1)
+            opts.update(kwargs)
+            opts['args'] = tuple(opts[key] for key in fields[1:])
+            settings[name] = opts
+        modes = set(opts['lex_mode'] for opts in settings.values())
+        if len(modes) > 1:
+            logger.error('cannot extract representations of words and lemmas at once')
+            sys.exit(1)
+        mode = modes.pop() if modes else 'word'
+        if 'window' in settings:
+            opts = settings['window']
+            if not _isWindowed(opts['size']):
+                logger.error('window of size `%s` cannot be extracted with other representations' % opts['size'])
+                sys.exit(1)
+            self._checkWindow(opts['size'], 1, opts['boundary'], opts['engine'], None, None, None)
+
+        reprs = dict((name, self._representation()) for name in settings)
+        if 'window' in reprs:
+            wc = reprs['window']
+            wc._windowContexts()
+            boundary = settings['window']['boundary']
+            stream = WindowStream(_windowSide(settings['window']['size']), wc.dwords, wc.dctxs, 
+                                  wc.drels, engine=settings['window']['engine'])
+        self._warnPrefetch()
+        idsent = 0
+        for iddoc, filename in enumerate(self.docs):
+            parser = self._reader(filename, mode)
+            content = []
+            sents = []
             for _ in parser:
-                content = parser.listOfTerms(content_words=cwords, ctw=ctw, normalize=normalize, lower=lower)
-                for term, pos in content:
-                    if not self.dwords.has_key(term):
-                        self.dwords[term] = 1
-                        newwords.append(term)
-                    docwords.append(term)
-                    self.dctxs[idsent] = 1
-                    idt, _ = self.dwords[term]
-                    idc, _ = self.dctxs[idsent]
-                    self.drels[(idt, idc)] = 1
-                idsent += 1
-            t_indoc = set(docwords) - set(newwords)
-            for word in t_indoc:
-                self.dwords[word] = 1
+                sterms = {}
+                for opts in settings.values():
+                    if opts['args'] not in sterms:
+                        sterms[opts['args']] = parser.listOfTerms(*opts['args'])
+                if 'window' in reprs:
+                    stream.add(sterms[settings['window']['args']])
+                    if boundary == 'sentence':
+                        stream.flush()
+                if 'document' in reprs:
+                    content.extend(sterms[settings['document']['args']])
+                if 'sentences' in reprs:
+                    sents.append(sterms[settings['sentences']['args']])
+            if 'window' in reprs and boundary == 'document':
+                stream.flush()
+            if 'document' in reprs:
+                dc = reprs['document']
+                _documentRelations(content, iddoc, dc.dwords, dc.dctxs, dc.drels)
+            if 'sentences' in reprs:
+                sc = reprs['sentences']
+                idsent = _sentenceRelations(sents, idsent, sc.dwords, sc.dctxs, sc.drels)
+        if 'window' in reprs:
+            stream.flush()
+        for corpus in reprs.values():
+            corpus._foldContexts()
+        return reprs
+
+
+    def update(self, fdb, size=5, lex_mode='word', cwords=True, ctw='njv', normalize=True, lower=False, 
+               jobs=1, engine='python'):
+        """
+        Update the dictionaries of windows stored in the database `fdb` with the 
+        current content of the corpus. The database keeps a manifest of the 
+        processed files (path, size, modification time and hash) and the counts
+        contributed by each file. Only new and changed files are extracted and 
+        the counts of removed and changed files are subtracted. The updated 
+        dictionaries are stored in `fdb` and kept in `self.dwords`, `self.dctxs` 
+        and `self.drels`.
+
+        Parameters:
+        -----------
+        fdb : string
+            Path to the SQLite database, created in the first update
+        size : integer
+            The size of the window (see `extractWindow`)
+        jobs : int, optional
+            Number of processes used to extract the files
+        engine : string {'python', 'numpy'}, optional
+            Kernel used to count the relations (see `extractWindow`)
+
+        Notes:
+        ------
+        As the counts of each file must be independent of the other files, windows
+        do not cross documents, i.e., the counts are the same of 
+        `extractWindow(boundary='document')`. The settings of the extraction are
+        stored in the database and cannot change between updates. The update is
+        written into a copy of `fdb` that replaces it at the end, thus an update 
+        that stops before the end keeps the previous database.
+        """
+        if not _isWindowed(size):
+            logger.error('cannot update window of size: %s' % size)
+            sys.exit(1)
+        if self.sample is not None:
+            logger.error('cannot update a sampled corpus')
+            sys.exit(1)
+        if self.hash_bits:
+            logger.error('cannot update a corpus of hashed contexts')
+            sys.exit(1)
+        settings = {'size': int(size), 'lex_mode': lex_mode, 'cwords': cwords, 'ctw': ctw, 
+                    'normalize': normalize, 'lower': lower}
+        tmp = '%s.%d' % (fdb, os.getpid())
+        if os.path.isfile(fdb):
+            shutil.copyfile(fdb, tmp)
+        elif os.path.exists(tmp):
+            os.remove(tmp)
+        db = SQLite(tmp)
+        manifest = db.loadManifest()
+        self.dwords = dictionaries.DictWords()
+        self.dctxs = dictionaries.DictWords()
+        self.drels = dictionaries.DictRels()
+        self._windowContexts()
+        if manifest:
+            if db.loadSettings() != dict((k, repr(v)) for k, v in settings.iteritems()):
+                logger.error('cannot update %s: settings differ from the stored extraction' % fdb)
+                sys.exit(1)
+            self.load(tmp)
+        else:
+            db.saveSettings(settings)
+
+        extract = []
+        for filename in self.docs:
+            fsize, mtime = fileStat(join(self.dirin, filename))
+            if manifest.has_key(filename):
+                idf, osize, omtime, osha = manifest.pop(filename)
+                if (fsize, mtime) == (osize, omtime):
+                    continue
+                sha = fileHash(join(self.dirin, filename))
+                if sha == osha:
+                    db.touchFile(idf, mtime)
+                    continue
+                logger.info('file changed: %s' % filename)
+                self._subtractCounts(*db.loadFileCounts(idf))
+                db.removeFile(idf)
+            else:
+                sha = fileHash(join(self.dirin, filename))
+            extract.append((filename, fsize, mtime, sha))
+        # remaining files of the manifest were removed from the corpus
+        for filename in manifest:
+            logger.info('file removed: %s' % filename)
+            idf = manifest[filename][0]
+            self._subtractCounts(*db.loadFileCounts(idf))
+            db.removeFile(idf)
+
+        logger.info('updating %d files' % len(extract))
+        docs = [filename for filename, _, _, _ in extract]
+        args = (cwords, ctw, normalize, lower)
+        shards = self._shards(_shardWindow, self._jobs(jobs), docs=docs, mode=lex_mode, 
+                              n=_windowSide(size), args=args, boundary='document', engine=engine)
+        # counts of each file are summed over its shards
+        current = None
+        for k, (words, ctxs, rels) in shards:
+            if k != current:
+                if current is not None:
+                    self._recordFile(db, extract[current], *fcounts)
+                current = k
+                fcounts = (defaultdict(int), defaultdict(int), defaultdict(int))
+            mapw, mapc = self._mergePartial(words, ctxs, rels)
+            for idw, _, f in words:
+                fcounts[0][mapw[idw]] += f
+            for idc, _, f in ctxs:
+                fcounts[1][mapc[idc]] += f
+            for idw, idc, f in rels:
+                fcounts[2][(mapw[idw], mapc[idc])] += f
+        if current is not None:
+            self._recordFile(db, extract[current], *fcounts)
+        db.close()
+        self.save(tmp)
+        os.rename(tmp, fdb)
+
+
+    def _recordFile(self, db, entry, words, ctxs, rels):
+        """
+        Add a file to the manifest of `db` with the counts it contributed to 
+        the dictionaries.
+
+        Parameters:
+        -----------
+        db : storage.SQLite
+            Database of the update
+        entry : tuple
+            Tuple `(path, size, mtime, sha1)` of the file
+        words, ctxs : dict
+            Dictionaries in the form `id: freq`
+        rels : dict
+            Dictionary in the form `(idw, idc): freq`
+        """
+        idf = db.addFile(*entry)
+        db.saveFileCounts(idf, words.items(), ctxs.items(), 
+                          [(idw, idc, f) for (idw, idc), f in rels.iteritems()])
 
 
     def _calculateFrequencies(self):
@@ -283,6 +2109,7 @@ class Corpus(object):
         sum_rels : int
             Sum of the number of relations
         """
+        self._mergeSpill()
         dw = {}
         dc = {}
         nb_rels = 0
@@ -316,6 +2143,7 @@ class Corpus(object):
         if measure not in ['pmi', 'ppmi', 'lmi']:
              logger.error('cannot build dictionary: %s' % measure)
              sys.exit(1)
+        self._mergeSpill()
         self.dwords_t = self.dwords.id2key()
         self.dctxs_t = self.dctxs.id2key()
         dweights = dictionaries.DictRels()
@@ -382,7 +2210,8 @@ class Corpus(object):
         if measure not in ['entropy']:
              logger.error('cannot build dictionary: %s' % measure)
              sys.exit(1)
-        dctxs_t = self.dctxs.id2key()
+        self._mergeSpill()
+        dctxs_t = self.decodeContexts().id2key()
         dweights = dictionaries.DictWords()
 
         dlist = self.drels.dic2List(transposed=True)
@@ -416,7 +2245,17 @@ class Corpus(object):
         """
         self.dwords.save(fout, dtype='dwords', mode=mode, new=new)
         self.dctxs.save(fout, dtype='dctxs', mode=mode)
-        self.drels.save(fout, dtype='drels', mode=mode)
+        if isinstance(self.drels, ExternalRels) and mode == 'db':
+            self.drels.save(fout, dtype='drels', mode=mode)
+        elif self.spill is not None and mode == 'db':
+            # stream the spilled relations merged with the relations in memory
+            for key, f in self.drels.iteritems():
+                self.spill[key] = f
+            dict.clear(self.drels)
+            self.spill.save(fout, dtype='drels', mode=mode)
+        else:
+            self._mergeSpill()
+            self.drels.save(fout, dtype='drels', mode=mode)
 
 
     def load(self, fin, mode='db'):
@@ -434,7 +2273,13 @@ class Corpus(object):
         """
         self.dwords.load(fin, dname='dwords', mode=mode)
         self.dctxs.load(fin, dname='dctxs', mode=mode)
+        if isinstance(self.drels, ExternalRels):
+            self.drels.close()
+            self.drels = dictionaries.DictRels()
         self.drels.load(fin, dname='drels', mode=mode)
+        if self.spill is not None:
+            self.spill.close()
+            self.spill = None
 
 
     def filterDictionaries(self, dwf, startid=1):
@@ -454,7 +2299,8 @@ class Corpus(object):
         `self.dctxs` is replaced by `dcfl`
         `self.drels` is replaced by `drfl`
         """
-        dwfl, dcfl, drfl = filters.filterDictionaries(self.dwords, self.dctxs, 
+        self._mergeSpill()
+        dwfl, dcfl, drfl = filters.filterDictionaries(self.dwords, self.decodeContexts(), 
                                                       self.drels, dwf, startid=startid)
 
         self.dwords = dwfl
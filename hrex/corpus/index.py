@@ -0,0 +1,143 @@
+#!/usr/bin/python
+#-*- coding: utf-8 -*-
+
+"""
+This module contains an index of the sentences of parsed files. The index
+records the byte offset where each sentence starts, allowing to read any
+sentence of a file by random access and to split a huge file among many
+processes. The index is stored in a sidecar file (`<file>.idx`) containing
+int64 values:
+    [MAGIC, size of the file, modification time (us), offset_0, ..., offset_n]
+where `offset_i` is the offset of the i-th sentence and `offset_n` is the
+offset of the end of the last sentence.
+
+@author: granada
+"""
+import os
+import sys
+sys.path.insert(0, '..') # This line is inserted to find the package utils.arguments
+
+import logging
+logger = logging.getLogger('corpus.index')
+logging.basicConfig(format='%(asctime)s : %(levelname)s : %(message)s', level=logging.INFO)
+
+import numpy as np
+
+from utils.fileutils import sidecarPath
+
+MAGIC = 0x3158444958455248 # 'HREXIDX1'
+EXTENSION = '.idx'
+
+
+class SentenceIndex(object):
+    """
+    Class containing the offsets of the sentences of a parsed file.
+    """
+    def __init__(self, input, Parser, cache_dir=None):
+        """
+        Load the index of `input`, building it in case the sidecar does
+        not exist or is outdated.
+
+        Parameters:
+        -----------
+        input : string
+            Path to the parsed file
+        Parser : ParserInterface class
+            Class used to find the offsets of the sentences (see
+            `ParserInterface.sentenceOffsets`)
+        cache_dir : string, optional
+            Folder where the sidecar is written. The sidecar is written next
+            to the parsed file by default.
+
+        Notes:
+        ------
+        self.offsets : numpy.ndarray
+            Offsets of the sentences followed by the end of the last sentence
+        """
+        self.input = input
+        self.findex = sidecarPath(input, EXTENSION, cache_dir)
+        self.Parser = Parser
+        self.offsets = self._load()
+        if self.offsets is None:
+            self.offsets = self.build()
+
+
+    def _stat(self):
+        """
+        Return the size and the modification time (in microseconds) of the file.
+        """
+        st = os.stat(self.input)
+        return st.st_size, int(st.st_mtime * 1e6)
+
+
+    def _load(self):
+        """
+        Load the offsets from the sidecar. Return None when the sidecar
+        does not correspond to the file.
+        """
+        if not os.path.isfile(self.findex):
+            return None
+        data = np.fromfile(self.findex, dtype='<i8')
+        if len(data) < 4 or data[0] != MAGIC or tuple(data[1:3]) != self._stat():
+            return None
+        return data[3:]
+
+
+    def build(self):
+        """
+        Find the offsets of the sentences and store them into the sidecar.
+        """
+        logger.info('building sentence index: %s' % self.findex)
+        parser = self.Parser(self.input, fast=True)
+        offsets = [0]
+        offsets.extend(parser.sentenceOffsets())
+        data = np.asarray([MAGIC] + list(self._stat()) + offsets, dtype='<i8')
+        tmp = '%s.%d' % (self.findex, os.getpid())
+        data.tofile(tmp)
+        os.rename(tmp, self.findex)
+        return data[3:]
+
+
+    def __len__(self):
+        """
+        Return the number of sentences in the file.
+        """
+        return len(self.offsets) - 1
+
+
+    def byteRange(self, first, last):
+        """
+        Return the byte range of the sentences from `first` to `last-1`.
+
+        Returns:
+        --------
+        start, end : int
+            The offset of the first sentence and the offset after the last
+            sentence.
+        """
+        return int(self.offsets[first]), int(self.offsets[last])
+
+
+    def split(self, size):
+        """
+        Split the file into ranges of sentences containing about `size` bytes.
+
+        Parameters:
+        -----------
+        size : int
+            Number of bytes in each range
+
+        Returns:
+        --------
+        ranges : array_like
+            List of tuples `(first, last)`, where `last` is not included
+        """
+        ranges = []
+        first = 0
+        while first < len(self):
+            last = np.searchsorted(self.offsets, self.offsets[first] + size, side='left')
+            last = int(min(max(last, first+1), len(self)))
+            ranges.append((first, last))
+            first = last
+        return ranges
+#End of class SentenceIndex
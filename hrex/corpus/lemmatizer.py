@@ -0,0 +1,124 @@
+#!/usr/bin/python
+#-*- coding: utf-8 -*-
+
+"""
+This module contains a lemmatizer with a bounded cache of the lemmas. Since
+the frequency of words follows a Zipfian distribution, few pairs `(word, pos)`
+account for most of the tokens of a corpus, thus most lookups are found in
+the cache after the first sentences and the lemmatizer is called only for
+new words. This version uses the WordNet lemmatizer of NLTK.
+
+@author: granada
+"""
+import sys
+sys.path.insert(0, '..') # This line is inserted to find the package utils.arguments
+
+import logging
+logger = logging.getLogger('corpus.lemmatizer')
+logging.basicConfig(format='%(asctime)s : %(levelname)s : %(message)s', level=logging.INFO)
+
+from collections import OrderedDict
+
+# Normalized PoS tags and their PoS in WordNet
+WORDNET_POS = {'n': 'n', 'v': 'v', 'j': 'a'}
+
+
+class Lemmatizer(object):
+    """
+    Lemmatizer that keeps the lemmas of the last `size` pairs `(word, pos)`
+    used in a LRU cache.
+        >>> lem = Lemmatizer()
+        >>> lem.lemmatize('cars', 'n')
+            'car'
+        >>> lem.stats()
+            {'hits': 0, 'misses': 1, 'size': 1, 'hit_rate': 0.0}
+    """
+    def __init__(self, size=100000, function=None):
+        """
+        Initiate the lemmatizer.
+
+        Parameters:
+        -----------
+        size : int, optional
+            Maximum number of lemmas in the cache
+        function : function, optional
+            Function `function(word, pos)` that returns the lemma of a word,
+            where `pos` is a PoS of WordNet. The WordNet lemmatizer of NLTK
+            is used by default.
+        """
+        if function is None:
+            try:
+                from nltk.stem import WordNetLemmatizer
+            except ImportError:
+                logger.error('NLTK tool not installed to extract lemmas')
+                sys.exit(1)
+            function = WordNetLemmatizer().lemmatize
+        self.function = function
+        self.size = size
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+
+    def lemmatize(self, word, pos, normalization=None):
+        """
+        Return the lemma of `word`.
+
+        Parameters:
+        -----------
+        word : string
+            The word to be lemmatized
+        pos : string
+            The normalized PoS of the word (see `ParserInterface._normalization`)
+            or its tag when `normalization` is set. Words of other PoS than nouns, 
+            verbs and adjectives are returned unchanged.
+        normalization : function, optional
+            Function that normalizes the tag `pos`. The cache is keyed by the
+            tag, thus tags are normalized only when the lemma is not found.
+        """
+        if normalization is None and pos not in WORDNET_POS:
+            return word
+        key = (word, pos)
+        lemma = self.cache.pop(key, None)
+        if lemma is None:
+            self.misses += 1
+            if normalization is not None:
+                pos = normalization(pos)
+            lemma = self.function(word, WORDNET_POS[pos]) if pos in WORDNET_POS else word
+            if len(self.cache) >= self.size:
+                self.cache.popitem(last=False)
+        else:
+            self.hits += 1
+        self.cache[key] = lemma
+        return lemma
+
+
+    def stats(self):
+        """
+        Return the statistics of the cache.
+
+        Returns:
+        --------
+        stats : dict
+            Dictionary containing the number of `hits` and `misses` of the
+            cache, the number of lemmas in the cache (`size`) and the
+            `hit_rate`, i.e., the fraction of lookups found in the cache
+        """
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.cache),
+                'hit_rate': float(self.hits) / lookups if lookups else 0.0}
+#End of class Lemmatizer
+
+
+# Lemmatizer shared by the readers of a process
+_shared = None
+
+def sharedLemmatizer():
+    """
+    Return the lemmatizer shared by the readers of the current process,
+    creating it in the first call.
+    """
+    global _shared
+    if _shared is None:
+        _shared = Lemmatizer()
+    return _shared
@@ -7,6 +7,7 @@ This module contains a parsing to Stanford files.
 """ 
 
 import os
+import re
 import sys
 sys.path.insert(0, '..') # This line is inserted to find the package utils.arguments
 
@@ -14,7 +15,7 @@ import logging
 logger = logging.getLogger('corpus.stanford')
 logging.basicConfig(format='%(asctime)s : %(levelname)s : %(message)s', level=logging.INFO)
 
-from codecs import open
+from codecs import open, getreader
 from collections import namedtuple
 NP = namedtuple('NP', ['id', 'np', 'head'])
 Term = namedtuple('Term', ['word', 'pos'])
@@ -26,12 +27,126 @@ except ImportError:
     hasNLTK = False
 
 from structure.parser import ParserInterface 
+from utils.fileutils import openFile, isCompressed, readRanges
+from index import SentenceIndex
+from lemmatizer import sharedLemmatizer
+
+# Dependency in the form `relation(head-i, dependent-j)`, where copies of words
+# are marked by quotes (e.g., `ball-5'`)
+DEPENDENCY = re.compile(r"^([^(]+)\((.*)-(\d+)'*, (.*)-(\d+)'*\)$")
+
+# Token `word/TAG` of a phrase, where the word may contain slashes. `%s` is
+# replaced by the tags that are matched.
+TOKEN = r'(?<!\S)(\S*)/(%s)(?!\S)'
+
+# Tags that may be content words (see `Stanford._contentPos`)
+CONTENT_TAGS = ['NN', 'NNS', 'NNP', 'NNPS', 'JJ', 'VB', 'VBD', 'VBG', 'VBN', 'VBP', 'VBZ', 'n', 'j', 'v']
+
+# Rules to find the head of noun phrases (Collins, 1999). Each rule contains the
+# direction of the search among the children and the labels that are searched.
+NP_HEADS = [('right', ['NN', 'NNP', 'NNPS', 'NNS', 'NX', 'POS', 'JJR']),
+            ('left', ['NP']),
+            ('right', ['$', 'ADJP', 'PRN']),
+            ('right', ['CD']),
+            ('right', ['JJ', 'JJS', 'RB', 'QP'])]
+
+
+def _headChild(label, children):
+    """
+    Find the child that contains the head of a phrase.
+
+    Parameters:
+    -----------
+    label : string
+        The label of the phrase
+    children : array_like
+        List of tuples `(label, head)` of the children of the phrase
+
+    Returns:
+    --------
+    k : int
+        The position of the head child. Noun phrases follow `NP_HEADS`,
+        while the last child is the head of other phrases.
+    """
+    last = len(children) - 1
+    if label in ['NP', 'NX'] and children[last][0] != 'POS':
+        for direction, labels in NP_HEADS:
+            order = xrange(last, -1, -1) if direction == 'right' else xrange(last+1)
+            for k in order:
+                if children[k][0] in labels:
+                    return k
+    return last
+
+
+def scanTree(tree):
+    """
+    Scan a bracketed tree in a single pass, extracting its terms and the
+    spans of its noun phrases without building tree objects.
+
+    Parameters:
+    -----------
+    tree : string
+        The parsed tree in Penn Treebank format
+
+    Returns:
+    --------
+    terms : array_like
+        List of the terms `Term(word, pos)` of the leaves
+    nps : array_like
+        List of tuples `(start, end, head)` of the noun phrases in the order of 
+        a preorder traversal, where `terms[start:end]` are the terms of the noun
+        phrase and `terms[head]` is its head
+
+    Examples:
+    ---------
+    >>> scanTree('(NP (NP (DT a) (NN game)) (PP (IN in) (NP (NN hand))))')
+        ([(a DT), (game NN), (in IN), (hand NN)], [(0, 4, 1), (0, 2, 1), (3, 4, 3)])
+    """
+    tokens = tree.replace('(', ' ( ').replace(')', ' ) ').split()
+    terms, nps = [], []
+    stack = [] # open phrases [label, start, children]
+    i, n = 0, len(tokens)
+    while i < n:
+        if tokens[i] == '(':
+            if i+1 < n and tokens[i+1] == '(':
+                label = '' # unlabeled root
+                i += 1
+            else:
+                label = tokens[i+1]
+                i += 2
+            if i < n and tokens[i] != '(' and tokens[i] != ')':
+                # leaf containing the words until the closing bracket
+                j = i
+                while j < n and tokens[j] != ')':
+                    j += 1
+                terms.append(Term(' '.join(tokens[i:j]), label))
+                if stack:
+                    stack[-1][2].append((label, len(terms)-1))
+                i = j + 1
+            else:
+                stack.append([label, len(terms), []])
+        else:
+            if tokens[i] == ')' and stack:
+                label, start, children = stack.pop()
+                if children:
+                    head = children[_headChild(label, children)][1]
+                    if label == 'NP':
+                        nps.append((start, len(terms), len(stack), head))
+                    if stack:
+                        stack[-1][2].append((label, head))
+            i += 1
+    nps.sort(key=lambda np: (np[0], -np[1], np[2]))
+    return terms, [(start, end, head) for start, end, _, head in nps]
+
 
 class Stanford(ParserInterface):
     """
     Class that deals with texts parsed by Stanford parser.
     """
-    def __init__(self, input, extract='WordsAndTags', mode='word'):
+    computes_lemmas = True
+
+    def __init__(self, input, extract='WordsAndTags', mode='word', fast=False, 
+                 start=None, end=None, sentences=None, cache_dir=None):
         """
         Initiate the elements of the class.
         
@@ -41,6 +156,8 @@ class Stanford(ParserInterface):
             This parameter must be a basestring type and the content of the
             file must be parsed with the option:
                 ``-outputFormat "penn,wordsAndTags,typedDependenciesCollapsed"`` 
+            Files compressed with gzip (`.gz`), bzip2 (`.bz2`) or xz (`.xz`)
+            are decompressed while they are read.
         extract : string {'WordsAndTags','Tree','Deps'}, optional
             specifies the type of content to be extracted
                 WordsAndTags: returns the content from self.phrase
@@ -49,7 +166,24 @@ class Stanford(ParserInterface):
         mode : {'word', 'lemma'}, optional
             Specifies the mode of dealing with elements.
             word: words are extracted
-            lemma: lemmas are extracted
+            lemma: lemmas are extracted by the lemmatizer shared by the
+            readers of the process (see `lemmatizer.Lemmatizer`)
+        fast : boolean {True, False}, optional
+            When extracting `WordsAndTags`, skip the lines of trees and 
+            dependencies without decoding or storing them. In this mode, 
+            `self.tree` and `self.deps` remain empty.
+        start : int, optional
+            Byte offset where the reading starts. It must be the offset of
+            a sentence (see `index.SentenceIndex`).
+        end : int, optional
+            Byte offset where the reading stops, i.e., sentences starting 
+            at `end` or after are not read.
+        sentences : array_like, optional
+            List of ranges of sentences `(first, last)` to be read, where `last` 
+            is not included. Offsets of the ranges are found in the sentence
+            index of the file, which is built in case it does not exist.
+        cache_dir : string, optional
+            Folder of the sentence index, next to the file by default
 
         Notes:
         ------
@@ -60,8 +194,22 @@ class Stanford(ParserInterface):
         self.deps: array_like
             retains the parsed dependencies of the phrase when iterating
         """ 
-        ParserInterface.__init__(self, extract=extract, mode=mode)
-        self.fin = open(input, 'r', 'utf-8')
+        ParserInterface.__init__(self, extract=extract, mode=mode, fast=fast)
+        self.input = input
+        self.fast = fast and extract == 'WordsAndTags'
+        self.lemmatizer = sharedLemmatizer() if mode == 'lemma' else None
+        self.ranges = None
+        if sentences is not None:
+            index = SentenceIndex(input, Stanford, cache_dir=cache_dir)
+            self.ranges = [index.byteRange(first, last) for first, last in sentences]
+        elif start is not None or end is not None:
+            self.ranges = [(start or 0, end)]
+        if self.fast or self.ranges is not None:
+            self.fin = openFile(input)
+        elif isCompressed(input):
+            self.fin = getreader('utf-8')(openFile(input))
+        else:
+            self.fin = open(input, 'r', 'utf-8')
         self.extract = extract
         self.phrase = ''
         self.tree = ''
@@ -73,12 +221,18 @@ class Stanford(ParserInterface):
         It depends on the self.mode to yield the content. Thus, in case of
             `mode=words`: __iter__ should yield the words of the phrase
         """
+        if self.fast:
+            for phrase in self._phrases():
+                yield phrase
+            return
+
         pos = True     #semaphore : PoS part of the text
         parsed = False #semaphore : parsed tree
         dep = False    #semaphore : dependencies of the phrase
 
+        tree = []
         #pb = ProgressBar(self.__len__())
-        for n, line in enumerate(self.fin):
+        for n, line in enumerate(self._lines()):
             #print line
             line = line.strip()
             if line == '':
@@ -90,6 +244,7 @@ class Stanford(ParserInterface):
                     # after loading TREE
                     dep = True
                     parsed = False
+                    self.tree = ''.join(tree)
                 elif dep: 
                     # after loading DEPENDENCIES
                     pos = True
@@ -109,16 +264,80 @@ class Stanford(ParserInterface):
                     self.phrase = ''
                     self.tree = ''
                     self.deps = []
+                    tree = []
             else:
                 if pos:
                     self.phrase = line
                 elif parsed:
-                    self.tree += line+' '
+                    tree.append(line+' ')
                 elif dep:      
                     self.deps.append(line)
             #pb.update()
 
 
+    def _phrases(self):
+        """
+        Iterate over the corpus yielding only the phrase of each block of
+        phrase, tree and dependencies. Lines of trees and dependencies are 
+        only tested as blank lines, thus they are neither decoded nor stored.
+        """
+        block = 0 # 0: phrase, 1: tree, 2: dependencies
+        for line in self._lines(decode=False):
+            if line.isspace():
+                if block == 2:
+                    yield self.phrase
+                    self.phrase = ''
+                    block = 0
+                else:
+                    block += 1
+            elif block == 0:
+                self.phrase = line.decode('utf-8').strip()
+
+
+    def _lines(self, decode=True):
+        """
+        Yield the lines of the file, restricted to `self.ranges` when reading
+        a part of the file. Lines read from ranges are decoded to unicode 
+        unless `decode=False`. Ranges of compressed files are read in a single
+        pass (see `fileutils.readRanges`).
+        """
+        if self.ranges is None:
+            for line in self.fin:
+                yield line
+            return
+        for line in readRanges(self.fin, self.ranges, sequential=isCompressed(self.input)):
+            if decode:
+                yield line.decode('utf-8')
+            else:
+                yield line
+
+
+    def sentenceOffsets(self):
+        """
+        Find the byte offset of the end of each sentence, i.e., the offset 
+        after the blank line that closes the dependencies of the sentence.
+        Only the blank lines are tested, thus the content of the file is not
+        decoded.
+
+        Yields:
+        -------
+        offset : int
+            The offset after each sentence
+        """
+        fin = openFile(self.input)
+        block = 0 # 0: phrase, 1: tree, 2: dependencies
+        offset = 0
+        for line in fin:
+            offset += len(line)
+            if line.isspace():
+                if block == 2:
+                    yield offset
+                    block = 0
+                else:
+                    block += 1
+        fin.close()
+
+
     def _normalization(self, pos):
         """
         Transform PoS tags from a term into its simplified version.
@@ -183,7 +402,38 @@ class Stanford(ParserInterface):
         return False
 
 
-    def listOfTerms(self, content_words=True, ctw='njv', normalize=True, lower=False):
+    # Compiled decoders of terms shared by all readers (see `_decoder`)
+    _decoders = {}
+
+    def _decoder(self, content_words, ctw, normalize):
+        """
+        Compile the decoder of terms of a setting of `listOfTerms`.
+
+        Returns:
+        --------
+        regex : re.RegexObject
+            Expression that finds the pairs `(word, tag)` of the content words
+            of a phrase or None when `content_words=False`
+        table : dict
+            Dictionary in the form `tag: pos`, where `pos` is the normalized
+            tag when `normalize=True`. Tags are added when they are first seen.
+        """
+        key = (content_words, ctw, normalize)
+        if key not in self._decoders:
+            table = {}
+            regex = None
+            if content_words:
+                for tag in CONTENT_TAGS:
+                    pos = self._normalization(tag) if normalize else tag
+                    if self._contentPos(pos, content=ctw):
+                        table[tag] = pos
+                tags = '|'.join(re.escape(tag) for tag in sorted(table, key=len, reverse=True))
+                regex = re.compile(TOKEN % (tags or '(?!)'), re.UNICODE)
+            self._decoders[key] = (regex, table)
+        return self._decoders[key]
+
+
+    def listOfTerms(self, content_words=True, ctw='njv', normalize=True, lower=False, engine='split'):
         """
         Transform the elements of the phrase into a list of nametuples.            
 
@@ -201,6 +451,12 @@ class Stanford(ParserInterface):
             calls self._normalization()
         lower : boolean {True, False}, optional
             Transform word to lowecase
+        engine : string {'split', 'regex'}, optional
+            Method used to decode the phrase. `split` splits each token and tests 
+            its tag. `regex` finds the content words in a single pass using an 
+            expression compiled for the setting (see `_decoder`), thus other tokens 
+            are skipped without creating any object, and normalizes tags using a 
+            table.
 
         Returns:
         --------
@@ -212,7 +468,32 @@ class Stanford(ParserInterface):
                 Term(word=u'ancient', pos=u'JJ'),
                 Term(word=u'air', pos=u'NN')]
             where `Term` is a `namedtuple('Term', ['word', 'pos'])`
+
+        Notes:
+        ------
+        Both engines return the same terms for tokens in the form `word/tag`. A token
+        without tag (i.e., without a slash) is read by `split` as a tag with an empty
+        word, thus it is a content word when the token is a content tag (e.g., `NN`), 
+        while it is never a content word for `regex`.
         """
+        if engine == 'regex':
+            regex, table = self._decoder(content_words, ctw, normalize)
+            if regex is None:
+                tokens = (token.rpartition('/')[::2] for token in self.phrase.split())
+            else:
+                tokens = regex.findall(self.phrase)
+            sent = []
+            for word, tag in tokens:
+                pos = table.get(tag)
+                if pos is None:
+                    pos = table[tag] = self._normalization(tag) if normalize else tag
+                if lower:
+                    word = word.lower()
+                if self.lemmatizer is not None:
+                    word = self.lemmatizer.lemmatize(word, tag, self._normalization)
+                sent.append(Term(word, pos))
+            return sent
+
         sent = []
         for term in self.phrase.split():
             ar = term.split('/')
@@ -226,11 +507,11 @@ class Stanford(ParserInterface):
             if normalize:
                 pos = self._normalization(pos)
 
-            if content_words:
-                if self._contentPos(pos, content=ctw):
-                    sent.append(Term(word, pos))
-            else:
-                sent.append(Term(word, pos))
+            if content_words and not self._contentPos(pos, content=ctw):
+                continue
+            if self.lemmatizer is not None:
+                word = self.lemmatizer.lemmatize(word, ar[-1], self._normalization)
+            sent.append(Term(word, pos))
         return sent
 
 
@@ -259,10 +540,19 @@ class Stanford(ParserInterface):
         return lnp
 
 
-    def nounPhrases(self):
+    def nounPhrases(self, engine='nltk'):
         """
         Extract the noun phrases of the sentence.
 
+        Parameters:
+        -----------
+        engine : string {'nltk', 'scanner'}, optional
+            Method used to read the tree. `nltk` builds a `nltk.tree.Tree` and 
+            does not find heads. `scanner` reads the tree string in a single 
+            pass (see `scanTree`), finds the head of each noun phrase and 
+            numbers the noun phrases from 1. Both return the noun phrases in 
+            the same order.
+
         Returns:
         --------
         lnp : array_like
@@ -272,13 +562,18 @@ class Stanford(ParserInterface):
         Examples:
         --------
         >>> Stanford().tree = '(NP (NP (DT a) (NN game)) (PP (IN in) (NP (NN hand))))'
-        >>> Stanford().nounPhrases()
-            [NP(id=1, np=[(DT a), (NN game)], head='game'),
-             NP(id=2, np=[(NN hand)], head='hand'),
-             NP(id=3, np=[(DT a), (NN game), (IN in), (NN hand)], head='game')
+        >>> Stanford().nounPhrases(engine='scanner')
+            [NP(id=1, np=[(DT a), (NN game), (IN in), (NN hand)], head='game'),
+             NP(id=2, np=[(DT a), (NN game)], head='game'),
+             NP(id=3, np=[(NN hand)], head='hand')
             ]
         """
-        if hasNLTK:
+        if engine == 'scanner':
+            terms, nps = scanTree(self.tree)
+            lnp = []
+            for id, (start, end, head) in enumerate(nps, 1):
+                lnp.append(NP(id=id, np=terms[start:end], head=terms[head].word))
+        elif hasNLTK:
             parsed_tree = nltk.tree.Tree.fromstring(self.tree[0:-1])
             subtrees = self._treeToNP(parsed_tree)
 
@@ -294,6 +589,19 @@ class Stanford(ParserInterface):
         return lnp
 
 
+    def dependencies(self):
+        """
+        Extract the dependencies of the sentence from `self.deps`. The 
+        reader must not be in `fast` mode. See `ParserInterface.dependencies`.
+        """
+        deps = []
+        for line in self.deps:
+            match = DEPENDENCY.match(line)
+            if match:
+                deps.append((int(match.group(3)), match.group(1), int(match.group(5))))
+        return deps
+
+
     def plainPhrase(self):
         """
         Extract the conent of the phrase
@@ -0,0 +1,39 @@
+#!/usr/bin/python
+#-*- coding: utf-8 -*-
+
+"""
+This module runs the file `structure.merge`, merging corpus stores saved by
+`Corpus.save` into a single store.
+
+Usage:
+    python merge.py output.db store1.db store2.db [...] [--mode shelve] [--contexts ids]
+
+@author: granada
+"""
+import sys
+sys.path.insert(0, '..')
+import logging
+logger = logging.getLogger('run.merge')
+logging.basicConfig(format='%(asctime)s : %(levelname)s : %(message)s', level=logging.INFO)
+
+import argparse
+
+from structure.merge import mergeStores
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Merge corpus stores using a global vocabulary.')
+    parser.add_argument('outputfile', help='the store where the merged corpus is saved.')
+    parser.add_argument('stores', nargs='+', help='stores saved by `Corpus.save`.')
+    parser.add_argument('--mode', default='db', choices=['db', 'shelve'], help='mode of the stores.')
+    parser.add_argument('--tmpdir', default=None, help='folder of the temporary files.')
+    parser.add_argument('--contexts', default=None, choices=['keys', 'ids'], 
+                        help='merge contexts by value (keys) or number the contexts of documents '
+                             'and sentences of each store after the previous stores (ids).')
+    args = parser.parse_args(argv)
+
+    mergeStores(args.stores, args.outputfile, mode=args.mode, tmpdir=args.tmpdir, contexts=args.contexts)
+
+
+if __name__ == "__main__":
+   main(sys.argv[1:])
@@ -18,11 +18,17 @@ from collections import defaultdict
 
 from storage import SQLite, Shelve, PlainText
 
+import zlib
 import operator
 from collections import Counter
 from codecs import open
 from os.path import join
 
+# Codes of the PoS and directions of encoded contexts (see `DictContexts`)
+POSCODES = {'n': 1, 'v': 2, 'j': 3}
+POSNAMES = ['', 'n', 'v', 'j']
+DIRECTIONS = ['-r', '-l']
+
 
 class DictList(dict):
     """
@@ -228,7 +234,7 @@ class AbstractDictionary(dict):
         return True
 
 
-    def load(self, fin, dname=None, mode='db'):
+    def load(self, fin, dname=None, mode='db', name=None):
         """
         Load the dictionary from `fin`.
 
@@ -239,6 +245,8 @@ class AbstractDictionary(dict):
         dname : string {'dwords','dctxs', 'drels'}
             The name of the dictionary
         mode : string {'text', 'db', 'shelve'}
+        name: string
+            Name of a table or dictionary in case different of dname
         """
         if mode == 'db':
             dbm = SQLite(fin)
@@ -253,7 +261,7 @@ class AbstractDictionary(dict):
         else:
             logger.error('Cannot load dictionary - `mode=%s` no specified' % mode)
             return False
-        dic = dbm.load(self, dtype=dname)
+        dic = dbm.load(dtype=dname, name=name)
         dict.__init__(self, dic)
         dbm.close()
         return True
@@ -327,6 +335,27 @@ class DictWords(AbstractDictionary):
                 self.id += 1
 
 
+    def load(self, fin, dname=None, mode='db', name=None):
+        """
+        Load the dictionary from `fin`. New keys added to the loaded 
+        dictionary receive ids greater than the existing ids.
+
+        Parameters:
+        -----------
+        fin : string
+            The path to the input file
+        dname : string {'dwords','dctxs'}
+            The name of the dictionary
+        mode : string {'text', 'db', 'shelve'}
+        name: string
+            Name of a table or dictionary in case different of dname
+        """
+        loaded = AbstractDictionary.load(self, fin, dname=dname, mode=mode, name=name)
+        self.dict_t = {}
+        self.id = max([id for id, _ in dict.itervalues(self)] or [0]) + 1
+        return loaded
+
+
     def id2key(self, simplify=False):
         """
         Invert the dictionary, transforming the key into id and 
@@ -490,6 +519,222 @@ class DictWords(AbstractDictionary):
 #End of class DictWords
 
 
+class DictContexts(DictWords):
+    """
+    DictContexts is a dictionary for contexts of windows encoded as integers.
+    Instead of strings in the form `word#pos-dir`, each context is the key:
+        (idword * 4 + pos) * 2 + dir
+    where `idword` is the position of the word in `self.words`, `pos` is the 
+    code of the PoS in `POSCODES` and `dir` is 0 for `-r` and 1 for `-l`. 
+    Contexts are decoded into strings when the dictionary is saved. It has 
+    the form:
+        [key]: (id, freq)
+    """
+    def __init__(self, input=None, startid=1):
+        """
+        Initiate the class DictContexts.
+
+        Parameters:
+        -----------
+        input : string, optional
+            A dictionary that is transformed into DictContexts
+        startid : int
+            Initial id used in the dictionary
+
+        Notes:
+        ------
+        self.vocab : dict
+            Dictionary containing the position of each word in `self.words`
+        self.words : array_like
+            List of the words of the contexts
+        """
+        DictWords.__init__(self, input=input, startid=startid)
+        self.vocab = {}
+        self.words = []
+
+
+    def context(self, word, pos, direction):
+        """
+        Return the key of a context.
+
+        Parameters:
+        -----------
+        word : string
+            The context word
+        pos : string {'n', 'v', 'j'}
+            The normalized PoS of the context word
+        direction : int {0, 1}
+            0 for contexts on the right (`-r`) and 1 for contexts on the left (`-l`)
+
+        Examples:
+        ---------
+        >>> d = DictContexts()
+        >>> d.context('car', 'n', 1)
+            3
+        >>> d.decode(3)
+            'car#n-l'
+        """
+        idword = self.vocab.get(word)
+        if idword is None:
+            idword = self.vocab[word] = len(self.words)
+            self.words.append(word)
+        return (idword*4 + POSCODES.get(pos, 0))*2 + direction
+
+
+    def encode(self, ctx):
+        """
+        Return the key of a context in the form `word#pos-dir`.
+        """
+        word, posdir = ctx.rsplit('#', 1)
+        return self.context(word, posdir[:-2], DIRECTIONS.index(posdir[-2:]))
+
+
+    def decode(self, key):
+        """
+        Return the context of `key` in the form `word#pos-dir`.
+        """
+        return self.words[key/8]+'#'+POSNAMES[(key/2)%4]+DIRECTIONS[key%2]
+
+
+    def decoded(self):
+        """
+        Return a DictWords containing the decoded contexts with the same
+        ids and frequencies.
+        """
+        dic = DictWords()
+        for key, value in dict.iteritems(self):
+            dict.__setitem__(dic, self.decode(key), value)
+        dic.id = self.id
+        return dic
+
+
+    def save(self, fout, dtype=None, mode='db', new=False, name=None):
+        """
+        Save the decoded contexts into `fout`. See `AbstractDictionary.save`.
+        """
+        return self.decoded().save(fout, dtype=dtype, mode=mode, new=new, name=name)
+
+
+    def load(self, fin, dname=None, mode='db', name=None):
+        """
+        Load contexts in the form `word#pos-dir` from `fin`, encoding them
+        into keys. See `DictWords.load`.
+        """
+        dic = DictWords()
+        loaded = dic.load(fin, dname=dname, mode=mode, name=name)
+        dict.clear(self)
+        self.vocab = {}
+        self.words = []
+        for ctx, value in dict.iteritems(dic):
+            dict.__setitem__(self, self.encode(ctx), value)
+        self.dict_t = {}
+        self.id = dic.id
+        return loaded
+#End of class DictContexts
+
+
+class DictHashed(DictWords):
+    """
+    DictHashed is a dictionary for contexts hashed into `2**bits` buckets
+    (feature hashing). Each context is mapped into a bucket `b` by a hash 
+    function, thus the number of contexts does not exceed `2**bits`. It has 
+    the form:
+        [b]: (b+1, freq)
+    Reading a context returns the id and the frequency of its bucket, i.e., 
+    `dctxs[ctx]` returns `(b+1, freq)`. Thus, the frequency of a bucket and 
+    its relations are the sum of the frequencies of its contexts, which are
+    non-negative counts that can be weighted (e.g., by PPMI).
+    """
+    def __init__(self, input=None, bits=18, sample=0):
+        """
+        Initiate the class DictHashed.
+
+        Parameters:
+        -----------
+        input : dict, optional
+            A dictionary of buckets in the form `b: (b+1, freq)`
+        bits : int, optional
+            Number of bits of the buckets, being at most 31
+        sample : int, optional
+            Maximum number of contexts kept for each bucket in `self.reverse`
+
+        Notes:
+        ------
+        self.reverse : dict
+            Dictionary containing a sample of the contexts of each bucket 
+            in the form `b: [ctx1, ctx2, ...]`
+        """
+        if bits > 31:
+            logger.error('cannot hash contexts into more than 2**31 buckets')
+            sys.exit(1)
+        DictWords.__init__(self, input=input)
+        self.id = 2**bits + 1
+        self.mask = 2**bits - 1
+        self.sample = sample
+        self.reverse = {}
+        self.last = (None, None)
+
+
+    def bucket(self, key):
+        """
+        Return the bucket of a context, given by the lower bits of the CRC32
+        of the context.
+        """
+        if self.last[0] == key:
+            return self.last[1]
+        if isinstance(key, unicode):
+            h = zlib.crc32(key.encode('utf-8'))
+        else:
+            h = zlib.crc32(str(key))
+        b = h & self.mask
+        self.last = (key, b)
+        return b
+
+
+    def __setitem__(self, key, value):
+        """
+        Add the frequency of the context `key` to its bucket.
+        """
+        b = self.bucket(key)
+        if dict.has_key(self, b):
+            id, f = dict.__getitem__(self, b)
+            dict.__setitem__(self, b, (id, f+value))
+        else:
+            dict.__setitem__(self, b, (b+1, value))
+        if self.sample:
+            contexts = self.reverse.setdefault(b, [])
+            if len(contexts) < self.sample and key not in contexts:
+                contexts.append(key)
+
+
+    def __getitem__(self, key):
+        """
+        Return the id of the bucket of `key` and the frequency of the bucket.
+        """
+        return dict.__getitem__(self, self.bucket(key))
+
+
+    def has_key(self, key):
+        """
+        Verify whether the bucket of the context `key` is in the dictionary.
+        """
+        return dict.has_key(self, self.bucket(key))
+
+    __contains__ = has_key
+
+
+    def folded(self):
+        """
+        Return a DictWords containing the buckets as keys.
+        """
+        dic = DictWords()
+        for b, value in dict.iteritems(self):
+            dict.__setitem__(dic, b, value)
+        dic.id = self.id
+        return dic
+#End of class DictHashed
+
+
 class DictRels(AbstractDictionary):
     """
     DictRels is a dictionary for store relations betweeen words and contexts. 
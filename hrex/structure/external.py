@@ -0,0 +1,293 @@
+#!/usr/bin/python
+#-*- coding: utf-8 -*-
+
+"""
+This module contains a disk-backed counter of relations between words and
+contexts. Pairs `(idw, idc)` are buffered in NumPy arrays and, when the buffer
+is full, they are counted, sorted and written into a binary run. At the end,
+runs are merged by an external k-way merge that streams the pairs sorted by
+`(idw, idc)` into the storage or into a sparse matrix. Thus, the memory used
+does not depend on the number of distinct pairs. When the number of runs
+reaches a threshold, runs are compacted into a single run, bounding the
+number of files opened by the merge.
+
+@author: granada
+"""
+import sys
+sys.path.insert(0, '..') # This line is inserted to find the package utils.arguments
+import logging
+logger = logging.getLogger('structure.external')
+logging.basicConfig(format='%(asctime)s : %(levelname)s : %(message)s', level=logging.INFO)
+
+import os
+import shutil
+import tempfile
+import numpy as np
+
+from storage import SQLite
+from dictionaries import DictRels
+
+# Records of the runs: pair encoded as `idw << 32 | idc` and its frequency
+RECORD = np.dtype([('key', '<u8'), ('freq', '<i8')])
+
+
+class ExternalRels(object):
+    """
+    Counter of the pairs `(idw, idc)` that sorts and merges the counts on
+    disk. It may be used in place of `DictRels` to count relations, since
+    pairs are added in the same way:
+        >>> drels = ExternalRels()
+        >>> drels[(1, 2)] = 1
+        >>> drels.save('corpus.db', dtype='drels')
+    """
+    def __init__(self, tmpdir=None, chunk=10000000, block=1000000, max_runs=64):
+        """
+        Initiate the counter.
+
+        Parameters:
+        -----------
+        tmpdir : string, optional
+            Folder where runs are written. The default temporary folder is
+            used by default.
+        chunk : int, optional
+            Number of pairs kept in memory before writing a run. The buffer 
+            grows up to `chunk` pairs of 16 bytes.
+        block : int, optional
+            Number of records of each run read at once by the merge
+        max_runs : int, optional
+            Number of runs that triggers their compaction into a single run
+        """
+        self.folder = tempfile.mkdtemp(prefix='hrex-rels-', dir=tmpdir)
+        self.chunk = chunk
+        self.block = block
+        self.keys = np.zeros(0, dtype=np.uint64)
+        self.values = np.zeros(0, dtype=np.int64)
+        self.size = 0
+        self.max_runs = max_runs
+        self.runs = []
+        self.written = 0
+
+
+    def _reserve(self, n):
+        """
+        Grow the buffer to receive `n` more pairs, doubling its size up to 
+        `self.chunk` pairs.
+        """
+        if self.size + n <= len(self.keys):
+            return
+        capacity = min(self.chunk, max(self.size + n, 2 * len(self.keys), 1024))
+        keys = np.zeros(capacity, dtype=np.uint64)
+        values = np.zeros(capacity, dtype=np.int64)
+        keys[:self.size] = self.keys[:self.size]
+        values[:self.size] = self.values[:self.size]
+        self.keys, self.values = keys, values
+
+
+    def __setitem__(self, key, value):
+        """
+        Add `value` to the frequency of the pair `key = (idw, idc)`.
+        """
+        idw, idc = key
+        self._reserve(1)
+        self.keys[self.size] = (idw << 32) | idc
+        self.values[self.size] = value
+        self.size += 1
+        if self.size >= self.chunk:
+            self.flush()
+
+
+    def extend(self, idws, idcs, freqs):
+        """
+        Add the frequencies of arrays of pairs `(idws[i], idcs[i])`.
+        """
+        keys = (np.asarray(idws, dtype=np.uint64) << np.uint64(32)) | np.asarray(idcs, dtype=np.uint64)
+        freqs = np.asarray(freqs, dtype=np.int64)
+        start = 0
+        while start < len(keys):
+            n = min(len(keys) - start, self.chunk - self.size)
+            self._reserve(n)
+            self.keys[self.size:self.size+n] = keys[start:start+n]
+            self.values[self.size:self.size+n] = freqs[start:start+n]
+            self.size += n
+            start += n
+            if self.size >= self.chunk:
+                self.flush()
+
+
+    def flush(self):
+        """
+        Count the buffered pairs and write them into a sorted run.
+        """
+        if not self.size:
+            return
+        keys, inv = np.unique(self.keys[:self.size], return_inverse=True)
+        run = np.zeros(len(keys), dtype=RECORD)
+        run['key'] = keys
+        run['freq'] = np.bincount(inv, weights=self.values[:self.size])
+        self.size = 0
+        fname = self._runName()
+        run.tofile(fname)
+        self.runs.append(fname)
+        logger.info('wrote run %d containing %d pairs' % (len(self.runs), len(run)))
+        if len(self.runs) >= self.max_runs:
+            self.compact()
+
+
+    def _runName(self):
+        """
+        Return the path to a new run.
+        """
+        self.written += 1
+        return os.path.join(self.folder, 'run%06d.bin' % self.written)
+
+
+    def compact(self):
+        """
+        Merge the runs into a single run.
+        """
+        if len(self.runs) < 2:
+            return
+        fname = self._runName()
+        size = 0
+        with open(fname, 'wb') as fout:
+            for keys, freqs in self._merge(self.runs):
+                run = np.zeros(len(keys), dtype=RECORD)
+                run['key'] = keys
+                run['freq'] = freqs
+                run.tofile(fout)
+                size += len(run)
+        for old in self.runs:
+            os.remove(old)
+        self.runs = [fname]
+        logger.info('compacted runs into a run containing %d pairs' % size)
+
+
+    def blocks(self):
+        """
+        Merge the runs yielding blocks of pairs sorted by `(idw, idc)`. The
+        frequency of pairs found in many runs are summed up.
+
+        Yields:
+        -------
+        keys : numpy.ndarray
+            Pairs encoded as `idw << 32 | idc`
+        freqs : numpy.ndarray
+            Frequency of each pair
+
+        Notes:
+        ------
+        At each step, a block of each run is read and only the pairs up to
+        the smallest last key of the blocks are merged. All pairs with these
+        keys are in the blocks, since runs are sorted.
+        """
+        self.flush()
+        return self._merge(self.runs)
+
+
+    def _merge(self, fnames):
+        """
+        Merge the runs `fnames` yielding blocks of pairs. See `blocks`.
+        """
+        runs = [np.memmap(fname, dtype=RECORD, mode='r') for fname in fnames if os.path.getsize(fname)]
+        pos = [0] * len(runs)
+        while True:
+            active = [k for k in xrange(len(runs)) if pos[k] < len(runs[k])]
+            if not active:
+                break
+            bound = min(runs[k]['key'][min(pos[k]+self.block, len(runs[k]))-1] for k in active)
+            keys, freqs = [], []
+            for k in active:
+                block = runs[k][pos[k]:pos[k]+self.block]
+                end = np.searchsorted(block['key'], bound, side='right')
+                keys.append(block['key'][:end])
+                freqs.append(block['freq'][:end])
+                pos[k] += end
+            keys, inv = np.unique(np.concatenate(keys), return_inverse=True)
+            yield keys, np.bincount(inv, weights=np.concatenate(freqs)).astype(np.int64)
+
+
+    def dic2Tuples(self, key='idw'):
+        """
+        Yield the merged pairs in the form `(idw, idc, freq)` sorted by `idw`.
+        See `DictRels.dic2Tuples`.
+        """
+        for keys, freqs in self.blocks():
+            idws = (keys >> np.uint64(32)).astype(np.int64).tolist()
+            idcs = (keys & np.uint64(0xffffffff)).astype(np.int64).tolist()
+            for tup in zip(idws, idcs, freqs.tolist()):
+                yield tup
+
+
+    def toDict(self):
+        """
+        Return the merged pairs as a DictRels.
+        """
+        drels = DictRels()
+        for idw, idc, f in self.dic2Tuples():
+            drels[(idw, idc)] = f
+        return drels
+
+
+    def toMatrix(self, shape=None):
+        """
+        Stream the merged pairs into a sparse matrix of words by contexts.
+
+        Parameters:
+        -----------
+        shape : tuple, optional
+            Shape of the matrix `(nb_words, nb_contexts)`. The greatest ids
+            plus one are used by default.
+
+        Returns:
+        --------
+        matrix : scipy.sparse.csr_matrix
+            Matrix where `matrix[idw, idc]` is the frequency of the pair
+        """
+        from scipy import sparse
+
+        rows, cols, data = [], [], []
+        for keys, freqs in self.blocks():
+            rows.append((keys >> np.uint64(32)).astype(np.int32))
+            cols.append((keys & np.uint64(0xffffffff)).astype(np.int32))
+            data.append(freqs)
+        rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int32)
+        cols = np.concatenate(cols) if cols else np.zeros(0, dtype=np.int32)
+        data = np.concatenate(data) if data else np.zeros(0, dtype=np.int64)
+        if shape is None:
+            shape = (int(rows.max())+1 if len(rows) else 0, int(cols.max())+1 if len(cols) else 0)
+        # pairs are sorted by row, thus the row pointers are the cumulative counts
+        indptr = np.zeros(shape[0]+1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=shape[0]), out=indptr[1:])
+        return sparse.csr_matrix((data, cols, indptr), shape=shape)
+
+
+    def save(self, fout, dtype='drels', mode='db', new=False, name=None):
+        """
+        Stream the merged pairs into the database `fout`. See `AbstractDictionary.save`.
+        """
+        if mode != 'db':
+            logger.error('Cannot save external relations - `mode=%s` no supported' % mode)
+            return False
+        dbm = SQLite(fout)
+        dbm.save(self, dtype=dtype, name=name)
+        dbm.close()
+        return True
+
+
+    def __len__(self):
+        """
+        Return the number of distinct pairs. This function merges the runs.
+        """
+        return sum(len(keys) for keys, _ in self.blocks())
+
+
+    def close(self):
+        """
+        Remove the runs from the disk.
+        """
+        shutil.rmtree(self.folder, ignore_errors=True)
+        self.runs = []
+        self.keys = np.zeros(0, dtype=np.uint64)
+        self.values = np.zeros(0, dtype=np.int64)
+        self.size = 0
+#End of class ExternalRels
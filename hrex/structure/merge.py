@@ -0,0 +1,190 @@
+#!/usr/bin/python
+#-*- coding: utf-8 -*-
+
+"""
+This module merges corpus stores saved by `Corpus.save`. Since ids of words
+and contexts are assigned in the order that they are found, stores extracted
+separately have incompatible ids. Thus, a global vocabulary of words and
+contexts is built from all stores, ids of each store are remapped into the
+global ids and the frequencies of relations are summed up. Relations are
+streamed from the stores into an external merge (see `ExternalRels`), thus
+only the vocabularies are kept in memory. Contexts of documents and sentences 
+are ids local to each store, thus they are numbered after the contexts of the 
+previous stores instead of being merged.
+
+@author: granada
+"""
+import sys
+sys.path.insert(0, '..') # This line is inserted to find the package utils.arguments
+import logging
+logger = logging.getLogger('structure.merge')
+logging.basicConfig(format='%(asctime)s : %(levelname)s : %(message)s', level=logging.INFO)
+
+import numpy as np
+
+from storage import SQLite, Shelve
+from dictionaries import DictWords
+from external import ExternalRels
+
+
+def _readDictionary(fin, dtype, mode):
+    """
+    Yield the tuples `(id, key, freq)` of a dictionary of words or contexts
+    sorted by id.
+    """
+    if mode == 'db':
+        db = SQLite(fin)
+        for tup in db.con.execute('SELECT * FROM %s ORDER BY 1' % dtype):
+            yield tup
+        db.close()
+    else:
+        sh = Shelve(fin)
+        dic = sh.load(dtype=dtype)
+        for key, (id, f) in sorted(dic.iteritems(), key=lambda x: x[1][0]):
+            yield id, key, f
+        sh.close()
+
+
+def _readRelations(fin, mode, block=1000000):
+    """
+    Yield blocks of relations `(idws, idcs, freqs)` as arrays.
+    """
+    if mode == 'db':
+        db = SQLite(fin)
+        cursor = db.con.execute('SELECT idw, idc, freq FROM drels')
+        while True:
+            rows = cursor.fetchmany(block)
+            if not rows:
+                break
+            yield np.array(rows, dtype=np.int64).T
+        db.close()
+    else:
+        sh = Shelve(fin)
+        rows = [(idw, idc, f) for (idw, idc), f in sh.load(dtype='drels').iteritems()]
+        sh.close()
+        for i in xrange(0, len(rows), block):
+            yield np.array(rows[i:i+block], dtype=np.int64).T
+
+
+def _isId(key):
+    """
+    Verify whether a context is the id of a document or of a sentence, i.e.,
+    an integer or, in databases, a string of digits.
+    """
+    return isinstance(key, (int, long)) or (isinstance(key, basestring) and key.isdigit())
+
+
+def _globalIds(stores, dtype, mode, contexts='keys'):
+    """
+    Build the global dictionary of all stores for words or contexts.
+
+    Parameters:
+    -----------
+    stores : array_like
+        List of paths to the stores
+    dtype : string {'dwords', 'dctxs'}
+        The dictionary of the stores
+    mode : string {'db', 'shelve'}
+        The mode in which stores are saved
+    contexts : string {None, 'keys', 'ids'}, optional
+        How contexts are merged (see `mergeStores`)
+
+    Returns:
+    --------
+    dic : dictionaries.DictWords
+        Global dictionary containing the sum of frequencies of each key.
+        Ids are assigned in the order of the stores and of the ids of each
+        store, thus the ids of the first store are kept.
+    remaps : array_like
+        List containing an array for each store that maps the ids of the
+        store into the global ids
+    """
+    dic = DictWords()
+    remaps = []
+    offset = 0
+    for fin in stores:
+        pairs = []
+        last = offset - 1
+        for id, key, f in _readDictionary(fin, dtype, mode):
+            if dtype == 'dctxs' and contexts != 'keys':
+                if contexts is None and _isId(key):
+                    logger.error('Cannot merge stores - contexts of %s are ids of documents, sentences '
+                                 'or hashed buckets: set `contexts` to `ids` to number them per store '
+                                 'or to `keys` to merge them by value' % fin)
+                    sys.exit(1)
+                if contexts == 'ids':
+                    if not _isId(key):
+                        logger.error('Cannot merge stores - context %s of %s is not an id' % (key, fin))
+                        sys.exit(1)
+                    key = int(key) + offset
+                    last = max(last, key)
+            dic[key] = f
+            pairs.append((id, dict.__getitem__(dic, key)[0]))
+        offset = last + 1
+        remap = np.zeros(max([id for id, _ in pairs] or [0])+1, dtype=np.int64)
+        for id, gid in pairs:
+            remap[id] = gid
+        remaps.append(remap)
+    logger.info('global %s containing %d keys' % (dtype, len(dic)))
+    return dic, remaps
+
+
+def mergeStores(stores, fout, mode='db', tmpdir=None, chunk=10000000, contexts=None):
+    """
+    Merge corpus stores into a single store with a global vocabulary.
+
+    Parameters:
+    -----------
+    stores : array_like
+        List of paths to stores saved by `Corpus.save`
+    fout : string
+        Path to the merged store
+    mode : string {'db', 'shelve'}, optional
+        The mode in which stores are saved. The merged store is saved in the
+        same mode.
+    tmpdir : string, optional
+        Folder of the runs of the external merge of relations
+    chunk : int, optional
+        Number of relations kept in memory before writing a run
+    contexts : string {None, 'keys', 'ids'}, optional
+        How contexts of the stores are merged:
+            keys: contexts are merged by value, as contexts of windows, of 
+            dependencies and hashed buckets
+            ids: contexts are ids local to each store, as documents and sentences,
+            thus the ids of each store are added to the greatest id of the previous
+            stores plus one
+            None: contexts are merged by value, refusing contexts that are ids
+
+    Returns:
+    --------
+    dwords, dctxs : dictionaries.DictWords
+        Global dictionaries of words and contexts
+
+    Notes:
+    ------
+    Stores must be extracted using the same settings, since relations are
+    summed up regardless the settings. Stores in `shelve` mode are loaded
+    at once, since shelves cannot be read in parts.
+    """
+    if mode not in ['db', 'shelve']:
+        logger.error('Cannot merge stores - `mode=%s` no supported' % mode)
+        sys.exit(1)
+    if contexts not in [None, 'keys', 'ids']:
+        logger.error('Cannot merge stores - `contexts=%s` no supported' % contexts)
+        sys.exit(1)
+    dwords, wremaps = _globalIds(stores, 'dwords', mode)
+    dctxs, cremaps = _globalIds(stores, 'dctxs', mode, contexts)
+    drels = ExternalRels(tmpdir=tmpdir, chunk=chunk)
+    for fin, wremap, cremap in zip(stores, wremaps, cremaps):
+        for idws, idcs, freqs in _readRelations(fin, mode):
+            drels.extend(wremap[idws], cremap[idcs], freqs)
+        logger.info('relations of %s added' % fin)
+    dwords.save(fout, dtype='dwords', mode=mode, new=True)
+    dctxs.save(fout, dtype='dctxs', mode=mode)
+    if mode == 'db':
+        drels.save(fout, dtype='drels', mode=mode)
+    else:
+        drels.toDict().save(fout, dtype='drels', mode=mode)
+    drels.close()
+    logger.info('%d stores merged into %s' % (len(stores), fout))
+    return dwords, dctxs
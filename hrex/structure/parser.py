@@ -13,7 +13,11 @@ class ParserInterface(object):
     """
     Interface to classes that extract content from parsed files.
     """
-    def __init__(self, extract='NounPhrases', mode='word'):
+    # True for parsers whose lemmas are computed from the words by a lemmatizer 
+    # in `listOfTerms` instead of being read from the files (see `cache.TokenCache`)
+    computes_lemmas = False
+
+    def __init__(self, extract='NounPhrases', mode='word', fast=False):
         """
         Initiate the elements of the class.
         
@@ -28,6 +32,8 @@ class ParserInterface(object):
             Specifies the mode of dealing with elements.
             word: words are extracted
             lemma: lemmas are extracted
+        fast : boolean {True, False}, optional
+            Skip the content that is not extracted when reading the files
 
         Notes:
         ------
@@ -40,6 +46,7 @@ class ParserInterface(object):
         """ 
         self.extract = extract
         self.mode = mode
+        self.fast = fast
         self.phrase = ''
         self.tree = ''
         self.deps = []
@@ -54,6 +61,18 @@ class ParserInterface(object):
         pass
 
 
+    def sentenceOffsets(self):
+        """
+        Find the byte offset of the end of each sentence of the file.
+
+        Yields:
+        -------
+        offset : int
+            The offset after each sentence
+        """
+        pass
+
+
     def getPhrase(self):
         """
         Returns:
@@ -187,6 +206,26 @@ class ParserInterface(object):
         pass
 
 
+    def dependencies(self):
+        """
+        Extract the dependencies of the sentence.
+
+        Returns:
+        --------
+        deps : array_like
+            List of tuples `(head, relation, dependent)`, where `head` and 
+            `dependent` are the positions of the words in the sentence, 
+            starting at 1, and 0 is the root of the sentence
+
+        Examples:
+        ---------
+        >>> Parser().deps = ['amod(ball-5, red-4)']
+        >>> Parser().dependencies()
+            [(5, 'amod', 4)]
+        """
+        pass
+
+
     def plainPhrase(self):
         """
         Extract the conent of the phrase
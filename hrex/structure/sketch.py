@@ -0,0 +1,156 @@
+#!/usr/bin/python
+#-*- coding: utf-8 -*-
+
+"""
+This module contains an approximate counter of relations between words and
+contexts. Instead of storing the frequency of each pair `(idw, idc)`, pairs
+are counted in a count-min sketch [1] using a fixed amount of memory, and
+only the most frequent pairs (heavy hitters) are kept in a table.
+
+[1] Cormode, G. and Muthukrishnan, S. An improved data stream summary: the
+count-min sketch and its applications. Journal of Algorithms, 55(1), 2005.
+
+@author: granada
+"""
+import sys
+sys.path.insert(0, '..') # This line is inserted to find the package utils.arguments
+import logging
+logger = logging.getLogger('structure.sketch')
+logging.basicConfig(format='%(asctime)s : %(levelname)s : %(message)s', level=logging.INFO)
+
+import math
+import numpy as np
+
+from dictionaries import DictRels
+
+
+class CountMinSketch(object):
+    """
+    Count-min sketch of the pairs `(idw, idc)` with a table of heavy hitters.
+    It may be used in place of `DictRels` to count relations, since pairs
+    are added in the same way:
+        >>> drels = CountMinSketch(memory=2**20)
+        >>> drels[(1, 2)] = 1
+        >>> drels.heavyHitters()
+            {(1, 2): 1}
+
+    Notes:
+    ------
+    The sketch contains `depth` rows of `width` counters. Each pair is added to
+    one counter of each row and its frequency is estimated as the minimum of
+    these counters. Estimates never underestimate the frequency and, with
+    probability at least `1 - exp(-depth)`, they overestimate the frequency
+    of a pair by at most `e * N / width`, where `N` is the sum of all
+    frequencies (see `error`).
+    """
+    def __init__(self, memory=2**28, depth=4, topk=1000000, batch=100000, seed=0):
+        """
+        Initiate the sketch.
+
+        Parameters:
+        -----------
+        memory : int, optional
+            Number of bytes used by the counters of the sketch
+        depth : int, optional
+            Number of rows of the sketch, i.e., number of hash functions
+        topk : int, optional
+            Number of the most frequent pairs kept in the table of heavy hitters
+        batch : int, optional
+            Number of pairs added to the sketch at once
+        seed : int, optional
+            Seed of the hash functions
+        """
+        self.depth = depth
+        self.width = max(1, memory / (depth * 8))
+        self.table = np.zeros((depth, self.width), dtype=np.int64)
+        rand = np.random.RandomState(seed)
+        self.a = rand.randint(1, 2**63-1, size=depth, dtype=np.uint64) | np.uint64(1)
+        self.b = rand.randint(0, 2**63-1, size=depth, dtype=np.uint64)
+        self.topk = topk
+        self.batch = batch
+        self.keys = []
+        self.values = []
+        self.heavy = np.zeros(0, dtype=np.uint64)
+        self.total = 0
+
+
+    def __setitem__(self, key, value):
+        """
+        Add `value` to the frequency of the pair `key = (idw, idc)`.
+        """
+        idw, idc = key
+        self.keys.append((idw << 32) | idc)
+        self.values.append(value)
+        if len(self.keys) >= self.batch:
+            self.flush()
+
+
+    def _hash(self, keys, row):
+        """
+        Return the column of `keys` in a row of the sketch using a
+        multiply-shift hash function.
+        """
+        h = (keys * self.a[row] + self.b[row]) >> np.uint64(32)
+        return (h % np.uint64(self.width)).astype(np.int64)
+
+
+    def estimate(self, keys):
+        """
+        Return the estimated frequency of an array of encoded pairs.
+        """
+        est = self.table[0][self._hash(keys, 0)]
+        for row in xrange(1, self.depth):
+            est = np.minimum(est, self.table[row][self._hash(keys, row)])
+        return est
+
+
+    def flush(self):
+        """
+        Add the buffered pairs to the sketch and update the table of heavy hitters.
+        """
+        if not self.keys:
+            return
+        keys = np.asarray(self.keys, dtype=np.uint64)
+        values = np.asarray(self.values, dtype=np.int64)
+        self.keys = []
+        self.values = []
+        keys, inv = np.unique(keys, return_inverse=True)
+        values = np.bincount(inv, weights=values).astype(np.int64)
+        for row in xrange(self.depth):
+            np.add.at(self.table[row], self._hash(keys, row), values)
+        self.total += int(values.sum())
+
+        candidates = np.union1d(self.heavy, keys)
+        if len(candidates) > self.topk:
+            est = self.estimate(candidates)
+            candidates = np.sort(candidates[np.argpartition(-est, self.topk-1)[:self.topk]])
+        self.heavy = candidates
+
+
+    def error(self):
+        """
+        Return the maximum overestimation of frequencies, i.e., `e * N / width`,
+        that holds with probability `1 - exp(-depth)`.
+        """
+        return math.e * self.total / self.width
+
+
+    def heavyHitters(self):
+        """
+        Return the most frequent pairs and their estimated frequencies.
+
+        Returns:
+        --------
+        drels : dictionaries.DictRels
+            Dictionary in the form `(idw, idc): freq` containing at most
+            `topk` pairs
+        """
+        self.flush()
+        drels = DictRels()
+        est = self.estimate(self.heavy)
+        for key, f in zip(self.heavy.tolist(), est.tolist()):
+            drels[(int(key >> 32), int(key & 0xffffffff))] = f
+        logger.info('kept %d pairs with maximum error of %.1f (probability %.3f)'
+                    % (len(drels), self.error(), 1 - math.exp(-self.depth)))
+        return drels
+#End of class CountMinSketch
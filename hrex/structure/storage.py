@@ -48,7 +48,7 @@ class SQLite(object):
         cur.executescript(';'.join(["drop table if exists %s" %i for i in tables]))
 
 
-    def _createTable(self, table):
+    def _createTable(self, table, name=None):
         """
         Create a new table in the database to a dictionary
 
@@ -56,44 +56,47 @@ class SQLite(object):
         -----------
         table : string {'dwords', 'dctxs', 'drels'}
             Type of table to be created
+        name : string, optional
+            Name of the table in case different of `table`
         """
+        name = name or table
         cur = self.con.cursor()
         if table == 'dwords':
-            cur.execute('DROP TABLE IF EXISTS dwords')
+            cur.execute('DROP TABLE IF EXISTS %s' % name)
             self.con.commit()
-            newTable = """CREATE TABLE dwords(
+            newTable = """CREATE TABLE %s(
                             idw INTEGER PRIMARY KEY, 
                             word TEXT, 
                             freq INTEGER
-                          );"""
+                          );""" % name
         elif table == 'dctxs':
-            cur.execute('DROP TABLE IF EXISTS dctxs')
+            cur.execute('DROP TABLE IF EXISTS %s' % name)
             self.con.commit()
-            newTable = """CREATE TABLE dctxs(
+            newTable = """CREATE TABLE %s(
                             idc INTEGER PRIMARY KEY, 
                             context TEXT, 
                             freq INTEGER
-                          );"""
+                          );""" % name
         elif table == 'drels':
-            cur.execute('DROP TABLE IF EXISTS drels')
+            cur.execute('DROP TABLE IF EXISTS %s' % name)
             self.con.commit()
-            newTable = """CREATE TABLE drels(
+            newTable = """CREATE TABLE %s(
                             idw INTEGER, 
                             idc INTEGER, 
                             freq INTEGER, 
                             FOREIGN KEY (idw) REFERENCES dwords(idw),
                             FOREIGN KEY (idc) REFERENCES dwords(idc),
                             PRIMARY KEY (idc, idw)
-                          );"""
+                          );""" % name
         else:
-            logger.error('Cannot create table of type %d' % table)
+            logger.error('Cannot create table of type %s' % table)
             return False
         cur.execute(newTable)
         self.con.commit()
         return True
 
 
-    def save(self, dic, dtype='dwords', new=True):
+    def save(self, dic, dtype='dwords', new=True, name=None):
         """
         Save the content of a dictionary `dic`
 
@@ -105,25 +108,28 @@ class SQLite(object):
             The type of dictionary to be saved
         new : Boolean {True, False}, optional
             Create a new table to the dictionary
+        name : string, optional
+            Name of the table in case different of `dtype`
         """
+        name = name or dtype
         if new:
-            self._createTable(dtype)
+            self._createTable(dtype, name=name)
         cursor = self.con.cursor()
         elem = dic.dic2Tuples(key='id')
         if dtype == 'dwords':
-            cursor.executemany('INSERT INTO dwords (idw, word, freq) VALUES (?,?,?)', elem)
+            cursor.executemany('INSERT INTO %s (idw, word, freq) VALUES (?,?,?)' % name, elem)
         elif dtype == 'dctxs':
-            cursor.executemany('INSERT INTO dctxs (idc, context, freq) VALUES (?,?,?)', elem)
+            cursor.executemany('INSERT INTO %s (idc, context, freq) VALUES (?,?,?)' % name, elem)
         elif dtype == 'drels':
-            cursor.executemany('INSERT INTO drels (idw, idc, freq) VALUES (?,?,?)', elem)
+            cursor.executemany('INSERT INTO %s (idw, idc, freq) VALUES (?,?,?)' % name, elem)
         else:
-            logger.error('Cannot save dictionary of type %d' % dtype)
+            logger.error('Cannot save dictionary of type %s' % dtype)
             return False
         self.con.commit()
         return True
 
 
-    def load(self, dtype='dwords'):
+    def load(self, dtype='dwords', name=None):
         """
         Load the content of a dictionary `dic`
 
@@ -131,30 +137,201 @@ class SQLite(object):
         -----------
         dtype : string {'dwords', 'dctxs', 'drels'}
             The type of dictionary to be loaded
+        name : string, optional
+            Name of the table in case different of `dtype`
         """
+        name = name or dtype
         dic = {}
         cursor = self.con.cursor()
         if dtype == 'dwords':
-            cursor.execute('SELECT * FROM dwords')
+            cursor.execute('SELECT * FROM %s' % name)
             for tup in cursor:
                 id, word, f = tup
                 dic[word] = (id, f)
         elif dtype == 'dctxs':
-            cursor.execute('SELECT * FROM dctxs')
+            cursor.execute('SELECT * FROM %s' % name)
             for tup in cursor:
                 id, ctx, f = tup
                 dic[ctx] = (id, f)
         elif dtype == 'drels':
-            cursor.execute('SELECT * FROM drels')
+            cursor.execute('SELECT * FROM %s' % name)
             for tup in cursor:
                 idw, idc, f = tup
                 dic[(idw, idc)] = f
         else:
-            logger.error('Cannot load dictionary of type %d' % dtype)
+            logger.error('Cannot load dictionary of type %s' % dtype)
             return False
         return dic
 
 
+    def _createManifest(self):
+        """
+        Create the tables of the manifest of processed files in case they 
+        do not exist. The manifest contains the files, the settings of the 
+        extraction and the counts contributed by each file to the dictionaries.
+        """
+        cur = self.con.cursor()
+        cur.executescript("""
+            CREATE TABLE IF NOT EXISTS manifest(
+                idf INTEGER PRIMARY KEY, 
+                path TEXT UNIQUE, 
+                size INTEGER, 
+                mtime REAL, 
+                sha1 TEXT
+            );
+            CREATE TABLE IF NOT EXISTS settings(
+                key TEXT PRIMARY KEY, 
+                value TEXT
+            );
+            CREATE TABLE IF NOT EXISTS fwords(
+                idf INTEGER, idw INTEGER, freq INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS fctxs(
+                idf INTEGER, idc INTEGER, freq INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS frels(
+                idf INTEGER, idw INTEGER, idc INTEGER, freq INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS fwords_idf ON fwords(idf);
+            CREATE INDEX IF NOT EXISTS fctxs_idf ON fctxs(idf);
+            CREATE INDEX IF NOT EXISTS frels_idf ON frels(idf);
+        """)
+        self.con.commit()
+
+
+    def loadManifest(self):
+        """
+        Load the manifest of processed files.
+
+        Returns:
+        --------
+        manifest : dict
+            Dictionary in the form `path: (idf, size, mtime, sha1)`
+        """
+        self._createManifest()
+        manifest = {}
+        cursor = self.con.cursor()
+        cursor.execute('SELECT idf, path, size, mtime, sha1 FROM manifest')
+        for idf, path, size, mtime, sha1 in cursor:
+            manifest[path] = (idf, size, mtime, sha1)
+        return manifest
+
+
+    def addFile(self, path, size, mtime, sha1):
+        """
+        Add a processed file to the manifest.
+
+        Returns:
+        --------
+        idf : int
+            The id of the file in the manifest
+        """
+        self._createManifest()
+        cursor = self.con.cursor()
+        cursor.execute('INSERT INTO manifest (path, size, mtime, sha1) VALUES (?,?,?,?)', 
+                       (path, size, mtime, sha1))
+        self.con.commit()
+        return cursor.lastrowid
+
+
+    def addFiles(self, files):
+        """
+        Add many processed files to the manifest.
+
+        Parameters:
+        -----------
+        files : array_like
+            List of tuples `(path, size, mtime, sha1)`
+        """
+        self._createManifest()
+        self.con.executemany('INSERT INTO manifest (path, size, mtime, sha1) VALUES (?,?,?,?)', files)
+        self.con.commit()
+
+
+    def touchFile(self, idf, mtime):
+        """
+        Update the modification time of a file whose content did not change.
+        """
+        self.con.execute('UPDATE manifest SET mtime = ? WHERE idf = ?', (mtime, idf))
+        self.con.commit()
+
+
+    def removeFile(self, idf):
+        """
+        Remove a file and its counts from the manifest.
+        """
+        cursor = self.con.cursor()
+        for table in ['manifest', 'fwords', 'fctxs', 'frels']:
+            cursor.execute('DELETE FROM %s WHERE idf = ?' % table, (idf,))
+        self.con.commit()
+
+
+    def saveFileCounts(self, idf, words, ctxs, rels):
+        """
+        Save the counts contributed by a file to the dictionaries.
+
+        Parameters:
+        -----------
+        idf : int
+            The id of the file in the manifest
+        words : array_like
+            List of tuples `(idw, freq)`
+        ctxs : array_like
+            List of tuples `(idc, freq)`
+        rels : array_like
+            List of tuples `(idw, idc, freq)`
+        """
+        cursor = self.con.cursor()
+        cursor.executemany('INSERT INTO fwords (idf, idw, freq) VALUES (%d,?,?)' % idf, words)
+        cursor.executemany('INSERT INTO fctxs (idf, idc, freq) VALUES (%d,?,?)' % idf, ctxs)
+        cursor.executemany('INSERT INTO frels (idf, idw, idc, freq) VALUES (%d,?,?,?)' % idf, rels)
+        self.con.commit()
+
+
+    def loadFileCounts(self, idf):
+        """
+        Load the counts contributed by a file to the dictionaries.
+
+        Returns:
+        --------
+        words, ctxs, rels : array_like
+            Lists in the same form of `saveFileCounts`
+        """
+        cursor = self.con.cursor()
+        words = list(cursor.execute('SELECT idw, freq FROM fwords WHERE idf = ?', (idf,)))
+        ctxs = list(cursor.execute('SELECT idc, freq FROM fctxs WHERE idf = ?', (idf,)))
+        rels = list(cursor.execute('SELECT idw, idc, freq FROM frels WHERE idf = ?', (idf,)))
+        return words, ctxs, rels
+
+
+    def saveSettings(self, settings):
+        """
+        Save the settings of the extraction.
+
+        Parameters:
+        -----------
+        settings : dict
+            Dictionary in the form `key: value`, where values are stored as text
+        """
+        self._createManifest()
+        self.con.executemany('INSERT OR REPLACE INTO settings (key, value) VALUES (?,?)', 
+                             [(k, repr(v)) for k, v in settings.iteritems()])
+        self.con.commit()
+
+
+    def loadSettings(self):
+        """
+        Load the settings of the extraction.
+
+        Returns:
+        --------
+        settings : dict
+            Dictionary in the form `key: value`, where values are text
+        """
+        self._createManifest()
+        return dict(self.con.execute('SELECT key, value FROM settings'))
+
+
     def close(self):
         """
         Close an open connection to the database.
@@ -199,7 +376,7 @@ class Shelve():
         self.sh.close()
     
 
-    def save(self, dic, dtype='dwords'):
+    def save(self, dic, dtype='dwords', name=None):
         """
         Save the content of a dictionary `dic`
 
@@ -209,26 +386,26 @@ class Shelve():
             The dictionary to be saved
         dtype : string {'dwords', 'dctxs', 'drels'}
             The type of dictionary to be saved
-        new : Boolean {True, False}, optional
-            Create a new table to the dictionary
+        name : string, optional
+            Name of the dictionary in case different of `dtype`
         """
         self.sh = shelve.open(self.shname, writeback=True)
-        self.sh[dtype] = dic.simplify()
+        self.sh[name or dtype] = dic.simplify()
 
 
-    def load(self, dtype='dwords'):
+    def load(self, dtype='dwords', name=None):
         """
         Load the content of a dictionary `dic`
 
         Parameters:
         -----------
-        dic : {DictWords, DictRels} instance
-            The dictionary to be loaded
         dtype : string {'dwords', 'dctxs', 'drels'}
             The type of dictionary to be loaded
+        name : string, optional
+            Name of the dictionary in case different of `dtype`
         """
         self.sh = shelve.open(self.shname, writeback=True)
-        return self.sh[dtype]
+        return self.sh[name or dtype]
 
 
     def close(self):
@@ -0,0 +1,125 @@
+#!/usr/bin/python
+#-*- coding: utf-8 -*-
+
+"""
+This module benchmarks the readers of the file `corpus.stanford` and the
+decoders of terms of `Stanford.listOfTerms`.
+
+Usage:
+    python bench_stanford.py [file.parsed]
+
+When no file is given, a file containing long trees is generated in a
+temporary folder.
+
+@author: granada
+"""
+import sys
+sys.path.insert(0, '..')
+import logging
+logger = logging.getLogger('test.bench_stanford')
+logging.basicConfig(format='%(asctime)s : %(levelname)s : %(message)s', level=logging.INFO)
+
+import os
+import time
+import random
+import shutil
+import tempfile
+
+from corpus import stanford
+
+
+def generate(fname, nb_sents=20000, nb_words=30):
+    """
+    Generate a parsed file containing `nb_sents` sentences with `nb_words`
+    words each. The tree of each sentence has one line per word.
+    """
+    words = [('car', 'NN'), ('cars', 'NNS'), ('red', 'JJ'), ('drives', 'VBZ'),
+             ('the', 'DT'), ('in', 'IN'), ('AC/DC', 'NNP'), ('.', '.')]
+    with open(fname, 'w') as fout:
+        for _ in xrange(nb_sents):
+            sent = [random.choice(words) for _ in xrange(nb_words)]
+            fout.write(' '.join('%s/%s' % (w, t) for w, t in sent)+'\n\n')
+            fout.write('(ROOT\n')
+            for w, t in sent:
+                fout.write('  (NP (%s %s))\n' % (t, w))
+            fout.write(')\n\n')
+            for i in xrange(1, nb_words):
+                fout.write('dep(%s-%d, %s-%d)\n' % (sent[i-1][0], i, sent[i][0], i+1))
+            fout.write('\n')
+
+
+def bench(fname, **kwargs):
+    """
+    Return the time spent to read all terms of `fname`.
+    """
+    start = time.time()
+    parsed = stanford.Stanford(fname, **kwargs)
+    nb_terms = 0
+    for _ in parsed:
+        nb_terms += len(parsed.listOfTerms(content_words=True, ctw='njv', normalize=True))
+    return time.time() - start, nb_terms
+
+
+def benchTerms(fname, engine, repeat=3):
+    """
+    Return the time spent by `listOfTerms` to decode the phrases of `fname`
+    using `engine` for each setting, and the terms that were decoded. Phrases 
+    are read before the timing, thus only the decoding is measured.
+    """
+    parsed = stanford.Stanford(fname, extract='WordsAndTags', fast=True)
+    phrases = list(parsed)
+    results = []
+    for settings in [{'content_words': True, 'ctw': 'n'},
+                     {'content_words': True, 'ctw': 'njv', 'lower': True},
+                     {'content_words': False, 'normalize': False}]:
+        best = None
+        for _ in xrange(repeat):
+            start = time.time()
+            terms = []
+            for phrase in phrases:
+                parsed.phrase = phrase
+                terms.append(parsed.listOfTerms(engine=engine, **settings))
+            elapsed = time.time() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results.append((settings, best, terms))
+    return results
+
+
+def test_bench(fname=None):
+    folder = None
+    if not fname:
+        folder = tempfile.mkdtemp()
+        fname = os.path.join(folder, 'bench.parsed')
+        generate(fname)
+    try:
+        run(fname)
+    finally:
+        if folder is not None:
+            shutil.rmtree(folder)
+    print 'Finished!'
+
+
+def run(fname):
+    """
+    Compare the readers and the decoders of terms on `fname`.
+    """
+    logger.info('file size: %.1f MB' % (os.path.getsize(fname) / 1048576.0))
+
+    tfull, nfull = bench(fname, extract='WordsAndTags')
+    logger.info('full reader: %.2fs (%d terms)' % (tfull, nfull))
+    tfast, nfast = bench(fname, extract='WordsAndTags', fast=True)
+    logger.info('fast reader: %.2fs (%d terms)' % (tfast, nfast))
+    if nfull != nfast:
+        raise ValueError('readers extracted different terms')
+    logger.info('speedup: %.2fx' % (tfull / tfast))
+
+    split = benchTerms(fname, 'split')
+    regex = benchTerms(fname, 'regex')
+    for (settings, tsplit, tsplit_terms), (_, tregex, tregex_terms) in zip(split, regex):
+        if tsplit_terms != tregex_terms:
+            raise ValueError('decoders extracted different terms: %s' % settings)
+        logger.info('listOfTerms(%s): split %.2fs, regex %.2fs, speedup: %.2fx' 
+                    % (settings, tsplit, tregex, tsplit / tregex))
+
+if __name__ == "__main__":
+    test_bench(*sys.argv[1:2])
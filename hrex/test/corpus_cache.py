@@ -0,0 +1,208 @@
+#!/usr/bin/python
+#-*- coding: utf-8 -*-
+
+"""
+This module tests the file `corpus.cache`
+
+@author: granada
+"""
+import sys
+sys.path.insert(0, '..')
+import logging
+logger = logging.getLogger('test.corpus_cache')
+logging.basicConfig(format='%(asctime)s : %(levelname)s : %(message)s', level=logging.INFO)
+
+import os
+import shutil
+import tempfile
+
+from corpus.stanford import Stanford
+from corpus.cache import TokenCache
+from corpus.corpus import Corpus
+from corpus import lemmatizer
+from samples import generate
+
+SETTINGS = [{'content_words': False, 'normalize': False},
+            {'content_words': True, 'ctw': 'njv'},
+            {'content_words': True, 'ctw': 'n', 'lower': True}]
+
+
+class CountingStanford(Stanford):
+    """
+    Stanford reader that counts the files it opens.
+    """
+    opened = 0
+
+    def __init__(self, *args, **kwargs):
+        CountingStanford.opened += 1
+        Stanford.__init__(self, *args, **kwargs)
+
+
+def test_terms():
+    folder = tempfile.mkdtemp()
+    try:
+        generate(folder)
+        for filename in sorted(os.listdir(folder)):
+            path = os.path.join(folder, filename)
+            for settings in SETTINGS:
+                direct = Stanford(path, fast=True).document(**settings)
+                for _ in xrange(2):
+                    if TokenCache(path).document(**settings) != direct:
+                        raise ValueError('cached terms differ: %s %s' % (filename, settings))
+    finally:
+        shutil.rmtree(folder)
+
+
+def lemma(word, pos):
+    """
+    Lemmatize plural nouns in lowercase, as WordNet does not find 
+    capitalized words (e.g., `Cars`).
+    """
+    if pos == 'n' and word.islower() and word.endswith('s'):
+        return word[:-1]
+    return word
+
+
+def test_lemmatizer():
+    calls = []
+    def normalization(tag):
+        calls.append(tag)
+        return Stanford.__new__(Stanford)._normalization(tag)
+    lem = lemmatizer.Lemmatizer(function=lemma)
+    for _ in xrange(3):
+        if lem.lemmatize('dogs', 'NNS', normalization) != 'dog':
+            raise ValueError('wrong lemma of a tagged word')
+        if lem.lemmatize('dogs', 'VBZ', normalization) != 'dogs':
+            raise ValueError('lemma of another tag was used')
+        if lem.lemmatize('the', 'DT', normalization) != 'the':
+            raise ValueError('word that is not content word was lemmatized')
+        if lem.lemmatize('dogs', 'n') != 'dog':
+            raise ValueError('wrong lemma of a normalized PoS')
+    # tags are normalized only on misses
+    if calls != ['NNS', 'VBZ', 'DT']:
+        raise ValueError('tags of cached lemmas were normalized: %s' % calls)
+    if lem.stats()['hits'] != 8 or lem.stats()['misses'] != 4:
+        raise ValueError('wrong statistics of the cache: %s' % lem.stats())
+
+
+def test_lemmas():
+    folder = tempfile.mkdtemp()
+    shared = lemmatizer._shared
+    lemmatizer._shared = lemmatizer.Lemmatizer(function=lemma)
+    try:
+        generate(folder)
+        files = sorted(os.listdir(folder))
+        for mode in ['word', 'lemma']:
+            for lower in [False, True]:
+                for filename in files:
+                    path = os.path.join(folder, filename)
+                    for settings in SETTINGS:
+                        settings = dict(settings, lower=lower)
+                        direct = Stanford(path, mode=mode, fast=True).document(**settings)
+                        cached = TokenCache(path, mode=mode).document(**settings)
+                        if cached != direct:
+                            raise ValueError('cached terms differ: %s %s %s' % (filename, mode, settings))
+                counts = []
+                for cache in [False, True]:
+                    c = Corpus(folder, cache=cache)
+                    c.extractWindow(size=5, lex_mode=mode, lower=lower)
+                    counts.append((dict(c.dwords), dict(c.dctxs), dict(c.drels)))
+                if counts[0] != counts[1]:
+                    raise ValueError('cached extraction differs: %s lower=%s' % (mode, lower))
+        if lemmatizer._shared.stats()['hits'] == 0:
+            raise ValueError('lemmas were not cached')
+    finally:
+        lemmatizer._shared = shared
+        shutil.rmtree(folder)
+
+
+def test_mode():
+    folder = tempfile.mkdtemp()
+    shared = lemmatizer._shared
+    lemmatizer._shared = lemmatizer.Lemmatizer(function=lemma)
+    try:
+        generate(folder)
+        # the lexical mode of an extraction is not kept by the next extractions
+        for extract, kwargs, options in [('extractWindow', {'size': 5}, {}), 
+                                         ('extractWindow', {'size': 5, 'jobs': 2}, {}),
+                                         ('extractWindow', {'size': 5, 'stream': True}, {}),
+                                         ('extractDocument', {}, {'prefetch': 2}),
+                                         ('extractSentences', {}, {}),
+                                         ('extractDependencies', {}, {})]:
+            words = Corpus(folder, **options)
+            getattr(words, extract)(**kwargs)
+            lemmas = Corpus(folder, **options)
+            getattr(lemmas, extract)(lex_mode='lemma', **kwargs)
+            if dict(lemmas.dwords.iteritems()) == dict(words.dwords.iteritems()):
+                raise ValueError('%s %s: lemmas were not extracted' % (extract, kwargs))
+            c = Corpus(folder, **options)
+            getattr(c, extract)(lex_mode='lemma', **kwargs)
+            if 'mode' in c.readopts:
+                raise ValueError('%s %s: lexical mode kept by the corpus' % (extract, kwargs))
+            c = c._representation()
+            getattr(c, extract)(**kwargs)
+            if dict(c.dwords.iteritems()) != dict(words.dwords.iteritems()):
+                raise ValueError('%s %s: words were read in the previous mode' % (extract, kwargs))
+    finally:
+        lemmatizer._shared = shared
+        shutil.rmtree(folder)
+
+
+def test_lazy():
+    folder = tempfile.mkdtemp()
+    try:
+        generate(folder, nb_docs=1)
+        path = os.path.join(folder, 'doc00.parsed')
+        CountingStanford.opened = 0
+        TokenCache(path, Parser=CountingStanford)
+        if CountingStanford.opened != 1:
+            raise ValueError('cache miss did not parse the file')
+        cache = TokenCache(path, Parser=CountingStanford)
+        if CountingStanford.opened != 1:
+            raise ValueError('cache hit opened the parsed file')
+        if cache.document(ctw='nj') != Stanford(path, fast=True).document(ctw='nj'):
+            raise ValueError('cached terms differ')
+    finally:
+        shutil.rmtree(folder)
+
+
+def test_cache_dir():
+    folder = tempfile.mkdtemp()
+    try:
+        corpus = os.path.join(folder, 'corpus')
+        cache_dir = os.path.join(folder, 'cache')
+        generate(corpus, nb_docs=2)
+        os.mkdir(cache_dir)
+        before = sorted(os.listdir(corpus))
+        for filename in before:
+            path = os.path.join(corpus, filename)
+            cache = TokenCache(path, cache_dir=cache_dir)
+            if not cache.fcache.startswith(cache_dir):
+                raise ValueError('sidecar not written into the cache folder')
+            if cache.document() != Stanford(path, fast=True).document():
+                raise ValueError('cached terms differ')
+        if sorted(os.listdir(corpus)) != before:
+            raise ValueError('sidecars written into the corpus folder')
+        if len(os.listdir(cache_dir)) != len(before):
+            raise ValueError('missing sidecars in the cache folder')
+        # sentence indexes of sampled extractions
+        counts = []
+        for cache in [False, True]:
+            c = Corpus(corpus, cache=cache, cache_dir=cache_dir, sample=0.5, sample_unit='sentence')
+            c.extractWindow(size=5, jobs=2)
+            counts.append((dict(c.dwords), dict(c.dctxs), dict(c.drels)))
+        if counts[0] != counts[1]:
+            raise ValueError('cached extraction differs')
+        if sorted(os.listdir(corpus)) != before:
+            raise ValueError('sentence indexes written into the corpus folder')
+    finally:
+        shutil.rmtree(folder)
+    print 'Finished!'
+
+if __name__ == "__main__":
+    test_terms()
+    test_lemmatizer()
+    test_lemmas()
+    test_mode()
+    test_lazy()
+    test_cache_dir()
@@ -0,0 +1,640 @@
+#!/usr/bin/python
+#-*- coding: utf-8 -*-
+
+"""
+This module tests the file `corpus.corpus`. Each extraction is compared to
+the serial extraction of the same corpus.
+
+@author: granada
+"""
+import sys
+sys.path.insert(0, '..')
+import logging
+logger = logging.getLogger('test.corpus_corpus')
+logging.basicConfig(format='%(asctime)s : %(levelname)s : %(message)s', level=logging.INFO)
+
+import os
+import bz2
+import gzip
+import math
+import shutil
+import tempfile
+import warnings
+
+from corpus import corpus as hcorpus
+from corpus.corpus import Corpus
+from corpus.stanford import Stanford
+from corpus.conllu import CoNLLU
+from structure.dictionaries import DictHashed
+from structure.external import RECORD
+from samples import generate, generateCoNLLU
+
+
+def counts(corpus):
+    """
+    Return the dictionaries of `corpus` as plain dictionaries, where contexts
+    are decoded.
+    """
+    return (dict(corpus.dwords.iteritems()), dict(corpus.decodeContexts().iteritems()),
+            dict(corpus.drels.iteritems()))
+
+
+def compare(name, corpus, expected):
+    """
+    Raise an error when the dictionaries of `corpus` differ from `expected`.
+    """
+    got = counts(corpus)
+    for label, a, b in zip(['words', 'contexts', 'relations'], got, expected):
+        if a != b:
+            raise ValueError('%s: %s differ from the serial extraction' % (name, label))
+
+
+def compareVariants(folder, extract, variants, options=None, **kwargs):
+    """
+    Extract the corpus of `folder` calling the method `extract` of a serial 
+    `Corpus` and compare its dictionaries to the dictionaries of each variant.
+
+    Parameters:
+    -----------
+    folder : string
+        Folder of the corpus
+    extract : string
+        Name of the method of `Corpus` that extracts the relations
+    variants : array_like
+        List of tuples `(args, options)` containing the keyword arguments 
+        added to `kwargs` when calling `extract` and the keyword arguments 
+        added to `options` when creating the `Corpus`
+    options : dict, optional
+        Keyword arguments of `Corpus` shared by all extractions
+    kwargs : dict
+        Keyword arguments of `extract` shared by all extractions
+
+    Returns:
+    --------
+    expected : tuple
+        Dictionaries of the serial extraction (see `counts`)
+    """
+    options = options or {}
+    c = Corpus(folder, **options)
+    getattr(c, extract)(**kwargs)
+    expected = counts(c)
+    for args, extra in variants:
+        c = Corpus(folder, **dict(options, **extra))
+        getattr(c, extract)(**dict(kwargs, **args))
+        compare('%s %s %s' % (extract, args, extra), c, expected)
+    return expected
+
+
+def byKeys(corpus):
+    """
+    Return the frequencies of words, contexts and relations indexed by keys
+    instead of ids, since ids depend on the order that words are seen.
+    """
+    words = corpus.dwords.id2key()
+    ctxs = corpus.decodeContexts().id2key()
+    return (dict((w, f) for w, (_, f) in corpus.dwords.iteritems() if f),
+            dict((unicode(c), f) for c, (_, f) in corpus.decodeContexts().iteritems() if f),
+            dict(((words[idw][0], unicode(ctxs[idc][0])), f) for (idw, idc), f in corpus.drels.iteritems() if f))
+
+
+def test_processes(folder):
+    for size in [3, 5]:
+        compareVariants(folder, 'extractWindow', [({'jobs': 3}, {}), ({'jobs': 0}, {})], size=size)
+    for extract in ['extractDocument', 'extractSentences']:
+        compareVariants(folder, extract, [({'jobs': 3}, {})])
+
+
+def test_options(folder):
+    # options that cannot be used together
+    for args, options in [({'checkpoint': 'checkpoint.db', 'jobs': 2}, {}),
+                          ({'sketch': {}, 'size': [3, 5]}, {}),
+                          ({'external': {}, 'sketch': {}}, {}),
+                          ({}, {'encode_contexts': True, 'hash_contexts': 4}),
+                          ({}, {'sample': 0.5, 'shard_size': 100}),
+                          ({}, {'prefetcher': 'fork'}),
+                          ({}, {'prefetch': 2, 'shard_size': 100}),
+                          ({'checkpoint': 'checkpoint.db'}, {'prefetch': 2})]:
+        try:
+            Corpus(folder, **options).extractWindow(**args)
+        except SystemExit:
+            continue
+        raise ValueError('options were not rejected: %s %s' % (args, options))
+
+
+def test_stream(folder):
+    for size in [3, 5]:
+        compareVariants(folder, 'extractWindow', [({'stream': True}, {})], size=size)
+    # windows that do not cross documents count each document on its own
+    expected = [{}, {}, {}]
+    for filename in Corpus(folder).docs:
+        c = Corpus(folder)
+        c.docs = [filename]
+        c.extractWindow(size=5)
+        for total, dic in zip(expected, byKeys(c)):
+            for key, f in dic.iteritems():
+                total[key] = total.get(key, 0) + f
+    c = Corpus(folder)
+    c.extractWindow(size=5, boundary='document')
+    if byKeys(c) != tuple(expected):
+        raise ValueError('windows crossed documents')
+    c = Corpus(folder)
+    c.extractWindow(size=5, boundary='sentence')
+    if sum(c.drels.itervalues()) >= sum(expected[2].itervalues()):
+        raise ValueError('windows crossed sentences')
+    for boundary in ['document', 'sentence']:
+        compareVariants(folder, 'extractWindow', [({'jobs': 3}, {})], size=5, boundary=boundary)
+
+
+def test_numpy(folder):
+    variants = [({'engine': 'numpy'}, {}), ({'engine': 'numpy', 'stream': True}, {}), 
+                ({'engine': 'numpy', 'jobs': 3}, {})]
+    for size in [3, 5, 'all']:
+        compareVariants(folder, 'extractWindow', variants[:1] if size == 'all' else variants, size=size)
+    for boundary in ['document', 'sentence']:
+        compareVariants(folder, 'extractWindow', variants[:1], size=5, boundary=boundary)
+    # batches smaller than the window
+    c = Corpus(folder)
+    c.extractWindow(size=5, stream=True)
+    expected = counts(c)
+    c = Corpus(folder)
+    window = hcorpus.WindowStream(2, c.dwords, c.dctxs, c.drels, engine='numpy', batch=3)
+    for filename in c.docs:
+        for terms in hcorpus._sentenceTerms(c._reader(filename)):
+            window.add(terms)
+    window.flush()
+    compare('numpy batches', c, expected)
+
+
+def test_shards(folder):
+    c = Corpus(folder, shard_size=150)
+    if len(c._splitDocuments(c.docs)) <= len(c.docs):
+        raise ValueError('documents were not split into shards')
+    for size in [3, 5]:
+        compareVariants(folder, 'extractWindow', [({'jobs': 3}, {'shard_size': 150})], size=size)
+    for boundary in ['document', 'sentence']:
+        compareVariants(folder, 'extractWindow', [({'jobs': 3}, {'shard_size': 150})], size=5, boundary=boundary)
+    for extract in ['extractDocument', 'extractSentences']:
+        compareVariants(folder, extract, [({'jobs': 3}, {'shard_size': 150})])
+
+
+def test_cache(folder):
+    cache = tempfile.mkdtemp()
+    try:
+        variants = [({}, {'cache': True, 'cache_dir': cache}), ({'jobs': 2}, {'cache': True, 'cache_dir': cache})]
+        # the first extraction writes the sidecars and the second one reads them
+        for _ in xrange(2):
+            compareVariants(folder, 'extractWindow', variants, size=5)
+            compareVariants(folder, 'extractWindow', variants[:1], size=5, boundary='sentence')
+            for extract in ['extractDocument', 'extractSentences']:
+                compareVariants(folder, extract, variants)
+    finally:
+        shutil.rmtree(cache)
+
+
+def compress(folder, ext, **options):
+    """
+    Return a temporary folder containing the parsed files of `folder` 
+    compressed with gzip (`.gz`) or bzip2 (`.bz2`). The files are listed
+    by a `Corpus` created with `options`.
+    """
+    File = {'.gz': gzip.GzipFile, '.bz2': bz2.BZ2File}[ext]
+    compressed = tempfile.mkdtemp()
+    for filename in Corpus(folder, **options).docs:
+        with open(os.path.join(folder, filename), 'rb') as fin:
+            data = fin.read()
+        fout = File(os.path.join(compressed, filename+ext), 'wb')
+        fout.write(data)
+        fout.close()
+    return compressed
+
+
+def test_prefetch(folder):
+    variants = [({}, {'prefetch': 2}), ({}, {'prefetch': 2, 'prefetcher': 'process'})]
+    compareVariants(folder, 'extractWindow', variants, size=5)
+    compareVariants(folder, 'extractDocument', variants)
+
+
+def test_representations(folder):
+    for window, boundary in [({'size': 5}, None), ({'size': 3, 'boundary': 'sentence', 'ctw': 'nj'}, 'sentence')]:
+        c = Corpus(folder)
+        reprs = c.extractRepresentations(window=window, document={}, sentences={'lower': True})
+        for name, extract, kwargs in [('window', 'extractWindow', window), ('document', 'extractDocument', {}),
+                                      ('sentences', 'extractSentences', {'lower': True})]:
+            e = Corpus(folder)
+            getattr(e, extract)(**kwargs)
+            compare('representation %s %s' % (name, kwargs), reprs[name], counts(e))
+        if len(c.dwords) or len(c.drels):
+            raise ValueError('representations modified the corpus')
+
+
+def test_sizes(folder):
+    expected = {}
+    for size in [3, 5]:
+        c = Corpus(folder)
+        c.extractWindow(size=size)
+        expected[size] = counts(c)
+    for args, options in [({}, {}), ({'jobs': 3}, {}), ({'stream': True, 'engine': 'numpy'}, {}),
+                          ({}, {'memory_limit': 10**9})]:
+        c = Corpus(folder, **options)
+        windows = c.extractWindow(size=[3, 5], **args)
+        for size in [3, 5]:
+            compare('window sizes %s %s' % (args, options), windows[size], expected[size])
+        if len(c.dwords) or len(c.drels):
+            raise ValueError('window sizes modified the corpus')
+
+
+def test_encoded(folder):
+    variants = [({}, {'encode_contexts': True}), ({'jobs': 3}, {'encode_contexts': True}),
+                ({'engine': 'numpy'}, {'encode_contexts': True})]
+    compareVariants(folder, 'extractWindow', variants, size=5)
+    c = Corpus(folder, encode_contexts=True)
+    c.extractWindow(size=5)
+    if any(isinstance(ctx, basestring) for ctx in c.dctxs):
+        raise ValueError('contexts were not encoded')
+    # saved contexts are decoded
+    tmpdir = tempfile.mkdtemp()
+    try:
+        fout = os.path.join(tmpdir, 'encoded.db')
+        c.save(fout)
+        e = Corpus(folder)
+        e.load(fout)
+        compare('saved encoded contexts', e, counts(c))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+def test_pruning(folder):
+    c = Corpus(folder)
+    vocab = c.vocabulary(min_tf=3)
+    if c.vocabulary(min_tf=3, jobs=3) != vocab:
+        raise ValueError('vocabulary of many processes differs')
+    expected = compareVariants(folder, 'extractWindow', [({'jobs': 3}, {}), ({'stream': True}, {}), 
+                               ({'engine': 'numpy'}, {})], size=5, min_tf=3)
+    contexts = set(ctx.rsplit('#', 1)[0] for ctx in expected[1])
+    if not set(expected[0]) <= vocab or not contexts <= vocab:
+        raise ValueError('pruned words were counted')
+    # pruned words keep their positions in the windows
+    c = Corpus(folder)
+    c.extractWindow(size=5)
+    full = byKeys(c)
+    c = Corpus(folder)
+    c.extractWindow(size=5, min_tf=3)
+    kept = dict((key, f) for key, f in full[2].iteritems() if key[0] in vocab and key[1].rsplit('#', 1)[0] in vocab)
+    if byKeys(c)[2] != kept:
+        raise ValueError('relations between words of the vocabulary differ')
+    top = c.vocabulary(topN=5)
+    if len(top) != 5 or not top <= vocab:
+        raise ValueError('topN words are not the most frequent words')
+
+
+def test_sketch(folder):
+    # sketches wide enough to count relations without collisions
+    expected = compareVariants(folder, 'extractWindow', [({'sketch': {'memory': 2**22, 'topk': 10**6}}, {})], size=5)
+    # small sketches overestimate the frequencies of the most frequent relations
+    s = Corpus(folder)
+    s.extractWindow(size=5, sketch={'memory': 2**10, 'topk': 50})
+    if len(s.drels) != 50:
+        raise ValueError('sketch did not keep the topk relations')
+    if any(f < expected[2].get(key, 0) for key, f in s.drels.iteritems()):
+        raise ValueError('sketch underestimated a relation')
+    if dict(s.dwords.iteritems()) != expected[0]:
+        raise ValueError('words of the sketch were not counted exactly')
+
+
+def test_compressed(folder):
+    c = Corpus(folder)
+    c.extractWindow(size=5)
+    expected = counts(c)
+    for ext in ['.gz', '.bz2']:
+        compressed = compress(folder, ext)
+        try:
+            for args, options in [({}, {}), ({'jobs': 3}, {'shard_size': 150}), ({}, {'cache': True})]:
+                c = Corpus(compressed, **options)
+                if len(c.docs) != len(Corpus(folder).docs):
+                    raise ValueError('compressed files were not listed: %s' % ext)
+                c.extractWindow(size=5, **args)
+                compare('window %s %s %s' % (ext, args, options), c, expected)
+            for extract in ['extractDocument', 'extractSentences']:
+                c = Corpus(folder)
+                getattr(c, extract)()
+                u = Corpus(compressed)
+                getattr(u, extract)()
+                compare('%s %s' % (extract, ext), u, counts(c))
+        finally:
+            shutil.rmtree(compressed)
+
+
+class Sequential(object):
+    """
+    File that can only be read sequentially.
+    """
+    def __init__(self, fin):
+        self.fin = fin
+
+    def __iter__(self):
+        return iter(self.fin)
+
+    def seek(self, offset):
+        raise ValueError('file read sequentially was seeked')
+
+
+def test_sampling(folder):
+    c = Corpus(folder, sample=0.5, sample_seed=3)
+    c.extractWindow(size=5)
+    if not 0 < len(c.docs) < len(Corpus(folder).docs):
+        raise ValueError('documents were not sampled')
+    kept = Corpus(folder)
+    kept.docs = c.docs
+    kept.extractWindow(size=5)
+    compare('sample of documents', c, counts(kept))
+    options = {'sample': 0.5, 'sample_unit': 'sentence', 'sample_seed': 3}
+    compareVariants(folder, 'extractWindow', [({'jobs': 3}, {}), ({}, {'cache': True}), ({}, {'prefetch': 2}), 
+                    ({'stream': True}, {})], options, size=5)
+    c = Corpus(folder, **options)
+    c.extractWindow(size=5)
+    full = Corpus(folder)
+    full.extractWindow(size=5)
+    if sum(c.drels.itervalues()) >= sum(full.drels.itervalues()):
+        raise ValueError('sentences were not sampled')
+    # sentences of compressed files are read without seeking
+    for ext in ['.gz', '.bz2']:
+        compressed = compress(folder, ext)
+        try:
+            for filename in c.docs:
+                sentences = c._sampleSentences(filename)
+                parser = Stanford(os.path.join(compressed, filename+ext), fast=True, sentences=sentences)
+                parser.fin = Sequential(parser.fin)
+                plain = Stanford(os.path.join(folder, filename), fast=True, sentences=sentences)
+                if parser.document() != plain.document():
+                    raise ValueError('sampled sentences of %s differ: %s' % (ext, filename))
+        finally:
+            shutil.rmtree(compressed)
+
+
+def test_conllu(folder, docs):
+    conllu = tempfile.mkdtemp()
+    options = {'parser': 'CoNLLU', 'filetype': '.conllu'}
+    try:
+        generateCoNLLU(conllu, docs)
+        for extract, kwargs in [('extractWindow', {'size': 5}), ('extractWindow', {'size': 5, 'jobs': 2}),
+                                ('extractDocument', {}), ('extractSentences', {}), 
+                                ('extractDependencies', {})]:
+            c = Corpus(folder)
+            getattr(c, extract)(**kwargs)
+            u = Corpus(conllu, **options)
+            getattr(u, extract)(**kwargs)
+            compare('CoNLL-U %s %s' % (extract, kwargs), u, counts(c))
+        # sampled sentences of compressed files
+        c = Corpus(conllu, sample=0.5, sample_unit='sentence', sample_seed=3, **options)
+        for ext in ['.gz', '.bz2']:
+            compressed = compress(conllu, ext, **options)
+            try:
+                for filename in c.docs:
+                    sentences = c._sampleSentences(filename)
+                    parser = CoNLLU(os.path.join(compressed, filename+ext), sentences=sentences)
+                    parser.fin = Sequential(parser.fin)
+                    plain = CoNLLU(os.path.join(conllu, filename), sentences=sentences)
+                    if parser.document() != plain.document():
+                        raise ValueError('sampled CoNLL-U sentences of %s differ: %s' % (ext, filename))
+            finally:
+                shutil.rmtree(compressed)
+    finally:
+        shutil.rmtree(conllu)
+
+
+def test_dependencies(folder):
+    cache = tempfile.mkdtemp()
+    try:
+        compareVariants(folder, 'extractDependencies', [({'jobs': 3}, {}), ({'jobs': 3}, {'shard_size': 150}), 
+                        ({}, {'cache': True, 'cache_dir': cache})])
+        if os.listdir(cache):
+            raise ValueError('dependencies were read from the token cache')
+    finally:
+        shutil.rmtree(cache)
+    # inverse contexts `relation-1:head` are added to the direct contexts
+    c = Corpus(folder)
+    c.extractDependencies()
+    _, ctxs, rels = byKeys(c)
+    c = Corpus(folder)
+    c.extractDependencies(inverse=False)
+    _, direct, drels = byKeys(c)
+    inverse = set(ctx for ctx in ctxs if ctx.split(':', 1)[0].endswith('-1'))
+    if not inverse or direct != dict((ctx, f) for ctx, f in ctxs.iteritems() if ctx not in inverse):
+        raise ValueError('inverse dependencies: contexts differ')
+    if drels != dict((rel, f) for rel, f in rels.iteritems() if rel[1] not in inverse):
+        raise ValueError('inverse dependencies: relations differ')
+
+
+def test_update(folder):
+    tmpdir = tempfile.mkdtemp()
+    try:
+        for n, options in enumerate([{}, {'shard_size': 150}]):
+            corpus = os.path.join(tmpdir, 'corpus%d' % n)
+            shutil.copytree(folder, corpus)
+            fdb = os.path.join(tmpdir, 'update%d.db' % n)
+            for step in xrange(3):
+                c = Corpus(corpus, **options)
+                c.update(fdb, size=5, jobs=2)
+                e = Corpus(corpus)
+                e.extractWindow(size=5, boundary='document')
+                if byKeys(c) != byKeys(e):
+                    raise ValueError('update %d differs from the extraction %s' % (step, options))
+                # change, remove and add files
+                other = os.path.join(tmpdir, 'other%d%d' % (n, step))
+                generate(other, nb_docs=2, seed=step+10)
+                shutil.copy(os.path.join(other, 'doc00.parsed'), os.path.join(corpus, 'doc01.parsed'))
+                shutil.copy(os.path.join(other, 'doc01.parsed'), os.path.join(corpus, 'new%d.parsed' % step))
+                os.remove(os.path.join(corpus, sorted(f for f in os.listdir(corpus) if f.endswith('.parsed'))[0]))
+            # an update stopped before saving the dictionaries keeps the database
+            before = open(fdb, 'rb').read()
+            c = Corpus(corpus, **options)
+            def crash(*args, **kwargs):
+                raise KeyboardInterrupt
+            c.save = crash
+            try:
+                c.update(fdb, size=5, jobs=2)
+            except KeyboardInterrupt:
+                pass
+            if open(fdb, 'rb').read() != before:
+                raise ValueError('stopped update modified the database')
+            c = Corpus(corpus, **options)
+            c.update(fdb, size=5, jobs=2)
+            e = Corpus(corpus)
+            e.extractWindow(size=5, boundary='document')
+            if byKeys(c) != byKeys(e):
+                raise ValueError('update after a stopped update differs from the extraction %s' % options)
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+def test_checkpoint(folder):
+    tmpdir = tempfile.mkdtemp()
+    try:
+        for boundary in [None, 'sentence']:
+            c = Corpus(folder)
+            c.extractWindow(size=5, boundary=boundary)
+            expected = counts(c)
+            fout = os.path.join(tmpdir, 'checkpoint%s.db' % boundary)
+            c = Corpus(folder)
+            # stop after some files
+            calls = [0]
+            reader = c._reader
+            def crash(*args, **kwargs):
+                calls[0] += 1
+                if calls[0] > 3:
+                    raise KeyboardInterrupt
+                return reader(*args, **kwargs)
+            c._reader = crash
+            try:
+                c.extractWindow(size=5, boundary=boundary, checkpoint=fout, checkpoint_files=1)
+                raise ValueError('extraction did not stop')
+            except KeyboardInterrupt:
+                pass
+            # only the files after the checkpoint are read
+            c = Corpus(folder)
+            calls = [0]
+            reader = c._reader
+            def count(*args, **kwargs):
+                calls[0] += 1
+                return reader(*args, **kwargs)
+            c._reader = count
+            c.extractWindow(size=5, boundary=boundary, checkpoint=fout, checkpoint_files=1, resume=True)
+            compare('checkpoint %s' % boundary, c, expected)
+            if calls[0] != len(c.docs) - 3:
+                raise ValueError('resumed extraction read %d files' % calls[0])
+            # settings of the checkpoint cannot change
+            try:
+                Corpus(folder).extractWindow(size=3, boundary=boundary, checkpoint=fout, resume=True)
+                raise ValueError('resumed a checkpoint of other settings')
+            except SystemExit:
+                pass
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+def test_external(folder):
+    c = Corpus(folder)
+    c.extractWindow(size=5)
+    expected = counts(c)
+    weights = c.weightRels('ppmi')
+    tmpdir = tempfile.mkdtemp()
+    try:
+        for jobs in [1, 2]:
+            e = Corpus(folder)
+            e.extractWindow(size=5, jobs=jobs, external={'tmpdir': tmpdir, 'chunk': 50})
+            fout = os.path.join(tmpdir, 'external.db')
+            e.save(fout)
+            saved = Corpus(folder)
+            saved.load(fout)
+            compare('external saved jobs=%d' % jobs, saved, expected)
+            # weights, frequencies and filters load the relations into memory
+            if e.weightRels('ppmi') != weights:
+                raise ValueError('external weights differ')
+            compare('external jobs=%d' % jobs, e, expected)
+            e = Corpus(folder)
+            e.extractWindow(size=5, external={'tmpdir': tmpdir, 'chunk': 50})
+            e.weightContexts()
+            e.filterDictionaries(c.dwords)
+            if os.listdir(tmpdir) != ['external.db']:
+                raise ValueError('runs of external relations were not removed')
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+def test_memory_limit():
+    folder = tempfile.mkdtemp()
+    word_bytes = hcorpus._WORD_BYTES
+    try:
+        generate(folder, nb_docs=30)
+        c = Corpus(folder)
+        c.extractWindow(size=5)
+        expected = counts(c)
+        # words and contexts of a large vocabulary
+        hcorpus._WORD_BYTES = 10000
+        vocabs = (len(c.dwords) + len(c.dctxs)) * hcorpus._WORD_BYTES
+        for limit in [1, vocabs / 2, vocabs * 2]:
+            for args in [{'stream': True}, {'jobs': 2}]:
+                m = Corpus(folder, memory_limit=limit)
+                m.extractWindow(size=5, **args)
+                # vocabularies exceeding the limit do not spill tiny runs
+                minimum = (limit / 4) / hcorpus._REL_BYTES
+                for fname in m.spill.runs if m.spill else []:
+                    if os.path.getsize(fname) / RECORD.itemsize < minimum:
+                        raise ValueError('run smaller than the budget of relations: limit=%d' % limit)
+                m._mergeSpill()
+                compare('memory_limit=%d %s' % (limit, args), m, expected)
+        hcorpus._WORD_BYTES = word_bytes
+        # relations of a single large file are spilled while it is read
+        single = os.path.join(folder, 'single')
+        generate(single, nb_docs=1, nb_sents=300)
+        c = Corpus(single)
+        c.extractWindow(size=5)
+        m = Corpus(single, memory_limit=40000)
+        m.extractWindow(size=5)
+        if m.spill is None or m.spill.written < 2:
+            raise ValueError('relations of a single file were not spilled')
+        m._mergeSpill()
+        compare('memory_limit of a single file', m, counts(c))
+    finally:
+        hcorpus._WORD_BYTES = word_bytes
+        shutil.rmtree(folder)
+
+
+def test_hashed(folder):
+    for extract, kwargs in [('extractWindow', {'size': 5}), ('extractWindow', {'size': 5, 'jobs': 2}),
+                            ('extractDocument', {}), ('extractSentences', {'jobs': 2})]:
+        c = Corpus(folder)
+        getattr(c, extract)(**kwargs)
+        h = Corpus(folder, hash_contexts=4)
+        getattr(h, extract)(**kwargs)
+        # relations of the contexts of each bucket are summed up
+        buckets = DictHashed(bits=4)
+        ctxs = c.dctxs.id2key()
+        expected = {}
+        freqs = {}
+        for ctx, (_, f) in c.dctxs.iteritems():
+            b = buckets.bucket(ctx) + 1
+            freqs[b] = freqs.get(b, 0) + f
+        for (idw, idc), f in c.drels.iteritems():
+            key = (idw, buckets.bucket(ctxs[idc][0]) + 1)
+            expected[key] = expected.get(key, 0) + f
+        if dict(h.drels.iteritems()) != expected:
+            raise ValueError('%s: hashed relations differ' % extract)
+        if dict((id, f) for id, f in h.dctxs.itervalues()) != freqs:
+            raise ValueError('%s: frequency of buckets differ' % extract)
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            for measure in ['pmi', 'ppmi', 'lmi']:
+                for w in h.weightRels(measure).itervalues():
+                    if math.isnan(w) or math.isinf(w):
+                        raise ValueError('%s: invalid %s weight of hashed relations' % (extract, measure))
+
+
+if __name__ == "__main__":
+    folder = tempfile.mkdtemp()
+    try:
+        docs = generate(folder)
+        test_processes(folder)
+        test_options(folder)
+        test_stream(folder)
+        test_numpy(folder)
+        test_shards(folder)
+        test_cache(folder)
+        test_prefetch(folder)
+        test_representations(folder)
+        test_sizes(folder)
+        test_encoded(folder)
+        test_pruning(folder)
+        test_sketch(folder)
+        test_compressed(folder)
+        test_sampling(folder)
+        test_conllu(folder, docs)
+        test_dependencies(folder)
+        test_update(folder)
+        test_checkpoint(folder)
+        test_external(folder)
+        test_hashed(folder)
+    finally:
+        shutil.rmtree(folder)
+    test_memory_limit()
+    print 'Finished!'
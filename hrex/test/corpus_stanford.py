@@ -16,6 +16,12 @@ from corpus import stanford
 
 from codecs import open
 from os.path import join
+import os
+import random
+import shutil
+import tempfile
+
+from samples import generate, tree
 
 def test_load():
     HOME='/home/roger/Desktop/tests/footie.parsed'
@@ -56,5 +62,88 @@ def test_load():
         
     print 'Finished!'
  
+SETTINGS = [{'content_words': False, 'normalize': False},
+            {'content_words': True, 'ctw': 'njv'},
+            {'content_words': True, 'ctw': 'n', 'lower': True}]
+
+
+def test_fast():
+    folder = tempfile.mkdtemp()
+    try:
+        generate(folder)
+        for filename in sorted(os.listdir(folder)):
+            path = join(folder, filename)
+            phrases = list(stanford.Stanford(path))
+            if list(stanford.Stanford(path, fast=True)) != phrases:
+                raise ValueError('phrases of the fast path differ: %s' % filename)
+            for settings in SETTINGS:
+                if stanford.Stanford(path, fast=True).document(**settings) != stanford.Stanford(path).document(**settings):
+                    raise ValueError('terms of the fast path differ: %s %s' % (filename, settings))
+    finally:
+        shutil.rmtree(folder)
+    print 'Finished!'
+
+
+# untagged tokens (`NN`, `dog`), empty tags and words, and words containing slashes
+MALFORMED = 'NN dogs/NNS the/DT New/York/NNP 1/2/CD dog cars/ /JJ'
+
+
+def test_engines():
+    folder = tempfile.mkdtemp()
+    try:
+        generate(folder)
+        for filename in sorted(os.listdir(folder)):
+            parsed = stanford.Stanford(join(folder, filename))
+            for _ in parsed:
+                for settings in SETTINGS:
+                    split = parsed.listOfTerms(engine='split', **settings)
+                    if parsed.listOfTerms(**settings) != split:
+                        raise ValueError('default engine is not split: %s' % settings)
+                    if parsed.listOfTerms(engine='regex', **settings) != split:
+                        raise ValueError('engines differ: %s %s' % (parsed.phrase, settings))
+        parsed.phrase = MALFORMED
+        for settings in SETTINGS:
+            split = parsed.listOfTerms(**settings)
+            regex = parsed.listOfTerms(engine='regex', **settings)
+            if not settings['content_words']:
+                if regex != split:
+                    raise ValueError('engines differ on malformed tokens: %s' % settings)
+            elif [t for t in split if not (t.word == '' and t.pos == 'n')] != regex:
+                raise ValueError('engines differ on tagged tokens: %s' % settings)
+    finally:
+        shutil.rmtree(folder)
+    print 'Finished!'
+
+
+TREES = ['(ROOT\n  (NP (NP (DT a) (NN game)) (PP (IN in) (NP (NN hand)))))\n',
+         '(ROOT\n  (S\n    (NP (JJ Minute) (NNS bubbles))\n    (PP (IN of)\n      (NP (JJ ancient) (NN air)))\n'
+         '    (VP (VBD rose)\n      (NP (DT the) (NNP New/York) (NN city) (POS \'s) (NN tower)))))\n',
+         '(ROOT\n  (FRAG (ADVP (RB quickly)) (. .)))\n',
+         '(ROOT (NP (NP (NP (NN car))) (CC and) (NP (NP (NNS dogs)) (PP (IN of) (NP (NNP New/York))))))\n']
+HEADS = [['game', 'game', 'hand'], ['bubbles', 'air', 'tower'], [],
+         ['car', 'car', 'car', 'dogs', 'dogs', 'New/York']]
+
+
+def test_nounPhrases():
+    parsed = stanford.Stanford.__new__(stanford.Stanford)
+    rand = random.Random(1)
+    trees = TREES + ['(ROOT %s)\n' % tree(rand) for _ in xrange(300)]
+    for parsed.tree in trees:
+        scanner = parsed.nounPhrases(engine='scanner')
+        nltk = parsed.nounPhrases()
+        if [np.np for np in scanner] != [np.np for np in nltk]:
+            raise ValueError('noun phrases differ: %s' % parsed.tree)
+        if [np.id for np in scanner] != range(1, len(scanner)+1):
+            raise ValueError('noun phrases not numbered: %s' % parsed.tree)
+        if any(np.head not in [t.word for t in np.np] for np in scanner):
+            raise ValueError('head out of the noun phrase: %s' % parsed.tree)
+    for parsed.tree, expected in zip(TREES, HEADS):
+        if [np.head for np in parsed.nounPhrases(engine='scanner')] != expected:
+            raise ValueError('wrong heads: %s' % parsed.tree)
+    print 'Finished!'
+
 if __name__ == "__main__":
+    test_engines()
+    test_nounPhrases()
+    test_fast()
     test_load()
@@ -0,0 +1,101 @@
+#!/usr/bin/python
+#-*- coding: utf-8 -*-
+
+"""
+This module generates small parsed corpora used by the tests.
+
+@author: granada
+"""
+import os
+import random
+
+NOUNS = ['car', 'Cars', 'dog', 'dogs', 'Houses', 'tree', 'city', 'air', 'bubbles',
+         'game', 'hand', 'New/York']
+VERBS = [('runs', 'VBZ'), ('ran', 'VBD'), ('eating', 'VBG'), ('eat', 'VB'), ('Drives', 'VBZ')]
+ADJS = ['red', 'big', 'ancient', 'Minute', 'Older']
+OTHER = [('the', 'DT'), ('of', 'IN'), ('and', 'CC'), ('quickly', 'RB'), ('he', 'PRP'), ('1/2', 'CD')]
+
+
+def sentence(rand, length=12):
+    """
+    Return a random sentence as a list of tuples `(word, tag)`.
+    """
+    sent = []
+    for _ in xrange(rand.randint(1, length)):
+        r = rand.random()
+        if r < 0.4:
+            sent.append((rand.choice(NOUNS), rand.choice(['NN', 'NNS', 'NNP'])))
+        elif r < 0.6:
+            sent.append(rand.choice(VERBS))
+        elif r < 0.75:
+            sent.append((rand.choice(ADJS), 'JJ'))
+        else:
+            sent.append(rand.choice(OTHER))
+    return sent
+
+
+PHRASES = ['NP', 'NP', 'NP', 'VP', 'PP', 'ADJP', 'NX', 'S']
+
+
+def tree(rand, depth=5):
+    """
+    Return a random tree in Penn Treebank format with phrases nested up to
+    `depth` levels, including unary noun phrases and possessives.
+    """
+    if depth == 0 or rand.random() < 0.2:
+        word, tag = sentence(rand, length=1)[0]
+        if rand.random() < 0.05:
+            word, tag = "'s", 'POS'
+        return '(%s %s)' % (tag, word)
+    children = [tree(rand, depth-1) for _ in xrange(rand.randint(1, 4))]
+    return '(%s %s)' % (rand.choice(PHRASES), ' '.join(children))
+
+
+def generate(folder, nb_docs=6, nb_sents=15, seed=1):
+    """
+    Generate `nb_docs` files parsed by the Stanford parser into `folder`,
+    each one containing up to `nb_sents` sentences.
+
+    Returns:
+    --------
+    docs : array_like
+        List of the sentences of each document
+    """
+    rand = random.Random(seed)
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+    docs = []
+    for d in xrange(nb_docs):
+        sents = [sentence(rand) for _ in xrange(rand.randint(1, nb_sents))]
+        with open(os.path.join(folder, 'doc%02d.parsed' % d), 'w') as fout:
+            for sent in sents:
+                fout.write(' '.join('%s/%s' % tok for tok in sent)+'\n\n')
+                fout.write('(ROOT\n  (S '+' '.join('(%s %s)' % (t, w) for w, t in sent)+'))\n\n')
+                for i in xrange(1, len(sent)):
+                    fout.write('dep(%s-%d, %s-%d)\n' % (sent[i-1][0], i, sent[i][0], i+1))
+                fout.write('\n')
+        docs.append(sents)
+    return docs
+
+
+UPOS = {'NN': 'NOUN', 'NNS': 'NOUN', 'NNP': 'PROPN', 'JJ': 'ADJ', 'VB': 'VERB', 'VBD': 'VERB',
+        'VBG': 'VERB', 'VBZ': 'VERB', 'PRP': 'PRON', 'DT': 'DET', 'IN': 'ADP', 'CC': 'CCONJ',
+        'RB': 'ADV', 'CD': 'NUM'}
+
+
+def generateCoNLLU(folder, docs):
+    """
+    Write the documents returned by `generate` into `folder` in the CoNLL-U
+    format, where each token depends on the previous token.
+    """
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+    for d, sents in enumerate(docs):
+        with open(os.path.join(folder, 'doc%02d.conllu' % d), 'w') as fout:
+            for k, sent in enumerate(sents):
+                fout.write('# sent_id = %d\n' % k)
+                for i, (word, tag) in enumerate(sent, 1):
+                    fields = [str(i), word, word.lower(), UPOS[tag], tag, '_', str(i-1), 
+                              'root' if i == 1 else 'dep', '_', '_']
+                    fout.write('\t'.join(fields)+'\n')
+                fout.write('\n')
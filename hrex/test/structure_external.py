@@ -0,0 +1,67 @@
+#!/usr/bin/python
+#-*- coding: utf-8 -*-
+
+"""
+This module tests the file `structure.external`. Relations counted on disk
+are compared to relations counted in memory.
+
+@author: granada
+"""
+import sys
+sys.path.insert(0, '..')
+import logging
+logger = logging.getLogger('test.structure_external')
+logging.basicConfig(format='%(asctime)s : %(levelname)s : %(message)s', level=logging.INFO)
+
+import os
+import random
+
+from structure.external import ExternalRels
+
+
+def test_buffer():
+    rand = random.Random(1)
+    drels = ExternalRels(chunk=100)
+    expected = {}
+    for step in xrange(50):
+        if step % 2:
+            pairs = [(rand.randint(1, 30), rand.randint(1, 2**32-1)) for _ in xrange(rand.randint(1, 250))]
+            drels.extend([idw for idw, _ in pairs], [idc for _, idc in pairs], [2] * len(pairs))
+            f = 2
+        else:
+            pairs = [(rand.randint(1, 30), rand.randint(1, 2**32-1)) for _ in xrange(rand.randint(1, 30))]
+            for key in pairs:
+                drels[key] = 1
+            f = 1
+        for key in pairs:
+            expected[key] = expected.get(key, 0) + f
+        # the buffer is a NumPy array bounded by the chunk
+        if len(drels.keys) > drels.chunk or drels.keys.dtype.kind != 'u':
+            raise ValueError('buffer exceeds the chunk: %d' % len(drels.keys))
+    if dict(drels.toDict().iteritems()) != expected:
+        raise ValueError('relations counted on disk differ')
+    drels.close()
+    if os.path.isdir(drels.folder):
+        raise ValueError('runs were not removed')
+    print 'Finished!'
+
+def test_compact():
+    rand = random.Random(1)
+    drels = ExternalRels(chunk=20, max_runs=4)
+    expected = {}
+    for _ in xrange(2000):
+        key = (rand.randint(1, 30), rand.randint(1, 30))
+        drels[key] = 1
+        expected[key] = expected.get(key, 0) + 1
+        if len(drels.runs) >= 4:
+            raise ValueError('runs were not compacted')
+    if dict(drels.toDict().iteritems()) != expected:
+        raise ValueError('compacted runs differ')
+    if len(os.listdir(drels.folder)) != len(drels.runs):
+        raise ValueError('compacted runs were not removed')
+    drels.close()
+    print 'Finished!'
+
+if __name__ == "__main__":
+    test_buffer()
+    test_compact()
@@ -0,0 +1,84 @@
+#!/usr/bin/python
+#-*- coding: utf-8 -*-
+
+"""
+This module tests the file `structure.merge`. Stores of parts of a corpus
+are merged and compared to the store of the whole corpus.
+
+@author: granada
+"""
+import sys
+sys.path.insert(0, '..')
+import logging
+logger = logging.getLogger('test.structure_merge')
+logging.basicConfig(format='%(asctime)s : %(levelname)s : %(message)s', level=logging.INFO)
+
+import os
+import shutil
+import tempfile
+
+from corpus.corpus import Corpus
+from structure.merge import mergeStores
+from samples import generate
+
+EXTRACTIONS = [('extractWindow', {'size': 5, 'boundary': 'document'}, 'keys'),
+               ('extractDependencies', {}, 'keys'),
+               ('extractDocument', {}, 'ids'),
+               ('extractSentences', {}, 'ids')]
+
+
+def byKeys(corpus):
+    """
+    Return the frequencies of words, contexts and relations indexed by keys
+    instead of ids. Contexts are transformed into strings, since contexts of
+    documents and sentences are loaded from databases as strings.
+    """
+    words = corpus.dwords.id2key()
+    ctxs = corpus.dctxs.id2key()
+    return (dict((w, f) for w, (_, f) in corpus.dwords.iteritems()),
+            dict((unicode(c), f) for c, (_, f) in corpus.dctxs.iteritems()),
+            dict(((words[idw][0], unicode(ctxs[idc][0])), f) for (idw, idc), f in corpus.drels.iteritems()))
+
+
+def test_merge():
+    folder = tempfile.mkdtemp()
+    try:
+        full = os.path.join(folder, 'full')
+        generate(full)
+        parts = [os.path.join(folder, 'part%d' % k) for k in xrange(2)]
+        for k, filename in enumerate(sorted(os.listdir(full))):
+            part = parts[k * len(parts) / 6]
+            if not os.path.isdir(part):
+                os.mkdir(part)
+            shutil.copy(os.path.join(full, filename), part)
+        for mode in ['db', 'shelve']:
+            for extract, kwargs, contexts in EXTRACTIONS:
+                c = Corpus(full)
+                getattr(c, extract)(**kwargs)
+                expected = byKeys(c)
+                stores = []
+                for k, part in enumerate(parts):
+                    c = Corpus(part)
+                    getattr(c, extract)(**kwargs)
+                    stores.append(os.path.join(folder, 'store%d.%s' % (k, mode)))
+                    c.save(stores[-1], mode=mode)
+                fout = os.path.join(folder, 'merged.%s' % mode)
+                mergeStores(stores, fout, mode=mode, contexts=contexts)
+                merged = Corpus(full)
+                merged.load(fout, mode=mode)
+                if byKeys(merged) != expected:
+                    raise ValueError('%s: merged stores differ from the whole corpus (%s)' % (extract, mode))
+                if contexts == 'ids':
+                    # ids of different stores are not merged by value
+                    try:
+                        mergeStores(stores, fout, mode=mode)
+                    except SystemExit:
+                        pass
+                    else:
+                        raise ValueError('%s: stores of ids were merged by value' % extract)
+    finally:
+        shutil.rmtree(folder)
+    print 'Finished!'
+
+if __name__ == "__main__":
+    test_merge()
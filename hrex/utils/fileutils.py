@@ -0,0 +1,183 @@
+#!/usr/bin/python
+#-*- coding: utf-8 -*-
+
+"""
+This module contains util functions to deal with files.
+
+@author: granada
+"""
+import logging
+logger = logging.getLogger('utils.fileutils')
+logging.basicConfig(format='%(asctime)s : %(levelname)s : %(message)s', level=logging.INFO)
+
+import os
+import io
+import bz2
+import gzip
+import hashlib
+try:
+    import lzma
+except ImportError:
+    try:
+        from backports import lzma
+    except ImportError:
+        lzma = None
+
+# Extensions of compressed files read by `openFile`
+COMPRESSED = ['.gz', '.bz2', '.xz']
+
+def fileHash(path, block=1 << 20):
+    """
+    Calculate the SHA-1 of the content of a file.
+
+    Parameters:
+    -----------
+    path : string
+        Path to the file
+    block : int, optional
+        Number of bytes read at once
+
+    Returns:
+    --------
+    sha1 : string
+        The hexadecimal digest of the content
+    """
+    sha = hashlib.sha1()
+    with open(path, 'rb') as fin:
+        while True:
+            data = fin.read(block)
+            if not data:
+                break
+            sha.update(data)
+    return sha.hexdigest()
+
+
+def fileStat(path):
+    """
+    Return the size and the modification time of a file.
+
+    Parameters:
+    -----------
+    path : string
+        Path to the file
+
+    Returns:
+    --------
+    size : int
+        Number of bytes of the file
+    mtime : float
+        Time of the last modification of the file
+    """
+    st = os.stat(path)
+    return st.st_size, st.st_mtime
+
+
+def isCompressed(path):
+    """
+    Verify whether `path` has the extension of a compressed file.
+    """
+    return os.path.splitext(path)[1] in COMPRESSED
+
+
+def sidecarPath(path, extension, folder=None):
+    """
+    Return the path to a sidecar file of `path` (e.g., a cache or an index).
+
+    Parameters:
+    -----------
+    path : string
+        Path to the file
+    extension : string
+        Extension of the sidecar
+    folder : string, optional
+        Folder of the sidecar. Sidecars are placed next to the file by default.
+        In `folder`, the name of the sidecar contains a hash of the absolute 
+        path of the file, thus files of different folders with the same name
+        have different sidecars.
+
+    Returns:
+    --------
+    sidecar : string
+        Path to the sidecar
+    """
+    if folder is None:
+        return path + extension
+    key = hashlib.sha1(os.path.abspath(path)).hexdigest()[:16]
+    return os.path.join(folder, '%s.%s%s' % (os.path.basename(path), key, extension))
+
+
+def openFile(path):
+    """
+    Open a file for reading bytes. Files ending with `.gz`, `.bz2` and `.xz`
+    are decompressed while they are read.
+
+    Parameters:
+    -----------
+    path : string
+        Path to the file
+
+    Returns:
+    --------
+    fin : file_like
+        A binary file object iterating over the lines of the file
+    """
+    ext = os.path.splitext(path)[1]
+    if ext == '.gz':
+        return io.BufferedReader(gzip.open(path, 'rb'))
+    elif ext == '.bz2':
+        return bz2.BZ2File(path, 'rb')
+    elif ext == '.xz':
+        if not lzma:
+            raise ImportError('lzma module not installed to read %s (install backports.lzma)' % path)
+        return lzma.LZMAFile(path, 'rb')
+    return io.open(path, 'rb')
+
+
+def readRanges(fin, ranges, sequential=False):
+    """
+    Yield the lines of a binary file contained in ranges of bytes.
+
+    Parameters:
+    -----------
+    fin : file_like
+        A binary file object opened by `openFile`
+    ranges : array_like
+        List of ranges `(start, end)` sorted by `start`, where `start` is the
+        offset of a line and lines starting at `end` or after are not read. 
+        `end=None` reads until the end of the file.
+    sequential : boolean {True, False}, optional
+        Read the file from its beginning to the last range instead of seeking
+        the start of each range. Compressed files must be read sequentially, 
+        since each seek decompresses the file again from its beginning.
+
+    Yields:
+    -------
+    line : string
+        The lines of the ranges, which are not decoded
+    """
+    if not sequential:
+        for start, end in ranges:
+            fin.seek(start)
+            offset = start
+            for line in fin:
+                if end is not None and offset >= end:
+                    break
+                offset += len(line)
+                yield line
+        return
+    lines = iter(fin)
+    offset = 0
+    line = None
+    for start, end in ranges:
+        while True:
+            if line is None:
+                line = next(lines, None)
+                if line is None:
+                    return
+            if end is not None and offset >= end:
+                # the line belongs to the next ranges
+                break
+            if offset >= start:
+                yield line
+            offset += len(line)
+            line = None